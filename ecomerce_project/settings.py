@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,11 +46,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'users.metrics.MetricsMiddleware', # Server-Timing, log de lentas e /metrics (ver users/metrics.py)
     'corsheaders.middleware.CorsMiddleware',  # Adicione o middleware do CORS
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.routers.ReplicaRoutingMiddleware', # Leituras em réplicas (ver users/routers.py)
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -83,6 +87,93 @@ DATABASES = {
     }
 }
 
+# Postgres local opcional (ex.: para testes de carga): defina POSTGRES_DB e,
+# se preciso, POSTGRES_USER, POSTGRES_PASSWORD, POSTGRES_HOST e POSTGRES_PORT.
+if os.environ.get('POSTGRES_DB'):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ['POSTGRES_DB'],
+        'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+        'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+        'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+        'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+    }
+
+# Perfil de produção do SQLite (opt-in): defina SQLITE_PROFILE=production.
+# WAL (leitores não bloqueiam o escritor), synchronous=NORMAL (seguro com WAL),
+# mmap e cache maiores e busy_timeout em toda conexão; conexões persistentes; e
+# transações IMMEDIATE com fila de escrita no processo (users/backends/sqlite3),
+# para escritores concorrentes esperarem a vez em vez de falhar.
+# Compare com `python manage.py benchmark_sqlite_profile`.
+SQLITE_PRODUCTION_PRAGMAS = ';'.join([
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA mmap_size=268435456', # 256 MiB
+    'PRAGMA cache_size=-65536', # 64 MiB
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA busy_timeout=20000',
+])
+SQLITE_PRODUCTION_PROFILE = {
+    'ENGINE': 'users.backends.sqlite3',
+    'OPTIONS': {'init_command': SQLITE_PRODUCTION_PRAGMAS, 'transaction_mode': 'IMMEDIATE', 'timeout': 20},
+    'CONN_MAX_AGE': 600,
+    'CONN_HEALTH_CHECKS': True,
+}
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3' and os.environ.get('SQLITE_PROFILE') == 'production':
+    DATABASES['default'].update(SQLITE_PRODUCTION_PROFILE)
+
+# Réplicas de leitura (users/routers.py): requisições GET leem de uma das aliases
+# em DATABASE_REPLICAS e o cliente que acabou de escrever fica no principal por
+# READ_YOUR_WRITES_WINDOW segundos. Com Postgres, liste os hosts das réplicas em
+# POSTGRES_REPLICA_HOSTS (separados por vírgula). As faltas do cache do catálogo
+# são montadas no principal (ver users/caching.py).
+# A alias 'replica' do SQLite aponta para o mesmo arquivo e fica fora de
+# DATABASE_REPLICAS; nos testes ela vira um segundo banco local separado.
+DATABASE_ROUTERS = ['users.routers.PrimaryReplicaRouter']
+DATABASE_REPLICAS = []
+READ_YOUR_WRITES_WINDOW = int(os.environ.get('READ_YOUR_WRITES_WINDOW', 5))
+
+if DATABASES['default']['NAME'] == BASE_DIR / 'db.sqlite3':
+    DATABASES['replica'] = dict(DATABASES['default'])
+for index, host in enumerate(filter(None, os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(','))):
+    alias = f'replica_{index + 1}'
+    DATABASES[alias] = dict(DATABASES['default'], HOST=host.strip())
+    DATABASE_REPLICAS.append(alias)
+
+
+# Django REST Framework
+# Renderizadores/parsers rápidos (users/renderers.py). O MessagePack só é
+# oferecido quando o pacote msgpack está instalado.
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'users.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'users.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+if find_spec('msgpack'):
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append('users.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append('users.renderers.MessagePackParser')
+
+# Endpoint /api/v1/batch/ (ver users/batch.py)
+BATCH_MAX_REQUESTS = 20 # Sub-requisições por lote
+BATCH_MAX_WORKERS = 4 # Threads para leituras em paralelo ("parallel": true)
+
+# Instrumentação das requisições (ver users/metrics.py)
+METRICS_SERVER_TIMING = True # Cabeçalho Server-Timing nas respostas da API
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1'] # Quem pode ler /metrics além de usuários staff (aceita redes, ex.: '10.0.0.0/8')
+SLOW_REQUEST_THRESHOLD_MS = 500 # Requisições acima disso vão para o log 'users.performance'
+
+# Recomendações "comprados juntos" (ver users/recommendations.py)
+BOUGHT_TOGETHER_TOP_K = 10 # Vizinhos guardados por produto
+SIMILAR_PRODUCTS_TOP_K = 10 # Semelhantes por conteúdo guardados por produto (ver users/similarity.py)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -1,7 +1,7 @@
 from django.contrib import admin
 from .models import (
     Category, Product, Address, Order, OrderItem, Review, Coupon,
-    Wishlist, WishlistProduct
+    Wishlist, WishlistProduct, ProductFacetCount, VariantOption, ProductVariant
 )
 
 # Registre todos os modelos para que apareçam no painel de administração
@@ -14,3 +14,6 @@ admin.site.register(Review)
 admin.site.register(Coupon)
 admin.site.register(Wishlist)
 admin.site.register(WishlistProduct)
+admin.site.register(ProductFacetCount)
+admin.site.register(VariantOption)
+admin.site.register(ProductVariant)
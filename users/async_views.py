@@ -0,0 +1,96 @@
+# users/async_views.py
+import base64
+import binascii
+
+from django.contrib.auth import aauthenticate
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+from rest_framework import exceptions
+from rest_framework.request import Request
+
+from . import facets, metrics
+from .filters import ProductFilterBackend
+from .models import Category, Product
+from .pagination import AsyncProductCursorPagination
+from .projections import ProductProjection
+from .renderers import FastJSONRenderer
+from .serializers import UserSerializer
+
+# Caminho de leitura assíncrono para o ASGI (ecomerce_project/asgi.py).
+#
+# As rotas /api/v1/async/... são views nativas async do Django que usam o ORM
+# assíncrono (async for, afirst) em vez das viewsets síncronas do DRF. Em um
+# worker ASGI, enquanto uma requisição espera o banco ou um cliente lento, o
+# mesmo processo atende as outras, sem ocupar uma thread por conexão.
+#
+# A saída é a mesma das rotas síncronas equivalentes (mesmas projeções,
+# paginação, cursores e filtros). Escritas, a API navegável e o cache versionado
+# do catálogo continuam só nas viewsets.
+# Autenticação: sessão do Django e HTTP Basic, como as classes padrão do DRF.
+
+_renderer = FastJSONRenderer()
+
+def _json(data, status=200):
+    return HttpResponse(_renderer.render(data), status=status, content_type='application/json')
+
+def _error(exc, status=None):
+    # Mesmo corpo de erro que o DRF gera para a exceção
+    data = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+    return _json(data, status or exc.status_code)
+
+async def _authenticate(request):
+    # Sessão primeiro e depois HTTP Basic. Como no DRF (SessionAuthentication é
+    # a primeira classe e não tem WWW-Authenticate), falhas respondem 403.
+    user = await request.auser()
+    if user.is_authenticated:
+        return user
+    auth = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if not auth or auth[0].lower() != 'basic':
+        raise exceptions.NotAuthenticated()
+    try:
+        username, _, password = base64.b64decode(auth[1]).decode('utf-8').partition(':')
+    except (IndexError, binascii.Error, UnicodeDecodeError):
+        raise exceptions.AuthenticationFailed('Invalid basic header. Credentials not correctly base64 encoded.')
+    user = await aauthenticate(request, username=username, password=password)
+    if user is None or not user.is_active:
+        raise exceptions.AuthenticationFailed('Invalid username/password.')
+    return user
+
+@require_safe
+async def product_list(request):
+    drf_request = Request(request)
+    try:
+        queryset = ProductFilterBackend().filter_queryset(drf_request, Product.objects.all(), None)
+    except exceptions.ValidationError as exc:
+        return _error(exc)
+    paginator = AsyncProductCursorPagination()
+    try:
+        rows = await paginator.apaginate_queryset(ProductProjection.values(queryset), drf_request)
+    except exceptions.NotFound as exc: # Cursor inválido
+        return _error(exc)
+    with metrics.timed('serializer'):
+        data = paginator.get_paginated_data(await ProductProjection.abuild(rows))
+    data['facets'] = await facets.aget_facet_counts()
+    return _json(data)
+
+@require_safe
+async def product_detail(request, pk):
+    row = await ProductProjection.values(Product.objects.filter(pk=pk)).afirst()
+    if row is None:
+        # Mesma mensagem do get_object_or_404 usado pelas viewsets
+        return _error(exceptions.NotFound(f'No {Product._meta.object_name} matches the given query.'))
+    with metrics.timed('serializer'):
+        product = (await ProductProjection.abuild([row]))[0]
+    return _json(product)
+
+@require_safe
+async def category_list(request):
+    return _json([row async for row in Category.objects.order_by('name').values('id', 'name')])
+
+@require_safe
+async def me(request):
+    try:
+        user = await _authenticate(request)
+    except (exceptions.NotAuthenticated, exceptions.AuthenticationFailed) as exc:
+        return _error(exc, status=403)
+    return _json(UserSerializer(user).data)
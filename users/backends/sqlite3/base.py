@@ -0,0 +1,59 @@
+# users/backends/sqlite3/base.py
+import threading
+
+from django.db import OperationalError
+from django.db.backends.sqlite3 import base
+
+# Backend SQLite do perfil de produção (SQLITE_PROFILE=production no settings.py).
+#
+# O SQLite aceita um escritor por vez. Com transaction_mode IMMEDIATE cada
+# transação pega o bloqueio de escrita já no BEGIN, e o busy_timeout faz as
+# outras conexões esperarem em vez de falhar com "database is locked". Este
+# backend acrescenta uma fila dentro do processo: as transações de um mesmo
+# arquivo esperam num threading.Lock antes do BEGIN, e não no laço de espera do
+# SQLite (que dorme em intervalos e é injusto sob disputa). Entre processos
+# continua valendo o busy_timeout.
+
+_write_locks = {}
+_registry_lock = threading.Lock()
+
+def _write_lock(name):
+    with _registry_lock:
+        return _write_locks.setdefault(str(name), threading.Lock())
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    _write_lock_held = None
+
+    def _start_transaction_under_autocommit(self):
+        lock = _write_lock(self.settings_dict['NAME'])
+        if not lock.acquire(timeout=self.settings_dict['OPTIONS'].get('timeout', 5)):
+            raise OperationalError('database is locked (tempo esgotado na fila de escrita)')
+        self._write_lock_held = lock
+        try:
+            super()._start_transaction_under_autocommit()
+        except BaseException:
+            self._release_write_lock()
+            raise
+
+    def _release_write_lock(self):
+        lock, self._write_lock_held = self._write_lock_held, None
+        if lock is not None:
+            lock.release()
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self._release_write_lock()
@@ -0,0 +1,148 @@
+# users/batch.py
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+from .renderers import FastJSONRenderer
+
+# Várias chamadas da API em uma única ida e volta: POST /api/v1/batch/
+#
+#   {"parallel": true, "requests": [
+#       {"id": "me", "method": "GET", "path": "users/me/"},
+#       {"id": "cats", "path": "/api/v1/categories/"},
+#       {"id": "addr", "method": "POST", "path": "addresses/", "body": {...}}]}
+#
+# Cada sub-requisição é despachada em processo para a view registrada em
+# users/urls.py (o caminho pode ser relativo a /api/v1/ ou absoluto), com as
+# mesmas permissões, filtros, paginação e cache do catálogo da chamada direta.
+# A autenticação é feita uma vez na requisição externa e o usuário é repassado
+# às sub-requisições, sem reler sessão nem verificar a senha de novo.
+#
+# As respostas saem na ordem pedida, cada uma com status, cabeçalhos e corpo.
+# Cada sub-requisição é independente: uma falha não interrompe as outras e não
+# há transação envolvendo o lote. Com "parallel", leituras (GET/HEAD)
+# consecutivas rodam em threads, até BATCH_MAX_WORKERS ao mesmo tempo; escritas
+# sempre rodam sozinhas e na ordem, separando os grupos de leituras.
+# Respostas em fluxo (exportação de pedidos) não são aceitas dentro do lote.
+
+logger = logging.getLogger('django.request')
+
+SAFE_METHODS = ('GET', 'HEAD')
+METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+# Cabeçalhos da requisição externa que não fazem sentido nas sub-requisições
+_DROPPED_HEADERS = ('HTTP_AUTHORIZATION', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE', 'HTTP_CONTENT_LENGTH')
+
+_renderer = FastJSONRenderer()
+
+def max_requests():
+    return getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+
+def max_workers():
+    return getattr(settings, 'BATCH_MAX_WORKERS', 4)
+
+def _build_request(request, user, spec, path_info):
+    path, _, query = path_info.partition('?')
+    body = b'' if spec.get('body') is None else _renderer.render(spec['body'])
+    environ = {key: value for key, value in request.META.items() if key not in _DROPPED_HEADERS}
+    environ.update({
+        'REQUEST_METHOD': spec['method'],
+        'PATH_INFO': path,
+        'SCRIPT_NAME': request.META.get('SCRIPT_NAME', ''),
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.url_scheme': request.scheme,
+    })
+    sub_request = WSGIRequest(environ)
+    sub_request.user = user
+    sub_request.session = getattr(request, 'session', None)
+    if user.is_authenticated:
+        sub_request._force_auth_user = user # Lido pelo Request do DRF: pula as classes de autenticação
+    async def auser():
+        return user
+    sub_request.auser = auser # Views async (users/async_views.py)
+    return sub_request
+
+def _decode(response, method):
+    if method == 'HEAD' or not response.content:
+        return None
+    if response.get('Content-Type', '').startswith('application/json'):
+        return json.loads(response.content)
+    return response.content.decode(response.charset)
+
+def _result(spec, status, body, headers=None):
+    return {'id': spec.get('id'), 'status': status, 'headers': headers or {}, 'body': body}
+
+def _dispatch(request, user, spec, prefix):
+    path = spec['path']
+    if path.startswith('/'):
+        if not path.startswith(prefix):
+            return _result(spec, 400, {'detail': f'O caminho deve começar com {prefix}.'})
+        path = path[len(prefix):]
+    try:
+        match = resolve('/' + path.partition('?')[0], urlconf='users.urls')
+    except Resolver404:
+        return _result(spec, 404, {'detail': 'Rota não encontrada.'})
+    if match.url_name == 'api-batch':
+        return _result(spec, 400, {'detail': 'O lote não pode conter outro lote.'})
+
+    sub_request = _build_request(request, user, spec, prefix + path)
+    sub_request.resolver_match = match
+    try:
+        if iscoroutinefunction(match.func):
+            response = async_to_sync(match.func)(sub_request, *match.args, **match.kwargs)
+        else:
+            response = match.func(sub_request, *match.args, **match.kwargs)
+        if response.streaming:
+            return _result(spec, 400, {'detail': 'Respostas em fluxo não podem ser usadas no lote.'})
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+    except Exception:
+        # Mesmo tratamento de um erro 500 fora do lote, sem derrubar as outras sub-requisições
+        logger.exception('Erro na sub-requisição %s %s', spec['method'], prefix + path)
+        return _result(spec, 500, {'detail': 'Erro interno do servidor.'})
+    headers = {name: value for name, value in response.items() if name != 'Content-Length'}
+    return _result(spec, response.status_code, _decode(response, spec['method']), headers)
+
+def _dispatch_in_thread(request, user, spec, prefix):
+    try:
+        return _dispatch(request, user, spec, prefix)
+    finally:
+        connections.close_all() # Conexões abertas pela thread do pool
+
+def run(request, specs, parallel=False):
+    # request: requisição do DRF já autenticada; specs: validadas por BatchRequestSerializer.
+    # Retorna a lista de resultados na ordem de specs.
+    user = request.user if request.user is not None else AnonymousUser()
+    django_request = request._request
+    prefix = django_request.path[:-len('batch/')] # /api/v1/
+    if not parallel:
+        return [_dispatch(django_request, user, spec, prefix) for spec in specs]
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers()) as executor:
+        reads = []
+        for spec in [*specs, None]:
+            if spec is not None and spec['method'] in SAFE_METHODS:
+                reads.append(spec)
+                continue
+            # Fim de um grupo de leituras: roda o grupo em paralelo e depois a escrita
+            if len(reads) > 1:
+                results.extend(executor.map(lambda read: _dispatch_in_thread(django_request, user, read, prefix), reads))
+            elif reads:
+                results.append(_dispatch(django_request, user, reads[0], prefix))
+            reads = []
+            if spec is not None:
+                results.append(_dispatch(django_request, user, spec, prefix))
+    return results
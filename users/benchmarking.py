@@ -0,0 +1,382 @@
+# users/benchmarking.py
+import json
+import platform
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.permissions import IsAdminUser
+from rest_framework.test import APIClient
+
+from . import coupons, facets, ratings, reservations, sales, search, wishlists
+from .caching import bump_catalog_version, catalog_cache
+from .models import Category, Coupon, Order, OrderItem, Product, Review, StockShard, Wishlist, WishlistProduct
+
+# Base de dados sintética e medição reprodutível da API.
+#
+# seed() gera volumes realistas (até milhões de linhas) com bulk_create em
+# lotes, a partir de uma semente fixa: a mesma semente e os mesmos volumes
+# produzem os mesmos dados. Os registros ficam marcados pelo prefixo
+# SEED_PREFIX (usuários, categorias e cupons) para serem removidos com
+# flush(). Como bulk_create não dispara sinais, os agregados derivados
+# (avaliações, facetas, índice de busca, wished_by_count, resumos de vendas)
+# são recalculados no fim, como nas importações (ver users/catalog_io.py).
+#
+# run_endpoints() percorre todas as rotas GET registradas no router de
+# users/urls.py (list, detail e actions extras), em processo, pelo mesmo
+# cliente de teste do DRF, e mede latência (p50/p95/p99), vazão e consultas
+# por requisição. As rotas IsAdminUser (analytics, exportação) usam um usuário
+# staff (SEED_STAFF) ou ficam de fora sem ele; qualquer resposta fora de 2xx
+# conta como erro. O resultado vira um baseline JSON, e compare() aponta as
+# regressões em relação a um baseline anterior.
+#
+# run_writes() (chamada também por run_endpoints()) mede as actions de escrita do router (checkout, reserva e
+# devolução de estoque, lista de desejos, cupons) sobre os mesmos dados sem
+# alterá-los: tudo roda em uma transação desfeita no fim, e cada requisição em
+# um savepoint desfeito logo após a resposta, para que todas partam do mesmo
+# estado (mesmo estoque, mesma lista, mesmo cupom).
+
+SEED_PREFIX = 'bench'
+SEED_PASSWORD = 'bench-password' # Senha de todos os usuários gerados (um único hash)
+SEED_STAFF = f'{SEED_PREFIX}-staff' # Usuário staff das rotas IsAdminUser
+WRITE_COUPON = f'{SEED_PREFIX.upper()}-ESCRITA' # Cupom criado (e desfeito) por run_writes()
+
+# Rotas que não entram na medição: exportação em fluxo é um job, não uma leitura interativa
+EXCLUDED_ENDPOINTS = {'order-export'}
+
+DEFAULT_VOLUMES = {
+    'categories': 50,
+    'products': 20_000,
+    'users': 5_000,
+    'orders': 50_000,
+    'reviews': 100_000,
+    'coupons': 200,
+    'wishlists': 2_000,
+}
+
+def _batches(total, batch_size):
+    for start in range(0, total, batch_size):
+        yield start, min(batch_size, total - start)
+
+def seed(volumes, batch_size=5000, random_seed=42, days=365, items_per_order=4, wishlist_size=20, log=print):
+    rng = random.Random(random_seed)
+    now = timezone.now()
+
+    categories = Category.objects.bulk_create([
+        Category(name=f'{SEED_PREFIX.title()} {i:04d}') for i in range(volumes['categories'])
+    ])
+    log(f'{len(categories)} categorias')
+
+    products = [] # (pk, preço, categoria) de todos os produtos gerados
+    for start, size in _batches(volumes['products'], batch_size):
+        created = Product.objects.bulk_create([
+            Product(
+                name=f'{SEED_PREFIX.title()} produto {start + i:07d}',
+                description=f'Produto sintético {start + i} para benchmarks',
+                price=Decimal(rng.randint(500, 500_000)) / 100,
+                stock=rng.randint(0, 500),
+                category=rng.choice(categories) if categories else None,
+            )
+            for i in range(size)
+        ], batch_size=batch_size)
+        products.extend((product.pk, product.price, product.category_id) for product in created)
+    log(f'{len(products)} produtos')
+
+    password = make_password(SEED_PASSWORD)
+    user_ids = []
+    for start, size in _batches(volumes['users'], batch_size):
+        created = User.objects.bulk_create([
+            User(username=f'{SEED_PREFIX}-{start + i:07d}', email=f'{SEED_PREFIX}-{start + i}@example.com', password=password)
+            for i in range(size)
+        ], batch_size=batch_size)
+        user_ids.extend(user.pk for user in created)
+    User.objects.create(username=SEED_STAFF, email=f'{SEED_STAFF}@example.com', password=password, is_staff=True)
+    log(f'{len(user_ids)} usuários e {SEED_STAFF}')
+
+    if user_ids and products:
+        statuses = [status for status, _ in Order.STATUS_CHOICES]
+        for start, size in _batches(volumes['orders'], batch_size):
+            with transaction.atomic():
+                orders, lines = [], []
+                for i in range(size):
+                    cart = rng.sample(products, min(rng.randint(1, items_per_order), len(products)))
+                    quantities = [rng.randint(1, 3) for _ in cart]
+                    subtotal = sum(price * quantity for (_, price, _), quantity in zip(cart, quantities))
+                    orders.append(Order(
+                        user_id=rng.choice(user_ids), order_number=f'{SEED_PREFIX.upper()}-{random_seed}-{start + i:08d}',
+                        total_amount=subtotal + Decimal('15.00'), shipping_cost=Decimal('15.00'),
+                        status=rng.choice(statuses), payment_method='BENCHMARK',
+                    ))
+                    lines.append(list(zip(cart, quantities)))
+                Order.objects.bulk_create(orders, batch_size=batch_size)
+                # created_at tem auto_now_add: espalha as datas depois da inserção
+                for order in orders:
+                    order.created_at = now - timedelta(seconds=rng.randint(0, days * 86400))
+                Order.objects.bulk_update(orders, ['created_at'], batch_size=batch_size)
+                OrderItem.objects.bulk_create([
+                    OrderItem(order_id=order.pk, product_id=pk, category_id=category_id, quantity=quantity, price_at_purchase=price)
+                    for order, items in zip(orders, lines) for (pk, price, category_id), quantity in items
+                ], batch_size=batch_size)
+        log(f'{volumes["orders"]} pedidos')
+
+        for start, size in _batches(volumes['reviews'], batch_size):
+            # Pares (usuário, produto) repetidos são descartados pela restrição única
+            Review.objects.bulk_create([
+                Review(user_id=rng.choice(user_ids), product_id=rng.choice(products)[0], rating=rng.choices(range(1, 6), (1, 1, 2, 4, 5))[0],
+                       comment='Avaliação sintética')
+                for _ in range(size)
+            ], batch_size=batch_size, ignore_conflicts=True)
+        log(f'até {volumes["reviews"]} avaliações')
+
+        owners = rng.sample(user_ids, min(volumes['wishlists'], len(user_ids)))
+        for start, size in _batches(len(owners), batch_size):
+            created = Wishlist.objects.bulk_create([Wishlist(user_id=user_id) for user_id in owners[start:start + size]], batch_size=batch_size)
+            WishlistProduct.objects.bulk_create([
+                WishlistProduct(wishlist_id=wishlist.pk, product_id=pk)
+                for wishlist in created for pk, _, _ in rng.sample(products, min(wishlist_size, len(products)))
+            ], batch_size=batch_size)
+        log(f'{len(owners)} listas de desejos')
+
+    Coupon.objects.bulk_create([
+        Coupon(
+            code=f'{SEED_PREFIX.upper()}-{random_seed}-{i:05d}', discount_type=rng.choice(['PERCENTAGE', 'FIXED']),
+            discount_value=Decimal(rng.choice([5, 10, 15, 20])), expiration_date=now + timedelta(days=rng.randint(-30, 180)),
+            usage_limit=rng.choice([None, 100, 1000]),
+        )
+        for i in range(volumes['coupons'])
+    ], batch_size=batch_size)
+    log(f'{volumes["coupons"]} cupons')
+
+    # bulk_create não passa pelos sinais: recalcula os agregados derivados
+    ratings.rebuild_ratings()
+    wishlists.rebuild_counters()
+    facets.rebuild_facet_counts()
+    search.rebuild_index()
+    sales.rebuild()
+    bump_catalog_version()
+    log('agregados recalculados')
+
+def seeded_data_exists():
+    return User.objects.filter(username__startswith=f'{SEED_PREFIX}-').exists()
+
+def flush():
+    # Remove os dados gerados (pedidos, avaliações e listas saem em cascata com os usuários)
+    with sales.paused(): # Um recálculo no fim em vez de um ajuste por item removido
+        Product.objects.filter(category__name__startswith=f'{SEED_PREFIX.title()} ').delete()
+        Category.objects.filter(name__startswith=f'{SEED_PREFIX.title()} ').delete()
+        Coupon.objects.filter(code__startswith=f'{SEED_PREFIX.upper()}-').delete()
+        User.objects.filter(username__startswith=f'{SEED_PREFIX}-').delete()
+    sales.rebuild()
+    facets.rebuild_facet_counts()
+    bump_catalog_version()
+
+def percentile(values, fraction):
+    # values já ordenados
+    return values[max(int(len(values) * fraction + 0.5) - 1, 0)]
+
+def _admin_only(permission_classes):
+    return any(issubclass(permission, IsAdminUser) for permission in permission_classes)
+
+def router_endpoints(sample_pks, params=None):
+    # (nome, url, só admin) de cada rota GET do router: list, detail e actions extras
+    from .urls import router
+    params = params or {}
+    endpoints = []
+    for prefix, viewset, basename in router.registry:
+        pk = sample_pks.get(basename)
+        admin = _admin_only(viewset.permission_classes)
+        routes = []
+        if hasattr(viewset, 'list'):
+            routes.append((f'{basename}-list', False, admin))
+        if hasattr(viewset, 'retrieve'):
+            routes.append((f'{basename}-detail', True, admin))
+        for extra in viewset.get_extra_actions():
+            if 'get' in extra.mapping:
+                permissions = extra.kwargs.get('permission_classes', viewset.permission_classes)
+                routes.append((f'{basename}-{extra.url_name}', extra.detail, _admin_only(permissions)))
+        for name, detail, admin_only in routes:
+            if name in EXCLUDED_ENDPOINTS or (detail and pk is None):
+                continue
+            url = reverse(name, kwargs={'pk': pk} if detail else None)
+            endpoints.append((name, url + params.get(name, ''), admin_only))
+    return endpoints
+
+def _request(client, url, data=None, method='get'):
+    if method == 'get':
+        return client.get(url)
+    # Escrita: desfeita logo após a resposta, a próxima requisição parte do mesmo estado
+    with transaction.atomic():
+        response = getattr(client, method)(url, data, format='json')
+        transaction.set_rollback(True)
+    return response
+
+def measure(client, url, requests, warmup=5, cold_cache=False, data=None, method='get'):
+    for _ in range(warmup):
+        _request(client, url, data, method)
+    # Consultas medidas à parte: o cursor de depuração pesa na latência
+    if cold_cache:
+        catalog_cache().clear()
+    with CaptureQueriesContext(connection) as ctx:
+        _request(client, url, data, method)
+    queries = len(ctx.captured_queries)
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        if cold_cache:
+            catalog_cache().clear()
+        request_started = time.perf_counter()
+        response = _request(client, url, data, method)
+        latencies.append(time.perf_counter() - request_started)
+        if not 200 <= response.status_code < 300: # A latência de um 403/404 não mede a rota
+            errors += 1
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'url': url,
+        'requests': requests,
+        'errors': errors,
+        'queries': queries,
+        'throughput': round(requests / elapsed, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+def _client(user, host):
+    client = APIClient(HTTP_HOST=host, raise_request_exception=False)
+    client.force_authenticate(user)
+    return client
+
+def staff_user():
+    # O staff gerado por seed() ou, em bancos sem ele, o primeiro staff ativo
+    staff = User.objects.filter(is_staff=True, is_active=True)
+    return staff.filter(username=SEED_STAFF).first() or staff.order_by('pk').first()
+
+def run_endpoints(user, requests=200, warmup=5, cold_cache=False, only=None, host='localhost', writes=True, staff=None, log=print):
+    # Rotas só de admin usam o cliente de `staff`; sem ele ficam de fora (log recebe None)
+    client = _client(user, host)
+    staff_client = _client(staff, host) if staff is not None else None
+    product = Product.objects.order_by('pk').first()
+    order = Order.objects.filter(user=user).order_by('pk').first()
+    sample_pks = {
+        'user': user.pk,
+        'category': Category.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'product': product.pk if product else None,
+        'address': user.addresses.order_by('pk').values_list('pk', flat=True).first(),
+        'order': order.pk if order else None,
+        'orderitem': order.items.order_by('pk').values_list('pk', flat=True).first() if order else None,
+        'review': Review.objects.filter(user=user).order_by('pk').values_list('pk', flat=True).first(),
+        'coupon': Coupon.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'wishlist': Wishlist.objects.filter(user=user).values_list('pk', flat=True).first(),
+    }
+    ids = ','.join(str(pk) for pk in Product.objects.order_by('pk').values_list('pk', flat=True)[:20])
+    params = {'product-search': '?q=produto', 'product-batch': f'?ids={ids}'}
+    results = {}
+    for name, url, admin_only in router_endpoints(sample_pks, params):
+        if only and name not in only:
+            continue
+        if admin_only and staff_client is None:
+            log(name, None)
+            continue
+        results[name] = measure(staff_client if admin_only else client, url, requests, warmup=warmup, cold_cache=cold_cache)
+        log(name, results[name])
+    if writes:
+        results.update(run_writes(user, requests=requests, warmup=warmup, only=only, host=host, log=log))
+    return results
+
+def write_scenarios(user):
+    # (nome, url, corpo) de cada action de escrita do router. Chamada dentro da transação
+    # de run_writes(): a reserva, as mudanças na lista e o cupom preparados aqui são desfeitos.
+    sharded = StockShard.objects.values('product_id')
+    pks = list(Product.objects.filter(stock__gte=10).exclude(pk__in=sharded).order_by('pk').values_list('pk', flat=True)[:24])
+    if len(pks) < 24:
+        return []
+    cart, reserved, wished, others = pks[:3], pks[3], pks[4:14], pks[14:]
+    reservations.enable_sharding(Product(pk=reserved), 4)
+    reservation = reservations.reserve(reserved, 1, user=user)
+    wishlists.add_products(user, wished)
+    wishlists.remove_products(user, others)
+    Coupon.objects.update_or_create(code=WRITE_COUPON, defaults={
+        'discount_type': 'PERCENTAGE', 'discount_value': Decimal('10'), 'expiration_date': None,
+        'is_active': True, 'usage_limit': None,
+    })
+    items = [{'product': pk, 'quantity': 1} for pk in cart]
+    return [
+        ('product-reserve', reverse('product-reserve', kwargs={'pk': reserved}), {'quantity': 1}),
+        ('product-release', reverse('product-release', kwargs={'pk': reserved, 'reservation_id': reservation.pk}), None),
+        ('product-add-to-wishlist', reverse('product-add-to-wishlist', kwargs={'pk': others[0]}), None),
+        ('product-remove-from-wishlist', reverse('product-remove-from-wishlist', kwargs={'pk': wished[0]}), None),
+        ('wishlist-batch', reverse('wishlist-batch'), {'add': others, 'remove': wished}),
+        ('coupon-validate', reverse('coupon-validate'), {'code': WRITE_COUPON, 'subtotal': '100.00'}),
+        ('coupon-redeem', reverse('coupon-redeem'), {'code': WRITE_COUPON}),
+        ('order-checkout', reverse('order-checkout'), {
+            'items': items, 'payment_method': 'BENCHMARK', 'shipping_cost': '15.00', 'coupon': WRITE_COUPON,
+        }),
+    ]
+
+def run_writes(user, requests=200, warmup=5, only=None, host='localhost', log=print):
+    client = _client(user, host)
+    results = {}
+    try:
+        with transaction.atomic():
+            for name, url, data in write_scenarios(user):
+                if only and name not in only:
+                    continue
+                results[name] = measure(client, url, requests, warmup=warmup, data=data, method='post')
+                log(name, results[name])
+            transaction.set_rollback(True)
+    finally:
+        coupons.invalidate(WRITE_COUPON) # O cache guardou o cupom que a transação desfez
+    return results
+
+def baseline(results, options):
+    return {
+        'created_at': timezone.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'machine': platform.machine(),
+        },
+        'data': {
+            'products': Product.objects.count(),
+            'orders': Order.objects.count(),
+            'reviews': Review.objects.count(),
+            'users': User.objects.count(),
+        },
+        'options': options,
+        'results': results,
+    }
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+def save_baseline(path, data):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=2, ensure_ascii=False)
+        file.write('\n')
+
+def compare(previous, current, tolerance=0.2):
+    # Regressão: p95 acima de (1 + tolerância) x baseline, mais consultas ou novos erros
+    regressions = []
+    for name, result in current.items():
+        before = previous.get(name)
+        if before is None:
+            continue
+        if result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append((name, 'p95_ms', before['p95_ms'], result['p95_ms']))
+        if result['queries'] > before['queries']:
+            regressions.append((name, 'queries', before['queries'], result['queries']))
+        if result['errors'] > before['errors']:
+            regressions.append((name, 'errors', before['errors'], result['errors']))
+    return regressions
@@ -0,0 +1,138 @@
+# users/caching.py
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+
+from .routers import primary_reads, reading_from_replica
+
+# Cache versionado das respostas do catálogo (produtos e categorias).
+#
+# Toda chave de cache carrega a "versão do catálogo", um número guardado no
+# próprio cache. Qualquer escrita que mude o que o catálogo exibe (save/delete
+# de Product, Category, variantes e avaliações, baixas de estoque...) chama
+# bump_catalog_version(): as chaves antigas deixam de ser usadas e nunca
+# servimos conteúdo velho, sem depender de TTL.
+#
+# O ETag é derivado da mesma chave (versão + URL + formato), então um cliente
+# que reenviar If-None-Match recebe 304 sem ORM nem serialização. O
+# Last-Modified vem do maior Product.updated_at da resposta; ele é só
+# informativo, porque mudanças como renomear uma categoria ou remover um
+# produto não alteram updated_at. O 304 depende sempre do ETag.
+#
+# Com mais de um processo servindo a API, configure CACHES com um backend
+# compartilhado (Redis, Memcached ou banco): com o LocMemCache padrão cada
+# processo tem a sua própria versão e só enxerga as invalidações que ele fez.
+#
+# Com réplicas (users/routers.py), uma leitura que não acha a entrada no cache
+# é montada no principal e guardada: a réplica pode estar atrasada em relação à
+# versão atual, e o cliente que acabou de escrever receberia do cache o conteúdo
+# antigo. O principal só atende as faltas (uma por URL a cada versão); o
+# tráfego do catálogo sai do cache, e as réplicas ficam com as demais leituras.
+
+VERSION_KEY = 'catalog:version'
+# Só formatos de dados vão para o cache: a API navegável (text/html) traz o
+# usuário logado e o token CSRF da sessão
+CACHEABLE_FORMATS = ('json', 'msgpack')
+
+def catalog_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+def catalog_cache_timeout():
+    # Só limita o uso de memória; a invalidação é pela versão
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 60)
+
+def get_catalog_version():
+    cache = catalog_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Valor inicial baseado no relógio: se a chave for descartada, a nova
+        # versão nunca coincide com uma antiga que ainda esteja no cache
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+def _bump():
+    cache = catalog_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+def bump_catalog_version():
+    # Muda a versão já e de novo depois do commit: entre os dois momentos um
+    # leitor ainda pode guardar dados antigos sob a versão intermediária
+    _bump()
+    transaction.on_commit(_bump)
+
+def latest_updated_at(data):
+    # Maior 'updated_at' entre os itens da resposta (detalhe, lista ou página)
+    if isinstance(data, dict):
+        items = data.get('results', [data])
+    else:
+        items = data
+    dates = [parse_datetime(item['updated_at']) for item in items if isinstance(item, dict) and item.get('updated_at')]
+    return max((date for date in dates if date), default=None)
+
+def _etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return header.strip() == '*' or etag in [value.strip() for value in header.split(',')]
+
+class CatalogCacheMixin:
+    # Para viewsets do catálogo: list e retrieve passam pelo cache versionado
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    def get_catalog_cache_key(self, request):
+        media_type = request.accepted_renderer.media_type if getattr(request, 'accepted_renderer', None) else ''
+        # O host entra na chave porque os links de paginação são URLs absolutas
+        return f'catalog:{get_catalog_version()}:{self.basename}:{self.action}:{media_type}:{request.get_host()}{request.get_full_path()}'
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        renderer = getattr(request, 'accepted_renderer', None)
+        if renderer is None or renderer.format not in CACHEABLE_FORMATS:
+            return handler(request, *args, **kwargs)
+        cache = catalog_cache()
+        key = self.get_catalog_cache_key(request)
+        etag = '"%s"' % hashlib.md5(key.encode()).hexdigest()
+        if _etag_matches(request, etag):
+            return self._finalize_cached(HttpResponseNotModified(), etag, None)
+
+        entry = cache.get(key)
+        if entry is not None:
+            response = HttpResponse(entry['content'], content_type=entry['content_type'])
+            return self._finalize_cached(response, etag, entry['last_modified'])
+
+        if reading_from_replica():
+            with primary_reads():
+                response = handler(request, *args, **kwargs)
+        else:
+            response = handler(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        last_modified = latest_updated_at(response.data)
+
+        def store(rendered):
+            cache.set(key, {
+                'content': rendered.content,
+                'content_type': rendered['Content-Type'],
+                'last_modified': last_modified,
+            }, catalog_cache_timeout())
+        response.add_post_render_callback(store)
+        return self._finalize_cached(response, etag, last_modified)
+
+    def _finalize_cached(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        patch_vary_headers(response, ['Accept'])
+        return response
@@ -0,0 +1,185 @@
+# users/catalog_io.py
+import csv
+import json
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from . import facets, search
+from .caching import bump_catalog_version
+from .models import Category, Product
+
+# Importação e exportação do catálogo em CSV ou JSONL (um objeto JSON por linha).
+#
+# Os dois lados trabalham em fluxo: a exportação lê os produtos com iterator()
+# e escreve linha a linha; a importação lê uma linha por vez e grava em lotes
+# com bulk_create/bulk_update. O uso de memória não depende do tamanho do arquivo.
+#
+# Colunas: id, name, description, price, stock, main_image_url, category, variations.
+# 'category' é o nome da categoria (criada se não existir). Na importação a
+# chave de correspondência é 'id' (linhas sem id criam produtos) ou 'name'.
+# Só as colunas presentes na linha são atualizadas em produtos existentes.
+#
+# bulk_create/bulk_update não disparam sinais: ao fim de cada lote o índice de
+# busca é atualizado, e ao fim da importação as contagens de facetas são
+# recalculadas e a versão do catálogo é incrementada.
+
+FIELDS = ('id', 'name', 'description', 'price', 'stock', 'main_image_url', 'category', 'variations')
+FORMATS = ('csv', 'jsonl')
+
+def guess_format(path, default='csv'):
+    for fmt in FORMATS:
+        if path.endswith(f'.{fmt}') or (fmt == 'jsonl' and path.endswith('.ndjson')):
+            return fmt
+    return default
+
+def read_rows(stream, fmt):
+    # Gera (número da linha, dicionário) sem carregar o arquivo inteiro
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_number, exc
+            continue
+        yield line_number, row if isinstance(row, dict) else ValueError('a linha não é um objeto JSON')
+
+def export_products(stream, fmt, batch_size=2000):
+    # Escreve todos os produtos no fluxo e retorna quantos foram exportados
+    columns = [field if field != 'category' else 'category__name' for field in FIELDS]
+    rows = Product.objects.order_by('pk').values_list(*columns).iterator(chunk_size=batch_size)
+    writer = csv.writer(stream) if fmt == 'csv' else None
+    if writer:
+        writer.writerow(FIELDS)
+    total = 0
+    for row in rows:
+        if writer:
+            writer.writerow(['' if value is None else value for value in row])
+        else:
+            record = dict(zip(FIELDS, row))
+            record['price'] = str(record['price'])
+            stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        total += 1
+    return total
+
+class ProductImporter:
+    # Uso: importer.feed(linha, dados) para cada linha e importer.finish() no final.
+    # Erros de uma linha são informados por on_error(linha, mensagem) e não
+    # interrompem o lote.
+    def __init__(self, key='id', batch_size=1000, on_error=None, on_batch=None):
+        self.key = key
+        self.batch_size = batch_size
+        self.on_error = on_error or (lambda line, message: None)
+        self.on_batch = on_batch or (lambda importer: None)
+        self.categories = dict(Category.objects.values_list('name', 'pk')) # Mapa nome -> id em memória
+        self.pending = {}
+        self.created = self.updated = self.failed = 0
+
+    def category_id(self, name):
+        if name is not None and not isinstance(name, str): # Ex.: {"category": 3} em JSONL
+            raise ValueError('category: informe o nome da categoria')
+        name = (name or '').strip()
+        if not name:
+            return None
+        if name not in self.categories:
+            self.categories[name] = Category.objects.get_or_create(name=name)[0].pk
+        return self.categories[name]
+
+    def parse(self, row):
+        values = {}
+        for field in FIELDS:
+            if field not in row:
+                continue
+            value = row[field]
+            if isinstance(value, str):
+                value = value.strip()
+            if field == 'category':
+                values['category_id'] = self.category_id(value)
+                continue
+            if value in ('', None):
+                value = None
+            if field == 'id':
+                if value is not None:
+                    values['id'] = int(value)
+                continue
+            if field == 'price' and isinstance(value, float):
+                value = Decimal(str(value))
+            model_field = Product._meta.get_field(field)
+            if value is None and not model_field.null:
+                raise ValueError(f'{field}: campo obrigatório')
+            values[field] = model_field.clean(value, None)
+        return values
+
+    def feed(self, line, row):
+        if isinstance(row, Exception):
+            return self.error(line, f'JSON inválido ({row})')
+        try:
+            values = self.parse(row)
+        except ValidationError as exc:
+            return self.error(line, '; '.join(exc.messages))
+        except (TypeError, ValueError) as exc:
+            return self.error(line, str(exc))
+        identity = values.get(self.key)
+        if identity is None:
+            if self.key == 'name':
+                return self.error(line, 'name: campo obrigatório')
+            identity = ('new', line) # Sem id: sempre cria
+        # Linhas repetidas no mesmo lote: a última vence
+        self.pending[identity] = (line, values)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def error(self, line, message):
+        self.failed += 1
+        self.on_error(line, message)
+
+    def existing_ids(self, identities):
+        if self.key == 'id':
+            return {pk: pk for pk in Product.objects.filter(pk__in=identities).values_list('pk', flat=True)}
+        # Por nome: se houver produtos com o mesmo nome, atualiza o mais antigo
+        rows = Product.objects.filter(name__in=identities).order_by('-pk').values_list('name', 'pk')
+        return dict(rows)
+
+    def flush(self):
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, {}
+        existing = self.existing_ids([identity for identity in pending if not isinstance(identity, tuple)])
+        to_create, to_update = [], {}
+        for identity, (line, values) in pending.items():
+            pk = existing.get(identity)
+            if pk is None:
+                if 'name' not in values or 'price' not in values:
+                    self.error(line, 'name e price são obrigatórios para criar um produto')
+                    continue
+                if self.key == 'name':
+                    values.pop('id', None)
+                to_create.append(Product(**values))
+            else:
+                values['id'] = pk
+                # bulk_update exige a mesma lista de campos: agrupa as linhas pelas colunas enviadas
+                fields = tuple(sorted(field for field in values if field != 'id')) + ('updated_at',)
+                to_update.setdefault(fields, []).append(Product(updated_at=timezone.now(), **values))
+        with transaction.atomic():
+            created = Product.objects.bulk_create(to_create)
+            for fields, products in to_update.items():
+                Product.objects.bulk_update(products, fields)
+            search.index_products([product.pk for product in created] + [
+                product.pk for products in to_update.values() for product in products
+            ])
+        self.created += len(created)
+        self.updated += sum(len(products) for products in to_update.values())
+        self.on_batch(self)
+
+    def finish(self):
+        self.flush()
+        facets.rebuild_facet_counts()
+        bump_catalog_version()
@@ -0,0 +1,120 @@
+# users/checkout.py
+import uuid
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Exists, F, OuterRef, Q, Value, When
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import coupons, facets, reservations, sales
+from .caching import bump_catalog_version
+from .models import Address, Order, OrderItem, Product, StockShard
+
+# Finalização de pedido em uma única transação, com número fixo de consultas
+# independente do tamanho do carrinho:
+#   1. uma leitura em lote dos produtos (preços) e do endereço, fora da transação;
+#   2. um único UPDATE condicional que baixa o estoque de todos os itens
+#      (WHERE (id=1 AND stock>=2) OR (id=7 AND stock>=1) ...); se alguma linha
+#      não for atualizada, há falta de estoque e a transação é desfeita;
+#      Itens com reserva de estoque (ver users/reservations.py) não baixam
+#      Product.stock: a reserva é consumida com um único DELETE;
+#   3. resgate do cupom (UPDATE condicional, ver users/coupons.py), se houver;
+#   4. INSERT do pedido e bulk_create dos itens;
+#   5. resumos de vendas (ver users/sales.py), com número fixo de comandos.
+# O UPDATE é o primeiro comando da transação, então no SQLite o bloqueio de
+# escrita é pego logo de início e o busy_timeout faz os concorrentes esperarem.
+
+class InsufficientStock(Exception):
+    def __init__(self, products=()):
+        super().__init__('Estoque insuficiente para um ou mais produtos.')
+        self.products = list(products) # Ids dos produtos sem a quantidade pedida
+
+def generate_order_number():
+    return f"PED-{uuid.uuid4().hex[:12].upper()}"
+
+def merge_cart_items(items):
+    # Soma quantidades de produtos repetidos (um produto por pedido em OrderItem)
+    quantities = {}
+    for item in items:
+        quantities[item['product']] = quantities.get(item['product'], 0) + item['quantity']
+    return quantities
+
+def place_order(user, items, payment_method, shipping_address=None, shipping_cost=Decimal('0.00'), coupon=None):
+    quantities = merge_cart_items(items)
+    stock_quantities = merge_cart_items(item for item in items if not item.get('reservation'))
+    # Reservas repetidas já foram recusadas por CheckoutSerializer.validate_items
+    reserved = {item['reservation']: (item['product'], item['quantity']) for item in items if item.get('reservation')}
+    # Produto com reserva sai inteiro das reservas: a quantidade reservada deve cobrir todo o carrinho
+    reserved_quantities = merge_cart_items({'product': pk, 'quantity': quantity} for pk, quantity in reserved.values())
+    uncovered = sorted(pk for pk, quantity in reserved_quantities.items() if quantity != quantities[pk])
+    if uncovered:
+        raise ValidationError({'items': f'A quantidade reservada não corresponde ao carrinho para: {uncovered}'})
+
+    # Preços, categorias e se o produto usa estoque fatiado, na mesma consulta
+    sharded = Exists(StockShard.objects.filter(product=OuterRef('pk')))
+    products = Product.objects.only('pk', 'price', 'category_id').annotate(sharded=sharded).in_bulk(list(quantities))
+    missing = sorted(set(quantities) - set(products))
+    if missing:
+        raise ValidationError({'items': f'Produtos não encontrados: {missing}'})
+    needs_reservation = sorted(pk for pk in stock_quantities if products[pk].sharded)
+    if needs_reservation:
+        raise ValidationError({'items': f'Estes produtos exigem reserva de estoque: {needs_reservation}'})
+
+    address = None
+    if shipping_address is not None:
+        address = Address.objects.filter(pk=shipping_address, user=user).first()
+        if address is None:
+            raise ValidationError({'shipping_address': 'Endereço não encontrado.'})
+
+    subtotal = sum((products[pk].price * quantity for pk, quantity in quantities.items()), Decimal('0.00'))
+    discount = coupons.validate_coupon(coupon, subtotal)['discount_amount'] if coupon else Decimal('0.00')
+
+    condition = Q()
+    for pk, quantity in stock_quantities.items():
+        condition |= Q(pk=pk, stock__gte=quantity)
+    decrement = Case(*[When(pk=pk, then=Value(quantity)) for pk, quantity in stock_quantities.items()], default=Value(0))
+
+    try:
+        with transaction.atomic():
+            if stock_quantities:
+                updated = Product.objects.filter(condition).update(stock=F('stock') - decrement, updated_at=timezone.now())
+                if updated != len(stock_quantities):
+                    raise InsufficientStock() # Desfaz as baixas já aplicadas
+
+                # Produtos que zeraram o estoque agora mudam de faceta (em estoque -> esgotado)
+                depleted = Product.objects.filter(pk__in=list(stock_quantities), stock=0).count()
+                if depleted:
+                    facets.stock_availability_changed(depleted=depleted)
+                bump_catalog_version() # O estoque aparece no catálogo
+
+            if reserved and not reservations.consume(reserved, user):
+                raise ValidationError({'items': 'Reserva de estoque expirada ou inválida.'})
+
+            if coupon:
+                coupons.redeem_coupon(coupon) # Se falhar, a baixa de estoque é desfeita junto
+
+            order = Order.objects.create(
+                user=user,
+                order_number=generate_order_number(),
+                total_amount=subtotal - discount + shipping_cost,
+                shipping_cost=shipping_cost,
+                payment_method=payment_method,
+                shipping_address=address,
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product_id=pk, category_id=products[pk].category_id, quantity=quantity, price_at_purchase=products[pk].price)
+                for pk, quantity in quantities.items()
+            ])
+            # bulk_create não dispara sinais: os itens entram nos resumos de vendas aqui
+            sales.items_added(order, [
+                (pk, products[pk].category_id, quantity, products[pk].price) for pk, quantity in quantities.items()
+            ])
+    except InsufficientStock:
+        # Fora da transação desfeita, informa quais produtos não têm a quantidade pedida
+        unavailable = sorted(
+            pk for pk, stock in Product.objects.filter(pk__in=list(stock_quantities)).values_list('pk', 'stock')
+            if stock < stock_quantities[pk]
+        )
+        raise InsufficientStock(unavailable)
+    return order
@@ -0,0 +1,68 @@
+# users/coupons.py
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import Coupon
+
+# Validação e resgate de cupons.
+# - Validação: os dados do cupom ficam no cache (por padrão o LocMemCache, em
+#   memória do processo), indexados pelo código. O sinal de save/delete de
+#   Coupon apaga a entrada, então uma alteração no admin vale na hora. Códigos
+#   inexistentes também são guardados, para não ir ao banco a cada tentativa.
+# - Resgate: um único UPDATE condicional incrementa times_used só se o cupom
+#   estiver ativo, dentro da validade e abaixo do limite de usos. Não há
+#   leitura-e-escrita nem lock de linha: o próprio banco garante o limite.
+
+CACHE_TIMEOUT = 60 * 60 # Rede de segurança; a invalidação normal é pelo sinal
+MISSING = 'missing' # Marca de código inexistente no cache
+SNAPSHOT_FIELDS = ('id', 'code', 'discount_type', 'discount_value', 'expiration_date', 'is_active', 'usage_limit', 'times_used')
+
+def cache_key(code):
+    return f'coupon:{code}'
+
+def invalidate(code):
+    cache.delete(cache_key(code))
+
+def get_coupon_data(code):
+    data = cache.get(cache_key(code))
+    if data is None:
+        data = Coupon.objects.filter(code=code).values(*SNAPSHOT_FIELDS).first() or MISSING
+        cache.set(cache_key(code), data, CACHE_TIMEOUT)
+    return None if data == MISSING else data
+
+def compute_discount(data, subtotal):
+    if subtotal is None:
+        return None
+    if data['discount_type'] == 'PERCENTAGE':
+        discount = subtotal * data['discount_value'] / Decimal('100')
+    else:
+        discount = data['discount_value']
+    return min(discount, subtotal).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+def validate_coupon(code, subtotal=None):
+    # Valida pelo cache. O limite de usos é conferido de novo no resgate, no banco.
+    data = get_coupon_data(code)
+    if data is None:
+        raise ValidationError({'code': 'Cupom não encontrado.'})
+    if not data['is_active']:
+        raise ValidationError({'code': 'Cupom inativo.'})
+    if data['expiration_date'] is not None and data['expiration_date'] <= timezone.now():
+        raise ValidationError({'code': 'Cupom expirado.'})
+    if data['usage_limit'] is not None and data['times_used'] >= data['usage_limit']:
+        raise ValidationError({'code': 'Cupom esgotado.'})
+    return {**data, 'discount_amount': compute_discount(data, subtotal)}
+
+def redeem_coupon(code):
+    # Um único UPDATE ... WHERE ... que só afeta a linha se o cupom ainda puder ser usado
+    updated = Coupon.objects.filter(
+        Q(expiration_date__isnull=True) | Q(expiration_date__gt=timezone.now()),
+        Q(usage_limit__isnull=True) | Q(times_used__lt=F('usage_limit')),
+        code=code, is_active=True,
+    ).update(times_used=F('times_used') + 1)
+    if not updated:
+        invalidate(code) # O cache pode estar desatualizado (ex.: cupom esgotou)
+        raise ValidationError({'code': 'Cupom inválido, expirado ou esgotado.'})
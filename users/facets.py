@@ -0,0 +1,126 @@
+# users/facets.py
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .caching import bump_catalog_version
+from .models import Product, ProductFacetCount
+
+# Facetas do catálogo com contagens pré-calculadas.
+# Cada produto contribui com um valor por faceta (categoria, faixa de preço e
+# disponibilidade). Quando um produto muda, decrementamos as facetas antigas e
+# incrementamos as novas, então a listagem lê as contagens prontas em vez de
+# fazer GROUP BY sobre Product a cada requisição.
+
+# Faixas de preço: (valor da faceta, mínimo inclusivo, máximo exclusivo)
+PRICE_BUCKETS = [
+    ('0-50', Decimal('0'), Decimal('50')),
+    ('50-100', Decimal('50'), Decimal('100')),
+    ('100-200', Decimal('100'), Decimal('200')),
+    ('200+', Decimal('200'), None),
+]
+
+FACET_FIELDS = ('category_id', 'price', 'stock')
+
+def price_bucket(price):
+    price = Decimal(price or 0)
+    for value, minimum, maximum in PRICE_BUCKETS:
+        if price >= minimum and (maximum is None or price < maximum):
+            return value
+    return PRICE_BUCKETS[0][0]
+
+def facet_values(category_id, price, stock):
+    return [
+        ('category', str(category_id) if category_id else ''),
+        ('price', price_bucket(price)),
+        ('in_stock', 'true' if (stock or 0) > 0 else 'false'),
+    ]
+
+def _previous_facet_values(instance):
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is None:
+        return [] # Produto novo: não há facetas antigas
+    if not all(field in loaded for field in FACET_FIELDS):
+        # Instância carregada com only()/defer(): buscamos os campos que faltam
+        row = Product.objects.filter(pk=instance.pk).values(*FACET_FIELDS).first()
+        if row is None:
+            return []
+        loaded = {**row, **loaded}
+    return facet_values(loaded['category_id'], loaded['price'], loaded['stock'])
+
+def _current_facet_values(instance):
+    return facet_values(instance.category_id, instance.price, instance.stock)
+
+def _apply_delta(facet, value, delta):
+    updated = ProductFacetCount.objects.filter(facet=facet, value=value).update(count=F('count') + delta)
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            ProductFacetCount.objects.create(facet=facet, value=value, count=delta)
+    except IntegrityError:
+        # Outra requisição criou a linha ao mesmo tempo: basta aplicar o incremento
+        ProductFacetCount.objects.filter(facet=facet, value=value).update(count=F('count') + delta)
+
+def product_saved(instance):
+    old = set(_previous_facet_values(instance))
+    new = set(_current_facet_values(instance))
+    with transaction.atomic():
+        for facet, value in old - new:
+            _apply_delta(facet, value, -1)
+        for facet, value in new - old:
+            _apply_delta(facet, value, 1)
+    instance._loaded_values = {field: getattr(instance, field) for field in FACET_FIELDS}
+
+def product_deleted(instance):
+    with transaction.atomic():
+        for facet, value in _current_facet_values(instance):
+            _apply_delta(facet, value, -1)
+
+def stock_availability_changed(depleted=0, restocked=0):
+    # Mudanças de estoque feitas com update() (checkout, reservas) não passam pelo
+    # save(): recebem quantos produtos esgotaram/voltaram e ajustam a faceta direto
+    delta = restocked - depleted
+    if not delta:
+        return
+    with transaction.atomic():
+        _apply_delta('in_stock', 'true', delta)
+        _apply_delta('in_stock', 'false', -delta)
+
+def _facet_rows():
+    return ProductFacetCount.objects.filter(count__gt=0).values_list('facet', 'value', 'count')
+
+def _group_facets(rows):
+    facets = {'category': [], 'price': [], 'in_stock': []}
+    for facet, value, count in rows:
+        facets.setdefault(facet, []).append({'value': value, 'count': count})
+    return facets
+
+def get_facet_counts():
+    # Uma única consulta à tabela de contagens, agrupada por faceta na aplicação
+    return _group_facets(_facet_rows())
+
+async def aget_facet_counts():
+    return _group_facets([row async for row in _facet_rows()])
+
+def rebuild_facet_counts():
+    # Recalcula todas as contagens a partir de Product (use após cargas em massa)
+    counts = {}
+    for row in Product.objects.values('category_id').annotate(total=Count('pk')):
+        key = ('category', str(row['category_id']) if row['category_id'] else '')
+        counts[key] = counts.get(key, 0) + row['total']
+    for row in Product.objects.values('price').annotate(total=Count('pk')):
+        key = ('price', price_bucket(row['price']))
+        counts[key] = counts.get(key, 0) + row['total']
+    in_stock = Product.objects.filter(stock__gt=0).count()
+    counts[('in_stock', 'true')] = in_stock
+    counts[('in_stock', 'false')] = Product.objects.count() - in_stock
+    with transaction.atomic():
+        ProductFacetCount.objects.all().delete()
+        ProductFacetCount.objects.bulk_create([
+            ProductFacetCount(facet=facet, value=value, count=count)
+            for (facet, value), count in counts.items()
+        ])
+    bump_catalog_version()
+    return len(counts)
@@ -0,0 +1,70 @@
+# users/filters.py
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import ProductVariant, VariantOption
+
+# Filtros do catálogo via query string:
+#   ?category=3&min_price=10&max_price=99.90&in_stock=true&variation=Tamanho:M
+# 'variation' pode ser repetido ('Tamanho:M' e 'Cor:Azul'); todas as opções
+# precisam estar na mesma variante. Sem 'Nome:', casa o valor em qualquer atributo.
+# Maiúsculas e minúsculas não importam: compara com a forma normalizada das opções.
+# Com in_stock=true, a variante encontrada também precisa ter estoque.
+
+TRUE_VALUES = ('1', 'true', 'sim')
+FALSE_VALUES = ('0', 'false', 'nao', 'não')
+
+def _decimal_param(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        value = Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({name: 'Informe um valor numérico.'})
+    if not value.is_finite(): # NaN e Infinity passam pelo Decimal, mas não pelo ORM
+        raise ValidationError({name: 'Informe um valor numérico.'})
+    return value
+
+class ProductFilterBackend(BaseFilterBackend):
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        category = params.get('category')
+        if category:
+            if not category.isdigit():
+                raise ValidationError({'category': 'Informe o id da categoria.'})
+            queryset = queryset.filter(category_id=int(category))
+
+        min_price = _decimal_param(params, 'min_price')
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        max_price = _decimal_param(params, 'max_price')
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+
+        in_stock = params.get('in_stock', '').lower()
+        if in_stock in TRUE_VALUES:
+            queryset = queryset.filter(stock__gt=0)
+        elif in_stock in FALSE_VALUES:
+            queryset = queryset.filter(stock__lte=0)
+        elif in_stock:
+            raise ValidationError({'in_stock': 'Use true ou false.'})
+
+        variations = params.getlist('variation')
+        if variations:
+            variants = ProductVariant.objects.all()
+            for variation in variations:
+                name, separator, value = variation.partition(':')
+                # Cada filter() sobre o M2M gera um novo JOIN: todas as opções na mesma variante
+                if separator:
+                    variants = variants.filter(options__name_key=VariantOption.normalize(name), options__value_key=VariantOption.normalize(value))
+                else:
+                    variants = variants.filter(options__value_key=VariantOption.normalize(variation))
+            if in_stock in TRUE_VALUES:
+                variants = variants.filter(stock__gt=0)
+            queryset = queryset.filter(pk__in=variants.values('product_id'))
+
+        return queryset
@@ -0,0 +1,89 @@
+import logging
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from users import benchmarking
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede as rotas do router (users/urls.py) em processo: vazão, p50/p95/p99 e consultas por requisição. '
+        'As actions de escrita (checkout, reservas, lista de desejos, cupons) rodam em transação desfeita no fim, '
+        'sem alterar os dados. Salva o resultado como baseline JSON (--save) e compara com um baseline anterior '
+        '(--compare), falhando quando há regressão. Gere os dados antes com seed_benchmark_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requisições medidas por rota.')
+        parser.add_argument('--warmup', type=int, default=5, help='Requisições de aquecimento por rota (não medidas).')
+        parser.add_argument('--username', help='Usuário autenticado nas requisições (padrão: o gerado com mais pedidos).')
+        parser.add_argument('--staff-username', help=f'Usuário staff das rotas só de admin (padrão: {benchmarking.SEED_STAFF} ou o primeiro staff).')
+        parser.add_argument('--cold-cache', action='store_true', help='Limpa o cache do catálogo antes de cada requisição.')
+        parser.add_argument('--skip-writes', action='store_true', help='Mede só as rotas GET.')
+        parser.add_argument('--only', action='append', help='Mede só esta rota (ex.: product-list); repita para várias.')
+        parser.add_argument('--host', default='localhost', help='Host usado nas requisições (precisa estar em ALLOWED_HOSTS).')
+        parser.add_argument('--save', help='Arquivo JSON onde gravar o baseline.')
+        parser.add_argument('--compare', help='Baseline JSON anterior para comparar.')
+        parser.add_argument('--tolerance', type=float, default=0.2, help='Aumento de p95 aceito antes de acusar regressão (0.2 = 20%%).')
+
+    def handle(self, *args, **options):
+        logging.getLogger('django.request').setLevel(logging.ERROR) # 403/404 esperados não poluem a saída
+        logging.getLogger('users.performance').setLevel(logging.ERROR)
+        user = self.get_user(options['username'])
+        staff = self.get_staff(options['staff_username'])
+        previous = benchmarking.load_baseline(options['compare'])['results'] if options['compare'] else None
+
+        self.stdout.write(f'{"rota":<28} {"req/s":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"consultas":>9} {"erros":>6}')
+        results = benchmarking.run_endpoints(
+            user, requests=options['requests'], warmup=options['warmup'], cold_cache=options['cold_cache'],
+            only=options['only'], host=options['host'], writes=not options['skip_writes'], staff=staff, log=self.report,
+        )
+        failed = sorted(name for name, result in results.items() if result['errors'])
+        if failed:
+            # Baseline com a latência de respostas de erro não serve de referência
+            raise CommandError(f'Respostas fora de 2xx em {len(failed)} rotas: {", ".join(failed)}.')
+        if options['save']:
+            run_options = {key: options[key] for key in ('requests', 'warmup', 'cold_cache', 'skip_writes', 'only')}
+            benchmarking.save_baseline(options['save'], benchmarking.baseline(results, {**run_options, 'username': user.username, 'staff_username': staff.username if staff else None}))
+            self.stdout.write(f'Baseline gravado em {options["save"]}.')
+        if previous is None:
+            return
+        regressions = benchmarking.compare(previous, results, tolerance=options['tolerance'])
+        for name, metric, before, after in regressions:
+            self.stdout.write(self.style.ERROR(f'Regressão em {name}: {metric} {before} -> {after}'))
+        if regressions:
+            raise CommandError(f'{len(regressions)} regressões em relação a {options["compare"]}.')
+        self.stdout.write(self.style.SUCCESS(f'Sem regressões em relação a {options["compare"]}.'))
+
+    def get_user(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f'Usuário "{username}" não encontrado.')
+            return user
+        user = (
+            User.objects.filter(username__startswith=f'{benchmarking.SEED_PREFIX}-')
+            .annotate(total=Count('orders')).order_by('-total', 'pk').first()
+        )
+        if user is None:
+            raise CommandError('Sem dados de benchmark; rode antes `python manage.py seed_benchmark_data` ou informe --username.')
+        return user
+
+    def get_staff(self, username):
+        if username:
+            staff = User.objects.filter(username=username, is_staff=True).first()
+            if staff is None:
+                raise CommandError(f'Usuário staff "{username}" não encontrado.')
+            return staff
+        return benchmarking.staff_user()
+
+    def report(self, name, result):
+        if result is None:
+            self.stdout.write(self.style.WARNING(f'{name:<28} ignorada: rota só de admin e nenhum usuário staff (--staff-username)'))
+            return
+        self.stdout.write(
+            f'{name:<28} {result["throughput"]:9.1f} {result["p50_ms"]:9.2f} {result["p95_ms"]:9.2f} '
+            f'{result["p99_ms"]:9.2f} {result["queries"]:9d} {result["errors"]:6d}'
+        )
@@ -0,0 +1,89 @@
+import logging
+import random
+import threading
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.test import APIClient
+
+from users.models import Category, Order, Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Dispara checkouts concorrentes contra os mesmos produtos e mede a vazão. '
+        'Cria e remove seus próprios dados; rode contra uma cópia do banco.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Clientes simultâneos.')
+        parser.add_argument('--checkouts', type=int, default=50, help='Checkouts por cliente.')
+        parser.add_argument('--products', type=int, default=5, help='Produtos "quentes" disputados.')
+        parser.add_argument('--stock', type=int, default=500, help='Estoque inicial de cada produto.')
+        parser.add_argument('--items', type=int, default=2, help='Produtos distintos por carrinho.')
+        parser.add_argument('--host', default='localhost', help='Host usado nas requisições (precisa estar em ALLOWED_HOSTS).')
+        parser.add_argument('--keep', action='store_true', help='Não remove os dados criados.')
+
+    def handle(self, *args, **options):
+        logging.getLogger('django.request').setLevel(logging.ERROR) # Não registrar cada 409 esperado
+        category = Category.objects.create(name=f'Benchmark {time.time_ns()}')
+        products = [
+            Product.objects.create(name=f'Benchmark {category.pk}-{i}', price=Decimal('10.00'), stock=options['stock'], category=category)
+            for i in range(options['products'])
+        ]
+        users = [User.objects.create_user(username=f'benchmark-{category.pk}-{i}') for i in range(options['threads'])]
+        results = {'created': 0, 'rejected': 0, 'errors': 0}
+        lock = threading.Lock()
+
+        def worker(user):
+            client = APIClient(HTTP_HOST=options['host'], raise_request_exception=False)
+            client.force_authenticate(user)
+            counts = {'created': 0, 'rejected': 0, 'errors': 0}
+            for _ in range(options['checkouts']):
+                cart = random.sample(products, min(options['items'], len(products)))
+                response = client.post('/api/v1/orders/checkout/', {
+                    'items': [{'product': product.pk, 'quantity': random.randint(1, 3)} for product in cart],
+                    'payment_method': 'BENCHMARK',
+                }, format='json')
+                key = {201: 'created', 409: 'rejected'}.get(response.status_code, 'errors')
+                counts[key] += 1
+            connection.close() # Cada thread tem sua própria conexão
+            with lock:
+                for key, value in counts.items():
+                    results[key] += value
+
+        threads = [threading.Thread(target=worker, args=(user,)) for user in users]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        # Verificação de consistência: nada vendido além do estoque
+        sold = {product.pk: 0 for product in products}
+        for product_id, quantity in Order.objects.filter(user__in=users).values_list('items__product_id', 'items__quantity'):
+            sold[product_id] += quantity
+        oversold = [
+            product.pk for product in Product.objects.filter(pk__in=sold)
+            if product.stock < 0 or product.stock != options['stock'] - sold[product.pk]
+        ]
+
+        total = sum(results.values())
+        self.stdout.write(
+            f"{total} checkouts em {elapsed:.2f}s ({total / elapsed:.1f}/s): "
+            f"{results['created']} criados, {results['rejected']} sem estoque, {results['errors']} erros"
+        )
+        if oversold:
+            self.stdout.write(self.style.ERROR(f'Estoque inconsistente nos produtos {oversold}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Estoque consistente: nenhuma venda acima do disponível.'))
+
+        if not options['keep']:
+            Order.objects.filter(user__in=users).delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+            Product.objects.filter(category=category).delete()
+            category.delete()
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.models import Order, Product, Wishlist
+from users.projections import OrderProjection, ProductProjection, WishlistProjection
+from users.serializers import OrderSerializer, ProductSerializer, WishlistSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compara serializers e projeções (.values()) nas listagens de produtos, pedidos e listas de desejos, em linhas/s.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help='Linhas lidas por medição.')
+        parser.add_argument('--repeat', type=int, default=5, help='Medições por caminho (vale a melhor).')
+
+    def measure(self, build, repeat):
+        best, count = None, 0
+        for _ in range(repeat):
+            started = time.perf_counter()
+            count = len(build())
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return count, best
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        listings = [
+            ('produtos', ProductSerializer, ProductProjection, Product.objects.order_by('name', 'id')),
+            ('pedidos', OrderSerializer, OrderProjection, Order.objects.order_by('-created_at', '-id')),
+            ('listas de desejos', WishlistSerializer, WishlistProjection, Wishlist.objects.order_by('pk')),
+        ]
+        for name, serializer_class, projection, queryset in listings:
+            queryset = queryset[:rows]
+            count, serializer_time = self.measure(
+                lambda: serializer_class(serializer_class.setup_eager_loading(queryset), many=True).data, repeat
+            )
+            if not count:
+                self.stdout.write(f'{name}: sem dados no banco, medição ignorada.')
+                continue
+            _, projection_time = self.measure(lambda: projection.build(projection.values(queryset)), repeat)
+            self.stdout.write(
+                f'{name} ({count} linhas): serializer {count / serializer_time:10.0f} linhas/s  '
+                f'projeção {count / projection_time:10.0f} linhas/s  {serializer_time / projection_time:5.1f}x'
+            )
@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from users.models import Order, Product
+from users.renderers import FastJSONRenderer, MessagePackRenderer, msgpack, orjson
+from users.serializers import OrderSerializer, ProductSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compara o JSONRenderer padrão do DRF com os renderizadores rápidos em listagens de produtos e pedidos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Linhas por listagem (repete as existentes se faltar).')
+        parser.add_argument('--repeat', type=int, default=20, help='Renderizações por medição.')
+
+    def listing(self, serializer_class, queryset, rows):
+        data = list(serializer_class(serializer_class.setup_eager_loading(queryset)[:rows], many=True).data)
+        if not data:
+            return []
+        return (data * (rows // len(data) + 1))[:rows]
+
+    def handle(self, *args, **options):
+        renderers = [('json (DRF)', JSONRenderer()), ('fast json', FastJSONRenderer())]
+        if msgpack is not None:
+            renderers.append(('msgpack', MessagePackRenderer()))
+        if orjson is None:
+            self.stdout.write(self.style.WARNING('orjson não instalado: o FastJSONRenderer usa o json padrão.'))
+
+        listings = {
+            'produtos': self.listing(ProductSerializer, Product.objects.all(), options['rows']),
+            'pedidos': self.listing(OrderSerializer, Order.objects.all(), options['rows']),
+        }
+        for name, data in listings.items():
+            if not data:
+                self.stdout.write(f'{name}: sem dados no banco, medição ignorada.')
+                continue
+            self.stdout.write(f'{name} ({len(data)} linhas):')
+            baseline = None
+            for label, renderer in renderers:
+                started = time.perf_counter()
+                for _ in range(options['repeat']):
+                    body = renderer.render(data, renderer.media_type, {})
+                elapsed = (time.perf_counter() - started) / options['repeat']
+                baseline = baseline or elapsed
+                self.stdout.write(
+                    f'  {label:<12} {elapsed * 1000:8.2f} ms  {len(body) / 1024:8.1f} KiB  {baseline / elapsed:5.1f}x'
+                )
@@ -0,0 +1,91 @@
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+
+from users.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a vazão de leituras e escritas concorrentes no SQLite com a configuração padrão '
+        'e com o perfil de produção (SQLITE_PRODUCTION_PROFILE), usando cópias do banco atual.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16, help='Clientes simultâneos.')
+        parser.add_argument('--seconds', type=float, default=5, help='Duração de cada medição.')
+        parser.add_argument('--write-ratio', type=float, default=0.2, help='Fração das operações que escrevem.')
+
+    def handle(self, *args, **options):
+        source = connections['default'].settings_dict
+        if source['ENGINE'] not in ('django.db.backends.sqlite3', 'users.backends.sqlite3'):
+            raise CommandError('O banco padrão não é SQLite.')
+        product_ids = list(Product.objects.values_list('pk', flat=True)[:1000])
+        if not product_ids:
+            raise CommandError('Sem produtos no banco para a medição.')
+
+        workdir = Path(tempfile.mkdtemp(prefix='sqlite-profile-'))
+        try:
+            profiles = {
+                'padrão': {'ENGINE': 'django.db.backends.sqlite3', 'OPTIONS': {}, 'CONN_MAX_AGE': 0},
+                'produção': settings.SQLITE_PRODUCTION_PROFILE,
+            }
+            for label, profile in profiles.items():
+                alias = f'benchmark_{len(connections.settings)}'
+                path = workdir / f'{alias}.sqlite3'
+                # Cópia consistente do banco atual (API de backup do SQLite)
+                with sqlite3.connect(source['NAME']) as origin, sqlite3.connect(path) as target:
+                    origin.backup(target)
+                connections.settings[alias] = {**source, **profile, 'NAME': str(path)}
+                stats = self.run(alias, product_ids, options)
+                elapsed = options['seconds']
+                self.stdout.write(
+                    f'{label:<9} leituras {stats["reads"] / elapsed:8.0f}/s  escritas {stats["writes"] / elapsed:7.0f}/s  '
+                    f'erros "database is locked": {stats["errors"]}'
+                )
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def run(self, alias, product_ids, options):
+        stats = {'reads': 0, 'writes': 0, 'errors': 0}
+        counter = threading.Lock()
+        deadline = time.monotonic() + options['seconds']
+        persistent = connections.settings[alias]['CONN_MAX_AGE'] != 0
+
+        def worker():
+            products = Product.objects.using(alias)
+            while time.monotonic() < deadline:
+                kind = 'writes' if random.random() < options['write_ratio'] else 'reads'
+                try:
+                    if kind == 'writes':
+                        # Lê e depois escreve na mesma transação (padrão do checkout)
+                        with transaction.atomic(using=alias):
+                            pk = random.choice(product_ids)
+                            products.filter(pk=pk).values_list('stock', flat=True).first()
+                            products.filter(pk=pk).update(stock=F('stock') + 1)
+                    else:
+                        offset = random.randrange(max(len(product_ids) - 20, 1))
+                        list(products.order_by('name', 'id').values('id', 'name', 'price', 'stock')[offset:offset + 20])
+                except OperationalError:
+                    kind = 'errors'
+                with counter:
+                    stats[kind] += 1
+                if not persistent:
+                    connections[alias].close() # Sem CONN_MAX_AGE o Django fecha a conexão a cada requisição
+            connections[alias].close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return stats
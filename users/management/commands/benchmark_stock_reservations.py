@@ -0,0 +1,56 @@
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from users import reservations
+from users.models import Category, Product, StockReservation
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a vazão de reservas simultâneas de um produto quente com diferentes números de fatias. '
+        'Cria e remove seus próprios dados; rode contra uma cópia do banco. No SQLite todas as '
+        'escritas são serializadas pelo banco, então o ganho com fatias aparece no Postgres.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8], help='Números de fatias a comparar.')
+        parser.add_argument('--threads', type=int, default=16, help='Clientes simultâneos.')
+        parser.add_argument('--reservations', type=int, default=50, help='Reservas por cliente.')
+
+    def handle(self, *args, **options):
+        category = Category.objects.create(name=f'Benchmark reservas {time.time_ns()}')
+        total = options['threads'] * options['reservations']
+        self.stdout.write(f"{connection.vendor}: {options['threads']} clientes x {options['reservations']} reservas")
+        try:
+            for shards in options['shards']:
+                product = Product.objects.create(name=f'Benchmark {category.pk}-{shards}', price=Decimal('1.00'), stock=total, category=category)
+                reservations.enable_sharding(product, shards)
+                errors = []
+
+                def worker():
+                    for _ in range(options['reservations']):
+                        try:
+                            reservations.reserve(product.pk, 1, ttl=timedelta(minutes=5))
+                        except Exception as exc: # Conta falhas (ex.: banco bloqueado) sem derrubar a medição
+                            errors.append(exc)
+                    connection.close()
+
+                threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+                started = time.perf_counter()
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - started
+                reserved = StockReservation.objects.filter(product=product).count()
+                self.stdout.write(
+                    f'{shards:>3} fatias: {reserved} reservas em {elapsed:.2f}s ({reserved / elapsed:.1f}/s), {len(errors)} falhas'
+                )
+        finally:
+            Product.objects.filter(category=category).delete()
+            category.delete()
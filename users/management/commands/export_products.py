@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from users import catalog_io
+
+
+class Command(BaseCommand):
+    help = 'Exporta todos os produtos em CSV ou JSONL, em fluxo (ver users/catalog_io.py).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="Arquivo de saída ('-' ou omitido para a saída padrão).")
+        parser.add_argument('--format', choices=catalog_io.FORMATS, help='Formato do arquivo (padrão: pela extensão, ou csv).')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Produtos lidos do banco por vez.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or catalog_io.guess_format(path)
+        if path == '-':
+            catalog_io.export_products(self.stdout, fmt, batch_size=options['batch_size'])
+            return
+        with open(path, 'w', newline='', encoding='utf-8') as stream:
+            total = catalog_io.export_products(stream, fmt, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{total} produtos exportados para {path}.'))
@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users import catalog_io
+
+
+class Command(BaseCommand):
+    help = 'Importa produtos de um arquivo CSV ou JSONL em fluxo, criando/atualizando em lotes (ver users/catalog_io.py).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Arquivo de entrada ('-' para a entrada padrão).")
+        parser.add_argument('--format', choices=catalog_io.FORMATS, help='Formato do arquivo (padrão: pela extensão, ou csv).')
+        parser.add_argument('--key', choices=('id', 'name'), default='id', help='Coluna usada para encontrar produtos existentes.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Linhas gravadas por lote.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or catalog_io.guess_format(path)
+
+        def report_error(line, message):
+            self.stderr.write(f'linha {line}: {message}')
+
+        def report_batch(importer):
+            self.stdout.write(f'{importer.created} criados, {importer.updated} atualizados, {importer.failed} com erro...')
+
+        importer = catalog_io.ProductImporter(
+            key=options['key'], batch_size=options['batch_size'], on_error=report_error, on_batch=report_batch
+        )
+        if path == '-':
+            self.load(importer, sys.stdin, fmt) # A entrada padrão não é nossa para fechar
+        else:
+            try:
+                stream = open(path, newline='', encoding='utf-8')
+            except OSError as exc:
+                raise CommandError(f'Não foi possível abrir {path}: {exc}')
+            with stream:
+                self.load(importer, stream, fmt)
+        importer.finish()
+        self.stdout.write(self.style.SUCCESS(
+            f'Importação concluída: {importer.created} criados, {importer.updated} atualizados, {importer.failed} com erro.'
+        ))
+
+    def load(self, importer, stream, fmt):
+        for line, row in catalog_io.read_rows(stream, fmt):
+            importer.feed(line, row)
@@ -0,0 +1,87 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga de leitura com clientes lentos e alta concorrência, para comparar WSGI e ASGI. '
+        'Suba os dois servidores e passe um --target para cada, ex.: '
+        'gunicorn ecomerce_project.wsgi -w 4 -b 127.0.0.1:8001 e '
+        'uvicorn ecomerce_project.asgi:application --port 8002, depois '
+        '--target wsgi=http://127.0.0.1:8001/api/v1/products/ '
+        '--target asgi=http://127.0.0.1:8002/api/v1/async/products/'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True, help='nome=URL a medir (repita para comparar).')
+        parser.add_argument('--concurrency', type=int, default=500, help='Conexões simultâneas.')
+        parser.add_argument('--requests', type=int, default=5000, help='Total de requisições por alvo.')
+        parser.add_argument(
+            '--client-delay', type=float, default=0.5,
+            help='Segundos que cada cliente leva para terminar de enviar a requisição (simula rede móvel lenta).'
+        )
+        parser.add_argument('--timeout', type=float, default=30, help='Tempo máximo por requisição, em segundos.')
+
+    async def fetch(self, host, port, path, delay, timeout):
+        started = time.perf_counter()
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        try:
+            request = f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nAccept: application/json\r\nConnection: close\r\n\r\n'.encode()
+            # O cliente lento manda o início da requisição, espera e só depois manda o resto
+            writer.write(request[:16])
+            await writer.drain()
+            await asyncio.sleep(delay)
+            writer.write(request[16:])
+            await writer.drain()
+            status_line = await asyncio.wait_for(reader.readline(), timeout)
+            await asyncio.wait_for(reader.read(), timeout)
+        finally:
+            writer.close()
+        status = int(status_line.split()[1]) if status_line else 0
+        return status, time.perf_counter() - started
+
+    async def run_target(self, url, options):
+        parts = urlsplit(url)
+        if parts.scheme != 'http' or not parts.hostname:
+            raise CommandError(f'URL inválida (use http://host:porta/caminho): {url}')
+        path = parts.path + (f'?{parts.query}' if parts.query else '')
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        latencies, errors = [], 0
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                try:
+                    status, elapsed = await self.fetch(parts.hostname, parts.port or 80, path, options['client_delay'], options['timeout'])
+                except (OSError, asyncio.TimeoutError):
+                    errors += 1
+                    return
+                if status != 200:
+                    errors += 1
+                    return
+                latencies.append(elapsed)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(options['requests'])])
+        return latencies, errors, time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        for target in options['target']:
+            name, separator, url = target.partition('=')
+            if not separator:
+                name, url = target, target
+            latencies, errors, elapsed = asyncio.run(self.run_target(url, options))
+            if not latencies:
+                self.stdout.write(f'{name}: nenhuma requisição bem-sucedida ({errors} erros).')
+                continue
+            latencies.sort()
+            p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+            p99 = latencies[max(int(len(latencies) * 0.99) - 1, 0)]
+            self.stdout.write(
+                f'{name:<8} {len(latencies) / elapsed:8.1f} req/s  p50 {statistics.median(latencies) * 1000:7.0f} ms  '
+                f'p95 {p95 * 1000:7.0f} ms  p99 {p99 * 1000:7.0f} ms  erros {errors}'
+            )
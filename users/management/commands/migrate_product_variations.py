@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from users import variants
+
+
+class Command(BaseCommand):
+    help = 'Converte o texto de Product.variations em variantes estruturadas (ProductVariant), em lotes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Produtos processados por lote.')
+        parser.add_argument(
+            '--copy-stock', action='store_true',
+            help='Copia o estoque do produto para todas as variantes (por padrão só quando há uma única combinação).'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_pk, total_products, total_variants = 0, 0, 0
+        while True:
+            # Paginação por chave (pk > último visto) para não reler produtos já convertidos
+            batch = list(variants.products_to_migrate().filter(pk__gt=last_pk).only('pk', 'variations', 'stock')[:batch_size])
+            if not batch:
+                break
+            total_variants += variants.create_variants(batch, copy_stock=options['copy_stock'])
+            total_products += len(batch)
+            last_pk = batch[-1].pk
+            self.stdout.write(f'{total_products} produtos processados...')
+        self.stdout.write(self.style.SUCCESS(f'{total_variants} variantes criadas para {total_products} produtos.'))
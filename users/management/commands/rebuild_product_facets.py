@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users import facets
+
+
+class Command(BaseCommand):
+    help = 'Recalcula as contagens de facetas do catálogo a partir dos produtos.'
+
+    def handle(self, *args, **options):
+        total = facets.rebuild_facet_counts()
+        self.stdout.write(self.style.SUCCESS(f'{total} contagens de facetas recalculadas.'))
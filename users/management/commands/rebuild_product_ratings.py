@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users import ratings
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os agregados de avaliação (quantidade, média e histograma) de todos os produtos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Produtos atualizados por lote.')
+
+    def handle(self, *args, **options):
+        total = ratings.rebuild_ratings(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Agregados de avaliação recalculados para {total} produtos.'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from users import search
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de busca textual (FTS5) dos produtos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Produtos inseridos por lote.')
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            self.stdout.write(self.style.WARNING('O banco atual não é SQLite; a busca usa filtros simples e não há índice para reconstruir.'))
+            return
+        total = search.rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Índice de busca reconstruído com {total} produtos.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users import sales
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os resumos de vendas (por dia, categoria, produto e cliente) a partir dos pedidos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Linhas inseridas por lote.')
+
+    def handle(self, *args, **options):
+        total = sales.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Resumos de vendas recalculados para {total} dias.'))
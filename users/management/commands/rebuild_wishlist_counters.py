@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users import wishlists
+
+
+class Command(BaseCommand):
+    help = 'Recalcula Product.wished_by_count (em quantas listas de desejos cada produto está).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Produtos atualizados por lote.')
+
+    def handle(self, *args, **options):
+        total = wishlists.rebuild_counters(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Contadores recalculados para {total} produtos em listas de desejos.'))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users import benchmarking
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera dados sintéticos reprodutíveis (categorias, produtos, usuários, pedidos, avaliações, cupons e '
+        'listas de desejos) com bulk_create em lotes, para os benchmarks. Use --scale para chegar aos milhões, '
+        'ex.: --scale 50 gera 1 milhão de produtos e 2,5 milhões de pedidos. Rode contra uma cópia do banco.'
+    )
+
+    def add_arguments(self, parser):
+        for name, default in benchmarking.DEFAULT_VOLUMES.items():
+            parser.add_argument(f'--{name}', type=int, default=default, help=f'Quantidade base (padrão {default}).')
+        parser.add_argument('--scale', type=float, default=1, help='Multiplica todas as quantidades.')
+        parser.add_argument('--seed', type=int, default=42, help='Semente dos dados; a mesma semente gera os mesmos dados.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Linhas por bulk_create.')
+        parser.add_argument('--days', type=int, default=365, help='Janela de datas dos pedidos, em dias até hoje.')
+        parser.add_argument('--flush', action='store_true', help='Remove os dados gerados antes (e só isso, com --flush-only).')
+        parser.add_argument('--flush-only', action='store_true', help='Só remove os dados gerados.')
+
+    def handle(self, *args, **options):
+        if options['flush'] or options['flush_only']:
+            benchmarking.flush()
+            self.stdout.write('Dados de benchmark anteriores removidos.')
+            if options['flush_only']:
+                return
+        if benchmarking.seeded_data_exists():
+            raise CommandError('Já existem dados de benchmark neste banco; use --flush para recriá-los.')
+        volumes = {name: int(options[name] * options['scale']) for name in benchmarking.DEFAULT_VOLUMES}
+        benchmarking.seed(
+            volumes, batch_size=options['batch_size'], random_seed=options['seed'], days=options['days'],
+            log=lambda message: self.stdout.write(f'  {message}'),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Dados gerados (semente {options["seed"]}). Usuários: {benchmarking.SEED_PREFIX}-0000000... '
+            f'senha "{benchmarking.SEED_PASSWORD}".'
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users import reservations
+from users.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Habilita (ou redistribui) o estoque fatiado com reservas para os produtos informados.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('product_ids', nargs='+', type=int, help='Ids dos produtos.')
+        parser.add_argument('--shards', type=int, default=8, help='Número de fatias por produto.')
+
+    def handle(self, *args, **options):
+        if options['shards'] < 1:
+            raise CommandError('--shards deve ser pelo menos 1.')
+        products = Product.objects.in_bulk(options['product_ids'])
+        missing = sorted(set(options['product_ids']) - set(products))
+        if missing:
+            raise CommandError(f'Produtos não encontrados: {missing}')
+        for product in products.values():
+            rows = reservations.enable_sharding(product, options['shards'])
+            self.stdout.write(f'{product}: {sum(row.available for row in rows)} unidades em {len(rows)} fatias')
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users import reservations
+
+
+class Command(BaseCommand):
+    help = 'Expira as reservas de estoque vencidas e reconcilia o estoque dos produtos fatiados.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Reservas devolvidas por lote.')
+        parser.add_argument('--loop', action='store_true', help='Roda continuamente (processo em segundo plano).')
+        parser.add_argument('--interval', type=float, default=30, help='Segundos entre varreduras com --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            swept = reservations.sweep_expired(batch_size=options['batch_size'])
+            self.stdout.write(f'{swept} reservas vencidas devolvidas ao estoque.')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
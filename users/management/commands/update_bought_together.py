@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from users import recommendations
+
+
+class Command(BaseCommand):
+    help = 'Soma os pedidos novos às coocorrências de produtos e atualiza os "comprados juntos".'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Descarta as coocorrências e reprocessa todos os pedidos.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Pedidos processados por lote.')
+
+    def handle(self, *args, **options):
+        update = recommendations.rebuild if options['rebuild'] else recommendations.fold_orders
+        orders, products = update(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{orders} pedidos processados, {products} produtos atualizados.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from users import similarity
+
+
+class Command(BaseCommand):
+    help = 'Recalcula os produtos semelhantes (TF-IDF de nome, descrição e categoria) dos produtos alterados.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recalcula os semelhantes de todos os produtos.')
+
+    def handle(self, *args, **options):
+        total = similarity.refresh_similar(rebuild=options['rebuild'])
+        self.stdout.write(self.style.SUCCESS(f'Semelhantes recalculados para {total} produtos.'))
@@ -0,0 +1,252 @@
+# users/metrics.py
+import ipaddress
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+# Instrumentação das requisições da API (users/urls.py).
+#
+# MetricsMiddleware mede, por requisição: número e tempo das consultas SQL
+# (execute_wrapper em todas as conexões), tempo de serialização (serializers
+# com EagerLoadingMixin e projeções das listagens) e tempo de renderização
+# (da chamada a response.render() até o fim dela). Tudo é marcado com a
+# viewset e a action que atenderam a requisição.
+#
+# Saídas:
+# - cabeçalho Server-Timing (db, serializer, render, total), visível no
+#   DevTools do navegador; desligue com METRICS_SERVER_TIMING = False;
+# - log WARNING em 'users.performance' para requisições acima de
+#   SLOW_REQUEST_THRESHOLD_MS, com as consultas mais lentas e as repetidas (N+1);
+# - /metrics no formato texto do Prometheus, com histograma de latência e
+#   totais de SQL/serialização/renderização. Acesso liberado para os IPs de
+#   METRICS_ALLOWED_IPS e para usuários staff.
+#
+# Os números ficam na memória do processo: com vários workers, cada um expõe
+# os seus (o Prometheus soma as séries ao agregar por rótulo). Consultas feitas
+# em threads próprias (lote com "parallel") não entram na conta.
+
+logger = logging.getLogger('users.performance')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10) # Padrão dos clientes Prometheus
+MAX_RECORDED_QUERIES = 500 # SQL guardado por requisição para o log de lentas
+
+_current = ContextVar('request_metrics', default=None)
+
+def slow_request_threshold():
+    return getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 500) / 1000
+
+def server_timing_enabled():
+    return getattr(settings, 'METRICS_SERVER_TIMING', True)
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.queries = [] # (duração, sql)
+        self.timings = {'serializer': 0.0, 'render': 0.0}
+        self._open = set() # Fases em andamento: chamadas aninhadas não contam duas vezes
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.sql_count += 1
+            self.sql_time += duration
+            if len(self.queries) < MAX_RECORDED_QUERIES:
+                self.queries.append((duration, sql))
+
+    def start(self, phase):
+        if phase in self._open:
+            return None
+        self._open.add(phase)
+        return time.perf_counter()
+
+    def stop(self, phase, started):
+        if started is not None:
+            self._open.discard(phase)
+            self.timings[phase] += time.perf_counter() - started
+
+@contextmanager
+def timed(phase):
+    # Soma o tempo do bloco na fase da requisição atual (fora de requisição não faz nada)
+    metrics = _current.get()
+    started = metrics.start(phase) if metrics is not None else None
+    try:
+        yield
+    finally:
+        if started is not None:
+            metrics.stop(phase, started)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+class Registry:
+    # Séries em memória no formato do Prometheus (só o necessário para a API)
+    request_labels = ('view', 'action', 'method', 'status')
+    view_labels = ('view', 'action')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.durations = {} # rótulos -> [contagem por bucket, soma, total]
+        self.totals = {'sql_queries': Counter(), 'sql_seconds': Counter(), 'serializer_seconds': Counter(), 'render_seconds': Counter()}
+
+    def observe(self, view, action, method, status, metrics, duration):
+        key = (view, action, method, str(status))
+        with self.lock:
+            histogram = self.durations.setdefault(key, [[0] * len(DURATION_BUCKETS), 0.0, 0])
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    histogram[0][index] += 1
+            histogram[1] += duration
+            histogram[2] += 1
+            self.totals['sql_queries'][(view, action)] += metrics.sql_count
+            self.totals['sql_seconds'][(view, action)] += metrics.sql_time
+            self.totals['serializer_seconds'][(view, action)] += metrics.timings['serializer']
+            self.totals['render_seconds'][(view, action)] += metrics.timings['render']
+
+    def render(self):
+        lines = [
+            '# HELP api_request_duration_seconds Latência das requisições da API.',
+            '# TYPE api_request_duration_seconds histogram',
+        ]
+        with self.lock:
+            for key, (buckets, total, count) in sorted(self.durations.items()):
+                labels = _labels(self.request_labels, key)
+                for bound, value in zip(DURATION_BUCKETS, buckets):
+                    lines.append(f'api_request_duration_seconds_bucket{{{labels},le="{bound}"}} {value}')
+                lines.append(f'api_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f'api_request_duration_seconds_sum{{{labels}}} {total}')
+                lines.append(f'api_request_duration_seconds_count{{{labels}}} {count}')
+            for name, help_text in (
+                ('sql_queries', 'Consultas SQL executadas.'),
+                ('sql_seconds', 'Tempo gasto no banco.'),
+                ('serializer_seconds', 'Tempo gasto serializando.'),
+                ('render_seconds', 'Tempo gasto renderizando a resposta.'),
+            ):
+                lines.append(f'# HELP api_{name}_total {help_text}')
+                lines.append(f'# TYPE api_{name}_total counter')
+                for key, value in sorted(self.totals[name].items()):
+                    lines.append(f'api_{name}_total{{{_labels(self.view_labels, key)}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+registry = Registry()
+
+def view_labels(request):
+    # (viewset, action) da rota resolvida, ou None fora de users/urls.py
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    view = getattr(match.func, 'cls', match.func)
+    if not view.__module__.startswith('users.') or view is metrics_view:
+        return None
+    actions = getattr(match.func, 'actions', None) or {}
+    return view.__name__, actions.get(request.method.lower(), request.method.lower())
+
+def _server_timing(metrics, total):
+    return ', '.join([
+        f'db;dur={metrics.sql_time * 1000:.1f};desc="{metrics.sql_count} consultas"',
+        f'serializer;dur={metrics.timings["serializer"] * 1000:.1f}',
+        f'render;dur={metrics.timings["render"] * 1000:.1f}',
+        f'total;dur={total * 1000:.1f}',
+    ])
+
+def _log_slow(request, labels, metrics, total):
+    slowest = sorted(metrics.queries, reverse=True)[:5]
+    repeated = [(count, sql) for sql, count in Counter(sql for _, sql in metrics.queries).most_common(3) if count > 1]
+    logger.warning(
+        'Requisição lenta: %s %s (%s.%s) %.0f ms, %d consultas em %.0f ms, serializer %.0f ms, render %.0f ms\n'
+        'Consultas mais lentas:\n%s%s',
+        request.method, request.get_full_path(), *labels, total * 1000, metrics.sql_count, metrics.sql_time * 1000,
+        metrics.timings['serializer'] * 1000, metrics.timings['render'] * 1000,
+        '\n'.join(f'  {duration * 1000:.1f} ms  {sql}' for duration, sql in slowest),
+        ''.join(f'\nRepetida {count}x: {sql}' for count, sql in repeated),
+    )
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with self.watch_queries(metrics):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with self.watch_queries(metrics):
+                response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def watch_queries(self, metrics):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics.record_query))
+        return stack
+
+    def process_template_response(self, request, response):
+        # Chamado logo antes de response.render(); o callback marca o fim da renderização
+        metrics = _current.get()
+        if metrics is not None:
+            started = metrics.start('render')
+            response.add_post_render_callback(lambda rendered: metrics.stop('render', started))
+        return response
+
+    def finish(self, request, response, metrics):
+        labels = view_labels(request)
+        if labels is None:
+            return response
+        total = time.perf_counter() - metrics.started
+        registry.observe(*labels, request.method, response.status_code, metrics, total)
+        if server_timing_enabled():
+            response['Server-Timing'] = _server_timing(metrics, total)
+        if total >= slow_request_threshold():
+            _log_slow(request, labels, metrics, total)
+        return response
+
+def _allowed(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_staff:
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network) for network in getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1']))
+
+def metrics_view(request):
+    if not _allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
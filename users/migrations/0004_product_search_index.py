@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:55
+
+from django.db import migrations
+
+# Tabela virtual FTS5 usada pela busca de produtos (ver users/search.py).
+# Só é criada no SQLite; nos outros bancos a busca usa filtros simples.
+
+def create_product_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS users_product_fts "
+        "USING fts5(name, description, variations, tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO users_product_fts (rowid, name, description, variations) "
+        "SELECT id, name, COALESCE(description, ''), COALESCE(variations, '') FROM users_product"
+    )
+
+def drop_product_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS users_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_product_search_index, drop_product_search_index),
+    ]
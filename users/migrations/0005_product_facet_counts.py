@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:50
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+# Faixas de preço congeladas nesta migração (mesmas de users/facets.py na época)
+PRICE_BUCKETS = [('0-50', Decimal('50')), ('50-100', Decimal('100')), ('100-200', Decimal('200')), ('200+', None)]
+
+def populate_facet_counts(apps, schema_editor):
+    Product = apps.get_model('users', 'Product')
+    ProductFacetCount = apps.get_model('users', 'ProductFacetCount')
+    counts = {}
+    for category_id, price, stock in Product.objects.values_list('category_id', 'price', 'stock').iterator():
+        bucket = next(value for value, maximum in PRICE_BUCKETS if maximum is None or (price or 0) < maximum)
+        for key in (('category', str(category_id) if category_id else ''), ('price', bucket),
+                    ('in_stock', 'true' if (stock or 0) > 0 else 'false')):
+            counts[key] = counts.get(key, 0) + 1
+    ProductFacetCount.objects.bulk_create([
+        ProductFacetCount(facet=facet, value=value, count=count) for (facet, value), count in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=50, verbose_name='Faceta')),
+                ('value', models.CharField(max_length=100, verbose_name='Valor')),
+                ('count', models.IntegerField(default=0, verbose_name='Quantidade de Produtos')),
+            ],
+            options={
+                'verbose_name': 'Contagem de Faceta',
+                'verbose_name_plural': 'Contagens de Facetas',
+                'ordering': ['facet', 'value'],
+                'unique_together': {('facet', 'value')},
+            },
+        ),
+        migrations.RunPython(populate_facet_counts, migrations.RunPython.noop),
+    ]
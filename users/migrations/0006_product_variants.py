@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_product_facet_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VariantOption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, verbose_name='Atributo')),
+                ('value', models.CharField(max_length=50, verbose_name='Valor')),
+            ],
+            options={
+                'verbose_name': 'Opção de Variação',
+                'verbose_name_plural': 'Opções de Variação',
+                'ordering': ['name', 'value'],
+                'unique_together': {('name', 'value')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock', models.IntegerField(default=0, verbose_name='Estoque')),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Preço da Variante')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Última Atualização')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='users.product', verbose_name='Produto')),
+                ('options', models.ManyToManyField(related_name='variants', to='users.variantoption', verbose_name='Opções')),
+            ],
+            options={
+                'verbose_name': 'Variante de Produto',
+                'verbose_name_plural': 'Variantes de Produto',
+                'ordering': ['product', 'id'],
+                'indexes': [models.Index(fields=['product', 'stock'], name='variant_product_stock_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:52
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+def populate_rating_aggregates(apps, schema_editor):
+    Product = apps.get_model('users', 'Product')
+    aggregates = {
+        'rating_count': Count('reviews'),
+        'rating_sum': Sum('reviews__rating', default=0),
+        **{f'rating_{star}': Count('reviews', filter=Q(reviews__rating=star)) for star in range(1, 6)},
+    }
+    for row in Product.objects.values('pk').annotate(**aggregates).iterator():
+        pk = row.pop('pk')
+        if row['rating_count']:
+            Product.objects.filter(pk=pk).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_product_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1',
+            field=models.IntegerField(default=0, verbose_name='Avaliações 1 Estrela'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2',
+            field=models.IntegerField(default=0, verbose_name='Avaliações 2 Estrelas'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3',
+            field=models.IntegerField(default=0, verbose_name='Avaliações 3 Estrelas'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4',
+            field=models.IntegerField(default=0, verbose_name='Avaliações 4 Estrelas'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5',
+            field=models.IntegerField(default=0, verbose_name='Avaliações 5 Estrelas'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.IntegerField(default=0, verbose_name='Quantidade de Avaliações'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.IntegerField(default=0, verbose_name='Soma das Avaliações'),
+        ),
+        migrations.RunPython(populate_rating_aggregates, migrations.RunPython.noop),
+    ]
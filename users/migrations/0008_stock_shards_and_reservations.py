@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_product_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.PositiveSmallIntegerField(verbose_name='Fatia')),
+                ('available', models.IntegerField(default=0, verbose_name='Disponível')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_shards', to='users.product', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Fatia de Estoque',
+                'verbose_name_plural': 'Fatias de Estoque',
+                'unique_together': {('product', 'shard')},
+            },
+        ),
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(verbose_name='Quantidade')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data da Reserva')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Expira Em')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_reservations', to='users.product', verbose_name='Produto')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_reservations', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+                ('shard', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='users.stockshard', verbose_name='Fatia')),
+            ],
+            options={
+                'verbose_name': 'Reserva de Estoque',
+                'verbose_name_plural': 'Reservas de Estoque',
+            },
+        ),
+    ]
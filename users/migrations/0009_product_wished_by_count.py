@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:13
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_wished_by_count(apps, schema_editor):
+    Product = apps.get_model('users', 'Product')
+    WishlistProduct = apps.get_model('users', 'WishlistProduct')
+    counts = WishlistProduct.objects.values('product_id').annotate(total=Count('pk')).iterator()
+    for row in counts:
+        Product.objects.filter(pk=row['product_id']).update(wished_by_count=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_stock_shards_and_reservations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='wished_by_count',
+            field=models.IntegerField(default=0, verbose_name='Em Listas de Desejos'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-wished_by_count', 'id'], name='product_most_wished_idx'),
+        ),
+        migrations.RunPython(populate_wished_by_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0009_product_wished_by_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Dia')),
+                ('orders', models.IntegerField(default=0, verbose_name='Pedidos')),
+                ('units', models.IntegerField(default=0, verbose_name='Unidades Vendidas')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Receita')),
+            ],
+            options={
+                'verbose_name': 'Vendas do Dia',
+                'verbose_name_plural': 'Vendas por Dia',
+                'ordering': ['date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CustomerSales',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sales', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Cliente')),
+                ('orders', models.IntegerField(default=0, verbose_name='Pedidos')),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Total Gasto')),
+            ],
+            options={
+                'verbose_name': 'Vendas do Cliente',
+                'verbose_name_plural': 'Vendas por Cliente',
+                'indexes': [models.Index(fields=['-total_spent'], name='customer_sales_spent_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyCategorySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Dia')),
+                ('units', models.IntegerField(default=0, verbose_name='Unidades Vendidas')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Receita')),
+                ('category', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='users.category', verbose_name='Categoria')),
+            ],
+            options={
+                'verbose_name': 'Vendas da Categoria no Dia',
+                'verbose_name_plural': 'Vendas por Categoria e Dia',
+                'unique_together': {('date', 'category')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Dia')),
+                ('units', models.IntegerField(default=0, verbose_name='Unidades Vendidas')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Receita')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.product', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Vendas do Produto no Dia',
+                'verbose_name_plural': 'Vendas por Produto e Dia',
+                'unique_together': {('date', 'product')},
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessingCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='Tarefa')),
+                ('position', models.BigIntegerField(default=0, verbose_name='Posição')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Última Atualização')),
+            ],
+            options={
+                'verbose_name': 'Ponto de Processamento',
+                'verbose_name_plural': 'Pontos de Processamento',
+            },
+        ),
+        migrations.CreateModel(
+            name='BoughtTogether',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Posição')),
+                ('count', models.IntegerField(verbose_name='Pedidos em Comum')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bought_together', to='users.product', verbose_name='Produto')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bought_together_of', to='users.product', verbose_name='Recomendado')),
+            ],
+            options={
+                'verbose_name': 'Comprado Junto',
+                'verbose_name_plural': 'Comprados Juntos',
+                'ordering': ['product', 'rank'],
+                'unique_together': {('product', 'rank')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductCooccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0, verbose_name='Pedidos em Comum')),
+                ('other', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.product', verbose_name='Comprado Junto')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.product', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Coocorrência de Produtos',
+                'verbose_name_plural': 'Coocorrências de Produtos',
+                'indexes': [models.Index(fields=['product', '-count', 'other'], name='cooccurrence_top_idx')],
+                'unique_together': {('product', 'other')},
+            },
+        ),
+    ]
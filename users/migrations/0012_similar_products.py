@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_bought_together'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingcheckpoint',
+            name='processed_until',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Processado Até'),
+        ),
+        migrations.CreateModel(
+            name='SimilarProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='Posição')),
+                ('score', models.FloatField(verbose_name='Similaridade')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar', to='users.product', verbose_name='Produto')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_of', to='users.product', verbose_name='Semelhante')),
+            ],
+            options={
+                'verbose_name': 'Produto Semelhante',
+                'verbose_name_plural': 'Produtos Semelhantes',
+                'ordering': ['product', 'rank'],
+                'unique_together': {('product', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_item_category(apps, schema_editor):
+    # Itens antigos: a melhor informação disponível é a categoria atual do produto
+    Product = apps.get_model('users', 'Product')
+    OrderItem = apps.get_model('users', 'OrderItem')
+    OrderItem.objects.update(category_id=Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('category_id')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_similar_products'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='category',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='users.category', verbose_name='Categoria na Compra'),
+        ),
+        migrations.RunPython(populate_item_category, migrations.RunPython.noop),
+    ]
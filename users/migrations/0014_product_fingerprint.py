@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_order_item_category'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFingerprint',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='users.product', verbose_name='Produto')),
+                ('content_hash', models.CharField(max_length=32, verbose_name='Assinatura do Conteúdo')),
+            ],
+            options={
+                'verbose_name': 'Assinatura de Produto',
+                'verbose_name_plural': 'Assinaturas de Produtos',
+            },
+        ),
+    ]
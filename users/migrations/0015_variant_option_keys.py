@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+def normalize(text):
+    # Mesma regra de VariantOption.normalize
+    return ' '.join(text.split()).lower()[:50]
+
+
+def populate_keys(apps, schema_editor):
+    # Preenche as chaves normalizadas sem tocar na grafia gravada. Opções que só
+    # diferem em maiúsculas/espaços viram uma só (a de menor id, com a sua grafia).
+    VariantOption = apps.get_model('users', 'VariantOption')
+    Through = apps.get_model('users', 'ProductVariant').options.through
+    groups = {}
+    for option in VariantOption.objects.order_by('pk'):
+        groups.setdefault((normalize(option.name), normalize(option.value)), []).append(option)
+    for (name_key, value_key), (kept, *duplicates) in groups.items():
+        if duplicates:
+            duplicate_ids = [option.pk for option in duplicates]
+            linked = set(Through.objects.filter(variantoption_id=kept.pk).values_list('productvariant_id', flat=True))
+            for row in Through.objects.filter(variantoption_id__in=duplicate_ids).order_by('pk'):
+                if row.productvariant_id in linked:
+                    row.delete()
+                else:
+                    Through.objects.filter(pk=row.pk).update(variantoption_id=kept.pk)
+                    linked.add(row.productvariant_id)
+            VariantOption.objects.filter(pk__in=duplicate_ids).delete()
+        VariantOption.objects.filter(pk=kept.pk).update(name_key=name_key, value_key=value_key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0014_product_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='variantoption',
+            name='name_key',
+            field=models.CharField(default='', editable=False, max_length=50, verbose_name='Atributo Normalizado'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='variantoption',
+            name='value_key',
+            field=models.CharField(default='', editable=False, max_length=50, verbose_name='Valor Normalizado'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_keys, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='variantoption',
+            unique_together={('name_key', 'value_key')},
+        ),
+    ]
@@ -32,19 +32,120 @@ class Product(models.Model):
     # Variações como uma string JSON ou Text. Para simplicidade inicial, Text.
     # Você pode armazenar algo como "Pequeno,Médio,Grande" ou "Azul,Rosa".
     # Em projetos maiores, um modelo 'Variation' seria mais robusto.
+    # Legado: as variantes estruturadas ficam em ProductVariant/VariantOption;
+    # use `python manage.py migrate_product_variations` para converter este texto.
     variations = models.TextField(blank=True, null=True, help_text="Ex: 'Tamanho: P, M, G | Cor: Azul, Rosa'")
 
+    # Agregados das avaliações, mantidos incrementalmente pelos sinais de Review (ver users/ratings.py)
+    rating_count = models.IntegerField(default=0, verbose_name="Quantidade de Avaliações")
+    rating_sum = models.IntegerField(default=0, verbose_name="Soma das Avaliações")
+    rating_1 = models.IntegerField(default=0, verbose_name="Avaliações 1 Estrela")
+    rating_2 = models.IntegerField(default=0, verbose_name="Avaliações 2 Estrelas")
+    rating_3 = models.IntegerField(default=0, verbose_name="Avaliações 3 Estrelas")
+    rating_4 = models.IntegerField(default=0, verbose_name="Avaliações 4 Estrelas")
+    rating_5 = models.IntegerField(default=0, verbose_name="Avaliações 5 Estrelas")
+
+    # Quantas listas de desejos têm o produto, mantido incrementalmente (ver users/wishlists.py)
+    wished_by_count = models.IntegerField(default=0, verbose_name="Em Listas de Desejos")
+
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Última Atualização")
 
+    RATING_FIELDS = ('rating_count', 'rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5')
+    # Contadores atualizados só com UPDATE ... F(), nunca pelo save() da instância
+    COUNTER_FIELDS = RATING_FIELDS + ('wished_by_count',)
+
     class Meta:
         verbose_name = "Produto"
         verbose_name_plural = "Produtos"
         ordering = ['name'] # Ordenar produtos por nome
+        indexes = [
+            models.Index(fields=['name', 'id'], name='product_name_id_idx'), # Paginação por cursor
+            models.Index(fields=['-wished_by_count', 'id'], name='product_most_wished_idx'), # Ranking "mais desejados"
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Os agregados de avaliação e o contador de listas de desejos são
+        # atualizados com UPDATE ... F(). Um save() comum de um produto já
+        # existente não pode sobrescrevê-los com valores antigos da instância,
+        # então eles ficam fora do UPDATE.
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in self.COUNTER_FIELDS and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def rating_average(self):
+        if not self.rating_count:
+            return None
+        return (Decimal(self.rating_sum) / self.rating_count).quantize(Decimal('0.01'))
+
+    @property
+    def rating_histogram(self):
+        return {star: getattr(self, f'rating_{star}') for star in range(1, 6)}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Guarda os valores carregados do banco para que os sinais saibam o que
+        # mudou no save (ex.: contagens de facetas) sem reler a linha.
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+# Opções de variação compartilhadas entre produtos (ex.: Tamanho=M, Cor=Azul)
+class VariantOption(models.Model):
+    name = models.CharField(max_length=50, verbose_name="Atributo") # Ex: 'Tamanho', 'Cor'
+    value = models.CharField(max_length=50, verbose_name="Valor") # Ex: 'M', 'Azul'
+    # Forma normalizada de name/value (ver normalize): "Azul" e "azul" são a mesma opção
+    name_key = models.CharField(max_length=50, editable=False, verbose_name="Atributo Normalizado")
+    value_key = models.CharField(max_length=50, editable=False, verbose_name="Valor Normalizado")
+
+    class Meta:
+        verbose_name = "Opção de Variação"
+        verbose_name_plural = "Opções de Variação"
+        unique_together = ('name_key', 'value_key') # Também serve de índice para filtrar por atributo/valor
+        ordering = ['name', 'value']
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    @staticmethod
+    def normalize(text):
+        # Espaços simples e minúsculas. Os filtros comparam a forma normalizada por
+        # igualdade exata, pelo índice único; name/value guardam a grafia original.
+        return ' '.join(text.split()).lower()[:50]
+
+    def save(self, *args, **kwargs):
+        self.name_key, self.value_key = self.normalize(self.name), self.normalize(self.value)
+        super().save(*args, **kwargs)
+
+# Variante de um produto (uma combinação de opções), com estoque e preço próprios
+class ProductVariant(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='variants', verbose_name="Produto")
+    options = models.ManyToManyField(VariantOption, related_name='variants', verbose_name="Opções")
+    stock = models.IntegerField(default=0, verbose_name="Estoque")
+    # Quando vazio, vale o preço do produto
+    price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True, verbose_name="Preço da Variante")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Última Atualização")
+
+    class Meta:
+        verbose_name = "Variante de Produto"
+        verbose_name_plural = "Variantes de Produto"
+        ordering = ['product', 'id']
+        indexes = [
+            models.Index(fields=['product', 'stock'], name='variant_product_stock_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} ({', '.join(str(option) for option in self.options.all())})"
+
 # Os outros modelos (Order, OrderItem, Review, Coupon, Wishlist) virão depois.
 # users/models.py (Continuação do arquivo, cole abaixo dos modelos existentes)
 from django.conf import settings # Importar para acessar o modelo User padrão do Django
@@ -92,16 +193,33 @@ class Order(models.Model):
         verbose_name = "Pedido"
         verbose_name_plural = "Pedidos"
         ordering = ['-created_at'] # Ordenar pedidos do mais novo para o mais antigo
+        indexes = [
+            # Paginação por cursor: pedidos do usuário e listagem geral (staff)
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_id_idx'),
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+        ]
 
     def __str__(self):
         return f"Pedido {self.order_number} - {self.user.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Guarda status, total e data originais para ajustar os resumos de vendas no save (ver users/sales.py)
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 # Modelo para Itens do Pedido
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items', verbose_name="Pedido")
     product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="Produto")
     quantity = models.IntegerField(verbose_name="Quantidade")
     price_at_purchase = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Preço na Compra") # Preço do produto no momento da compra
+    # Categoria do produto no momento da compra: os resumos de vendas por categoria
+    # não mudam se o produto trocar de categoria depois (ver users/sales.py)
+    category = models.ForeignKey(
+        Category, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='+', verbose_name="Categoria na Compra"
+    )
 
     class Meta:
         verbose_name = "Item do Pedido"
@@ -111,6 +229,13 @@ class OrderItem(models.Model):
     def __str__(self):
         return f"{self.quantity} x {self.product.name} (Pedido {self.order.order_number})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Guarda produto, quantidade e preço originais para ajustar os resumos de vendas no save
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 # Modelo para Avaliações de Produto
 class Review(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='reviews', verbose_name="Usuário")
@@ -123,10 +248,20 @@ class Review(models.Model):
         verbose_name = "Avaliação"
         verbose_name_plural = "Avaliações"
         unique_together = ('user', 'product') # Um usuário pode avaliar um produto apenas uma vez
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='review_created_id_idx'), # Paginação por cursor
+        ]
 
     def __str__(self):
         return f"Avaliação de {self.user.username} para {self.product.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Guarda nota e produto originais para ajustar os agregados do produto no save
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 # Modelo para Cupons de Desconto
 class Coupon(models.Model):
     DISCOUNT_TYPE_CHOICES = [
@@ -152,6 +287,13 @@ class Coupon(models.Model):
     def __str__(self):
         return self.code
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Guarda o código original para invalidar o cache mesmo se o código mudar
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 # Modelo para Lista de Desejos
 class Wishlist(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='wishlist', verbose_name="Usuário")
@@ -180,4 +322,189 @@ class WishlistProduct(models.Model):
 
     def __str__(self):
         return f"{self.product.name} em {self.wishlist.user.username}'s Wishlist"
-    
\ No newline at end of file
+    
+
+# Contagens pré-calculadas das facetas do catálogo (produtos por categoria, faixa de preço e disponibilidade).
+# Atualizadas incrementalmente pelos sinais de Product (ver users/facets.py).
+class ProductFacetCount(models.Model):
+    facet = models.CharField(max_length=50, verbose_name="Faceta")
+    value = models.CharField(max_length=100, verbose_name="Valor")
+    count = models.IntegerField(default=0, verbose_name="Quantidade de Produtos")
+
+    class Meta:
+        verbose_name = "Contagem de Faceta"
+        verbose_name_plural = "Contagens de Facetas"
+        unique_together = ('facet', 'value')
+        ordering = ['facet', 'value']
+
+    def __str__(self):
+        return f"{self.facet}={self.value}: {self.count}"
+
+# Contador de estoque fatiado (shard) para produtos disputados em promoções.
+# Com o estoque dividido em N linhas, reservas simultâneas atualizam linhas
+# diferentes em vez de disputarem a mesma linha de Product (ver users/reservations.py).
+class StockShard(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_shards', verbose_name="Produto")
+    shard = models.PositiveSmallIntegerField(verbose_name="Fatia")
+    available = models.IntegerField(default=0, verbose_name="Disponível")
+
+    class Meta:
+        verbose_name = "Fatia de Estoque"
+        verbose_name_plural = "Fatias de Estoque"
+        unique_together = ('product', 'shard')
+
+    def __str__(self):
+        return f"{self.product.name} #{self.shard}: {self.available}"
+
+# Reserva temporária de estoque (item no carrinho) que expira após um prazo
+class StockReservation(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_reservations', verbose_name="Produto")
+    shard = models.ForeignKey(StockShard, on_delete=models.CASCADE, related_name='reservations', verbose_name="Fatia")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='stock_reservations', verbose_name="Usuário")
+    quantity = models.IntegerField(verbose_name="Quantidade")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data da Reserva")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Expira Em") # Usado pelo varredor de reservas vencidas
+
+    class Meta:
+        verbose_name = "Reserva de Estoque"
+        verbose_name_plural = "Reservas de Estoque"
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product.name} até {self.expires_at:%d/%m/%Y %H:%M}"
+
+# Resumos de vendas mantidos incrementalmente pelos sinais de Order e OrderItem
+# (ver users/sales.py). Pedidos cancelados ficam fora de todos os totais.
+class DailySales(models.Model):
+    date = models.DateField(unique=True, verbose_name="Dia")
+    orders = models.IntegerField(default=0, verbose_name="Pedidos")
+    units = models.IntegerField(default=0, verbose_name="Unidades Vendidas")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Receita") # Soma de Order.total_amount
+
+    class Meta:
+        verbose_name = "Vendas do Dia"
+        verbose_name_plural = "Vendas por Dia"
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date:%d/%m/%Y}: {self.revenue}"
+
+class DailyCategorySales(models.Model):
+    date = models.DateField(verbose_name="Dia")
+    # Sem restrição de chave: o histórico continua depois que a categoria é removida
+    category = models.ForeignKey(Category, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+', verbose_name="Categoria")
+    units = models.IntegerField(default=0, verbose_name="Unidades Vendidas")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Receita") # Soma de quantidade x preço na compra
+
+    class Meta:
+        verbose_name = "Vendas da Categoria no Dia"
+        verbose_name_plural = "Vendas por Categoria e Dia"
+        unique_together = ('date', 'category')
+
+    def __str__(self):
+        return f"{self.date:%d/%m/%Y} categoria {self.category_id}: {self.revenue}"
+
+class DailyProductSales(models.Model):
+    date = models.DateField(verbose_name="Dia")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+', verbose_name="Produto")
+    units = models.IntegerField(default=0, verbose_name="Unidades Vendidas")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Receita")
+
+    class Meta:
+        verbose_name = "Vendas do Produto no Dia"
+        verbose_name_plural = "Vendas por Produto e Dia"
+        unique_together = ('date', 'product')
+
+    def __str__(self):
+        return f"{self.date:%d/%m/%Y} {self.product_id}: {self.revenue}"
+
+class CustomerSales(models.Model):
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='sales', verbose_name="Cliente")
+    orders = models.IntegerField(default=0, verbose_name="Pedidos")
+    total_spent = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Total Gasto")
+
+    class Meta:
+        verbose_name = "Vendas do Cliente"
+        verbose_name_plural = "Vendas por Cliente"
+        indexes = [
+            models.Index(fields=['-total_spent'], name='customer_sales_spent_idx'), # Ranking de clientes
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.total_spent}"
+
+# Recomendações "comprados juntos" (ver users/recommendations.py).
+# Quantas vezes dois produtos apareceram no mesmo pedido, nos dois sentidos (a, b) e (b, a).
+class ProductCooccurrence(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+', verbose_name="Produto")
+    other = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+', verbose_name="Comprado Junto")
+    count = models.IntegerField(default=0, verbose_name="Pedidos em Comum")
+
+    class Meta:
+        verbose_name = "Coocorrência de Produtos"
+        verbose_name_plural = "Coocorrências de Produtos"
+        unique_together = ('product', 'other')
+        indexes = [
+            models.Index(fields=['product', '-count', 'other'], name='cooccurrence_top_idx'), # Recalcular os K vizinhos
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} + {self.other_id}: {self.count}"
+
+# Os K produtos mais comprados junto com cada produto, já ordenados para a página do produto
+class BoughtTogether(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='bought_together', verbose_name="Produto")
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='bought_together_of', verbose_name="Recomendado")
+    rank = models.PositiveSmallIntegerField(verbose_name="Posição")
+    count = models.IntegerField(verbose_name="Pedidos em Comum")
+
+    class Meta:
+        verbose_name = "Comprado Junto"
+        verbose_name_plural = "Comprados Juntos"
+        unique_together = ('product', 'rank') # Também é o índice da leitura na página do produto
+        ordering = ['product', 'rank']
+
+    def __str__(self):
+        return f"{self.product_id} #{self.rank}: {self.related_id}"
+
+# Os K produtos de conteúdo mais parecido (nome, descrição e categoria), ver users/similarity.py
+class SimilarProduct(models.Model):
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='similar', verbose_name="Produto")
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='similar_of', verbose_name="Semelhante")
+    rank = models.PositiveSmallIntegerField(verbose_name="Posição")
+    score = models.FloatField(verbose_name="Similaridade")
+
+    class Meta:
+        verbose_name = "Produto Semelhante"
+        verbose_name_plural = "Produtos Semelhantes"
+        unique_together = ('product', 'rank') # Também é o índice da leitura na página do produto
+        ordering = ['product', 'rank']
+
+    def __str__(self):
+        return f"{self.product_id} #{self.rank}: {self.related_id} ({self.score:.3f})"
+
+# Assinatura do nome, descrição e categoria já indexados em SimilarProduct: baixas
+# de estoque também mudam updated_at, e só mudança de conteúdo recalcula os semelhantes
+class ProductFingerprint(models.Model):
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='+', verbose_name="Produto")
+    content_hash = models.CharField(max_length=32, verbose_name="Assinatura do Conteúdo")
+
+    class Meta:
+        verbose_name = "Assinatura de Produto"
+        verbose_name_plural = "Assinaturas de Produtos"
+
+    def __str__(self):
+        return f"{self.product_id}: {self.content_hash}"
+
+# Até onde cada tarefa incremental já processou (ex.: último pedido somado às coocorrências)
+class ProcessingCheckpoint(models.Model):
+    name = models.CharField(max_length=50, unique=True, verbose_name="Tarefa")
+    position = models.BigIntegerField(default=0, verbose_name="Posição")
+    processed_until = models.DateTimeField(null=True, blank=True, verbose_name="Processado Até") # Para tarefas guiadas por updated_at
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Última Atualização")
+
+    class Meta:
+        verbose_name = "Ponto de Processamento"
+        verbose_name_plural = "Pontos de Processamento"
+
+    def __str__(self):
+        return f"{self.name}: {self.position}"
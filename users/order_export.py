@@ -0,0 +1,129 @@
+# users/order_export.py
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Order, OrderItem
+
+# Exportação de pedidos em fluxo (CSV ou NDJSON) para o financeiro.
+#
+# Os pedidos são lidos em blocos por chave (pk > último visto) e, para cada
+# bloco, os itens vêm em uma única consulta com .values(). Cada linha é gerada e
+# enviada ao cliente antes do próximo bloco, então a memória do processo não
+# depende do número de pedidos exportados.
+#
+# CSV: uma linha por item (os dados do pedido e do endereço se repetem); pedidos
+# sem itens saem em uma linha com as colunas de item vazias.
+# NDJSON: um pedido por linha, com 'items' e 'shipping_address' aninhados.
+
+ORDER_COLUMNS = (
+    'id', 'order_number', 'user_id', 'user__username', 'status', 'payment_method', 'total_amount',
+    'shipping_cost', 'created_at', 'updated_at',
+)
+ADDRESS_COLUMNS = ('street', 'number', 'complement', 'neighborhood', 'city', 'state', 'zip_code')
+ITEM_COLUMNS = ('product_id', 'product__name', 'quantity', 'price_at_purchase')
+
+CSV_HEADER = (
+    [column.replace('__', '_') for column in ORDER_COLUMNS]
+    + [f'shipping_{column}' for column in ADDRESS_COLUMNS]
+    + ['item_product_id', 'item_product_name', 'item_quantity', 'item_price_at_purchase']
+)
+
+class ExportFilterError(ValueError):
+    pass
+
+def _parse_moment(value, end_of_day=False):
+    # Aceita data (2025-01-31) ou data e hora ISO; datas sem hora cobrem o dia inteiro
+    day = parse_date(value)
+    if day is not None:
+        moment = datetime.combine(day + timedelta(days=1) if end_of_day else day, time.min)
+    else:
+        moment = parse_datetime(value)
+        if moment is None:
+            raise ValueError(value)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+def filter_orders(params):
+    # Filtros: date_from, date_to (inclusivo) e status (um ou mais, separados por vírgula)
+    orders = Order.objects.all()
+    try:
+        if params.get('date_from'):
+            orders = orders.filter(created_at__gte=_parse_moment(params['date_from']))
+        if params.get('date_to'):
+            value = params['date_to']
+            if parse_date(value) is not None:
+                orders = orders.filter(created_at__lt=_parse_moment(value, end_of_day=True))
+            else:
+                orders = orders.filter(created_at__lte=_parse_moment(value))
+    except ValueError:
+        raise ExportFilterError('Use datas no formato AAAA-MM-DD ou data e hora ISO 8601.')
+    if params.get('status'):
+        statuses = [status.strip().upper() for status in params['status'].split(',') if status.strip()]
+        valid = {choice for choice, _ in Order.STATUS_CHOICES}
+        invalid = [status for status in statuses if status not in valid]
+        if invalid:
+            raise ExportFilterError(f'Status inválido: {", ".join(invalid)}. Opções: {", ".join(sorted(valid))}.')
+        orders = orders.filter(status__in=statuses)
+    return orders
+
+def iter_orders(orders, chunk_size=1000):
+    # Gera (pedido, itens) bloco a bloco, sem manter os blocos anteriores em memória
+    address = [f'shipping_address__{column}' for column in ADDRESS_COLUMNS]
+    last_pk = 0
+    while True:
+        chunk = list(
+            orders.filter(pk__gt=last_pk).order_by('pk')
+            .values(*ORDER_COLUMNS, 'shipping_address_id', *address)[:chunk_size]
+        )
+        if not chunk:
+            return
+        items = {}
+        rows = OrderItem.objects.filter(order_id__in=[order['id'] for order in chunk]).order_by('pk').values('order_id', *ITEM_COLUMNS)
+        for item in rows:
+            items.setdefault(item['order_id'], []).append(item)
+        for order in chunk:
+            yield order, items.get(order['id'], [])
+        last_pk = chunk[-1]['id']
+
+def _datetime(value):
+    return value.isoformat() if value is not None else None
+
+class _Echo:
+    # Buffer falso: o csv.writer devolve a linha em vez de gravá-la
+    def write(self, value):
+        return value
+
+def csv_lines(orders, chunk_size=1000):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_HEADER)
+    for order, items in iter_orders(orders, chunk_size):
+        base = [order[column] for column in ORDER_COLUMNS]
+        base[ORDER_COLUMNS.index('created_at')] = _datetime(order['created_at'])
+        base[ORDER_COLUMNS.index('updated_at')] = _datetime(order['updated_at'])
+        base += [order[f'shipping_address__{column}'] for column in ADDRESS_COLUMNS]
+        for item in items or [None]:
+            extra = [item[column] for column in ITEM_COLUMNS] if item else [None] * len(ITEM_COLUMNS)
+            yield writer.writerow(base + extra)
+
+def ndjson_lines(orders, chunk_size=1000):
+    for order, items in iter_orders(orders, chunk_size):
+        record = {column.replace('__', '_'): order[column] for column in ORDER_COLUMNS}
+        record['total_amount'] = str(order['total_amount'])
+        record['shipping_cost'] = str(order['shipping_cost'])
+        record['created_at'] = _datetime(order['created_at'])
+        record['updated_at'] = _datetime(order['updated_at'])
+        record['shipping_address'] = None
+        if order['shipping_address_id'] is not None:
+            record['shipping_address'] = {column: order[f'shipping_address__{column}'] for column in ADDRESS_COLUMNS}
+        record['items'] = [{
+            'product_id': item['product_id'],
+            'product_name': item['product__name'],
+            'quantity': item['quantity'],
+            'price_at_purchase': str(item['price_at_purchase']),
+        } for item in items]
+        yield json.dumps(record, ensure_ascii=False) + '\n'
@@ -0,0 +1,63 @@
+# users/pagination.py
+from rest_framework.pagination import CursorPagination
+
+# Paginação por cursor (keyset): a próxima página é buscada a partir da última
+# posição vista (WHERE name > ... ORDER BY ... LIMIT n), então o custo fica
+# proporcional ao tamanho da página, não à profundidade da rolagem.
+# Cada ordenação tem um índice composto correspondente em models.py.
+# O 'id' no final desempata registros com a mesma chave de ordenação.
+
+class BaseCursorPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+class ProductCursorPagination(BaseCursorPagination):
+    ordering = ('name', 'id') # Índice: (name, id)
+
+class OrderCursorPagination(BaseCursorPagination):
+    ordering = ('-created_at', '-id') # Índices: (user, -created_at, -id) e (-created_at, -id)
+
+class ReviewCursorPagination(BaseCursorPagination):
+    ordering = ('-created_at', '-id') # Índice: (-created_at, -id)
+
+class AsyncCursorPaginationMixin:
+    # Mesma paginação (e os mesmos cursores) das viewsets, para as views
+    # assíncronas: a única diferença é que a página é lida com o ORM async.
+    # Segue CursorPagination.paginate_queryset do DRF.
+    async def apaginate_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, None)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+
+        if reverse:
+            queryset = queryset.order_by(*[field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering])
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            order = self.ordering[0]
+            lookup = 'lt' if self.cursor.reverse != order.startswith('-') else 'gt'
+            queryset = queryset.filter(**{f'{order.lstrip("-")}__{lookup}': current_position})
+
+        results = [row async for row in queryset[offset:offset + self.page_size + 1]]
+        self.page = results[:self.page_size]
+        following = self._get_position_from_instance(results[-1], self.ordering) if len(results) > len(self.page) else None
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = following is not None
+            self.next_position, self.previous_position = current_position, following
+        else:
+            self.has_next = following is not None
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position, self.previous_position = following, current_position
+        return self.page
+
+    def get_paginated_data(self, data):
+        return {'next': self.get_next_link(), 'previous': self.get_previous_link(), 'results': data}
+
+class AsyncProductCursorPagination(AsyncCursorPaginationMixin, ProductCursorPagination):
+    pass
@@ -0,0 +1,233 @@
+# users/projections.py
+from decimal import Decimal
+
+from django.utils import timezone
+
+from .models import OrderItem, ProductVariant, WishlistProduct
+
+# Projeções somente leitura para as listagens mais pesadas (produtos, pedidos e
+# lista de desejos). Em vez de instanciar modelos e passar cada linha pelos
+# campos do DRF, lemos tuplas/dicionários com .values() e montamos a resposta
+# diretamente. A saída é idêntica à dos serializers correspondentes (mesmas
+# chaves, na mesma ordem, e mesmos formatos); o teste de contrato em tests.py
+# compara as duas. Ao mudar um serializer, atualize a projeção junto.
+#
+# Cada projeção tem duas etapas:
+#   values(queryset) -> queryset de dicionários (pode ser paginado por cursor)
+#   build(rows)      -> lista de dicionários prontos, com consultas em lote para
+#                       as relações (variantes, itens...) da página inteira
+
+CENTS = Decimal('0.01')
+
+def _decimal(value):
+    # Mesmo formato do DecimalField do DRF com decimal_places=2 (string)
+    return None if value is None else f'{value.quantize(CENTS):f}'
+
+def _datetime(value):
+    # Mesmo formato do DateTimeField do DRF (fuso atual, 'Z' para UTC)
+    if value is None:
+        return None
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+def _rating_average(rating_sum, rating_count):
+    if not rating_count:
+        return None
+    return _decimal(Decimal(rating_sum) / rating_count)
+
+class ProductProjection:
+    columns = (
+        'id', 'category_id', 'category__name', 'name', 'description', 'price', 'stock', 'main_image_url',
+        'variations', 'rating_count', 'rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5',
+        'created_at', 'updated_at',
+    )
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.prefetch_related(None).values(*cls.columns)
+
+    @classmethod
+    def variant_querysets(cls, product_ids):
+        # Duas consultas para a página inteira: variantes e suas opções
+        variants = (
+            ProductVariant.objects.filter(product_id__in=product_ids).order_by('product', 'id')
+            .values_list('id', 'product_id', 'stock', 'price')
+        )
+        options = (
+            ProductVariant.options.through.objects.filter(productvariant__product_id__in=product_ids)
+            .order_by('variantoption__name', 'variantoption__value')
+            .values_list('productvariant_id', 'variantoption__name', 'variantoption__value')
+        )
+        return variants, options
+
+    @classmethod
+    def group_variants(cls, variants, options):
+        by_variant = {}
+        for variant_id, name, value in options:
+            by_variant.setdefault(variant_id, {})[name] = value
+        by_product = {}
+        for variant_id, product_id, stock, price in variants:
+            by_product.setdefault(product_id, []).append({
+                'id': variant_id,
+                'options': by_variant.get(variant_id, {}),
+                'stock': stock,
+                'price': _decimal(price),
+            })
+        return by_product
+
+    @classmethod
+    def variants_by_product(cls, product_ids):
+        variants, options = cls.variant_querysets(product_ids)
+        return cls.group_variants(variants, options)
+
+    @classmethod
+    async def avariants_by_product(cls, product_ids):
+        # Versão assíncrona (ORM async), usada pelas views de users/async_views.py
+        variants, options = cls.variant_querysets(product_ids)
+        return cls.group_variants([row async for row in variants], [row async for row in options])
+
+    @classmethod
+    def build(cls, rows, prefix=''):
+        rows = list(rows)
+        variants = cls.variants_by_product([row[prefix + 'id'] for row in rows])
+        return [cls.represent(row, variants, prefix) for row in rows]
+
+    @classmethod
+    async def abuild(cls, rows):
+        variants = await cls.avariants_by_product([row['id'] for row in rows])
+        return [cls.represent(row, variants) for row in rows]
+
+    @classmethod
+    def represent(cls, row, variants, prefix=''):
+        get = lambda column: row[prefix + column]
+        category_id = get('category_id')
+        return {
+            'id': get('id'),
+            'category': {'id': category_id, 'name': get('category__name')} if category_id is not None else None,
+            'variants': variants.get(get('id'), []),
+            'rating_average': _rating_average(get('rating_sum'), get('rating_count')),
+            'rating_histogram': {str(star): get(f'rating_{star}') for star in range(1, 6)},
+            'name': get('name'),
+            'description': get('description'),
+            'price': _decimal(get('price')),
+            'stock': get('stock'),
+            'main_image_url': get('main_image_url'),
+            'variations': get('variations'),
+            'rating_count': get('rating_count'),
+            'created_at': _datetime(get('created_at')),
+            'updated_at': _datetime(get('updated_at')),
+        }
+
+class OrderProjection:
+    columns = (
+        'id', 'order_number', 'total_amount', 'shipping_cost', 'status', 'payment_method', 'created_at',
+        'updated_at', 'user_id', 'shipping_address_id',
+    )
+    address_columns = ('street', 'number', 'complement', 'neighborhood', 'city', 'state', 'zip_code', 'is_default', 'user_id')
+
+    @classmethod
+    def values(cls, queryset):
+        address = [f'shipping_address__{column}' for column in cls.address_columns]
+        return queryset.prefetch_related(None).values(*cls.columns, *address)
+
+    @classmethod
+    def items_by_order(cls, order_ids):
+        # Uma consulta para os itens de todos os pedidos da página, já com o produto
+        items = {}
+        rows = (
+            OrderItem.objects.filter(order_id__in=order_ids).order_by('pk')
+            .values_list('id', 'order_id', 'product_id', 'product__name', 'product__price', 'quantity', 'price_at_purchase')
+        )
+        for item_id, order_id, product_id, product_name, product_price, quantity, price_at_purchase in rows:
+            items.setdefault(order_id, []).append({
+                'id': item_id,
+                'product': product_id,
+                'product_name': product_name,
+                'product_price': _decimal(product_price),
+                'quantity': quantity,
+                'price_at_purchase': _decimal(price_at_purchase),
+                'order': order_id,
+            })
+        return items
+
+    @classmethod
+    def build(cls, rows):
+        rows = list(rows)
+        items = cls.items_by_order([row['id'] for row in rows])
+        return [cls.represent(row, items) for row in rows]
+
+    @classmethod
+    def represent(cls, row, items):
+        address_id = row['shipping_address_id']
+        address = None
+        if address_id is not None:
+            address = {'id': address_id}
+            for column in cls.address_columns:
+                address['user' if column == 'user_id' else column] = row[f'shipping_address__{column}']
+        return {
+            'id': row['id'],
+            'items': items.get(row['id'], []),
+            'shipping_address': address,
+            'order_number': row['order_number'],
+            'total_amount': _decimal(row['total_amount']),
+            'shipping_cost': _decimal(row['shipping_cost']),
+            'status': row['status'],
+            'payment_method': row['payment_method'],
+            'created_at': _datetime(row['created_at']),
+            'updated_at': _datetime(row['updated_at']),
+            'user': row['user_id'],
+        }
+
+class WishlistProjection:
+    columns = ('id', 'created_at', 'updated_at', 'user_id')
+
+    @classmethod
+    def values(cls, queryset):
+        return queryset.prefetch_related(None).values(*cls.columns)
+
+    @classmethod
+    def build(cls, rows):
+        rows = list(rows)
+        # Uma consulta para os produtos de todas as listas, mais as variantes em lote
+        entries = list(
+            WishlistProduct.objects.filter(wishlist_id__in=[row['id'] for row in rows]).order_by('pk')
+            .values('wishlist_id', 'product_id', 'added_at', *[f'product__{column}' for column in ProductProjection.columns])
+        )
+        variants = ProductProjection.variants_by_product([entry['product_id'] for entry in entries])
+        products = {}
+        for entry in entries:
+            products.setdefault(entry['wishlist_id'], []).append({
+                'product': entry['product_id'],
+                'added_at': _datetime(entry['added_at']),
+                'product_details': ProductProjection.represent(entry, variants, prefix='product__'),
+            })
+        return [cls.represent(row, products) for row in rows]
+
+    @classmethod
+    def represent(cls, row, products):
+        return {
+            'id': row['id'],
+            'products': products.get(row['id'], []),
+            'created_at': _datetime(row['created_at']),
+            'updated_at': _datetime(row['updated_at']),
+            'user': row['user_id'],
+        }
+
+class CompactWishlistProjection(WishlistProjection):
+    # Modo compacto (?compact=true): só o id do produto e a data de inclusão, sem
+    # JOIN com produtos. Os cartões vêm de /products/batch/?ids= conforme a tela precisa.
+    @classmethod
+    def build(cls, rows):
+        rows = list(rows)
+        products = {}
+        entries = (
+            WishlistProduct.objects.filter(wishlist_id__in=[row['id'] for row in rows]).order_by('pk')
+            .values_list('wishlist_id', 'product_id', 'added_at')
+        )
+        for wishlist_id, product_id, added_at in entries:
+            products.setdefault(wishlist_id, []).append({'product': product_id, 'added_at': _datetime(added_at)})
+        return [cls.represent(row, products) for row in rows]
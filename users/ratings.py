@@ -0,0 +1,63 @@
+# users/ratings.py
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .caching import bump_catalog_version
+from .models import Product
+
+# Agregados de avaliação denormalizados em Product (quantidade, soma e
+# histograma de 1 a 5 estrelas). Cada criação, alteração ou remoção de Review
+# aplica um UPDATE ... SET campo = campo + delta no produto, em O(1), em vez de
+# calcular AVG sobre Review para cada produto da listagem.
+
+def _apply(product_id, rating, sign):
+    Product.objects.filter(pk=product_id).update(**{
+        'rating_count': F('rating_count') + sign,
+        'rating_sum': F('rating_sum') + sign * rating,
+        f'rating_{rating}': F(f'rating_{rating}') + sign,
+        'updated_at': timezone.now(),
+    })
+
+def review_saved(instance, created):
+    previous = None if created else getattr(instance, '_loaded_values', None)
+    if previous is not None and not {'product_id', 'rating'} <= set(previous):
+        previous = None # Carregada com only()/defer() sem os campos necessários
+    current = (instance.product_id, instance.rating)
+    with transaction.atomic():
+        if previous is None and not created:
+            # Instância sem valores carregados (ex.: criada à mão com pk): não dá para saber o delta
+            rebuild_ratings(product_ids=[instance.product_id])
+        elif previous is None:
+            _apply(instance.product_id, instance.rating, 1)
+        elif (previous['product_id'], previous['rating']) != current:
+            _apply(previous['product_id'], previous['rating'], -1)
+            _apply(instance.product_id, instance.rating, 1)
+    instance._loaded_values = {**(previous or {}), 'product_id': instance.product_id, 'rating': instance.rating}
+
+def review_deleted(instance):
+    _apply(instance.product_id, instance.rating, -1)
+
+def rebuild_ratings(product_ids=None, batch_size=1000):
+    # Recalcula os agregados a partir de Review, em lotes de produtos
+    products = Product.objects.order_by('pk')
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    aggregates = {
+        'rating_count': Count('reviews'),
+        'rating_sum': Sum('reviews__rating', default=0),
+        **{f'rating_{star}': Count('reviews', filter=Q(reviews__rating=star)) for star in range(1, 6)},
+    }
+    total, last_pk = 0, 0
+    while True:
+        batch = list(products.filter(pk__gt=last_pk).values('pk').annotate(**aggregates)[:batch_size])
+        if not batch:
+            break
+        Product.objects.bulk_update(
+            [Product(pk=row['pk'], **{field: row[field] for field in Product.RATING_FIELDS}) for row in batch],
+            Product.RATING_FIELDS
+        )
+        total += len(batch)
+        last_pk = batch[-1]['pk']
+    bump_catalog_version()
+    return total
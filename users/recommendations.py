@@ -0,0 +1,123 @@
+# users/recommendations.py
+from collections import Counter
+from datetime import timedelta
+from itertools import groupby, permutations
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .caching import bump_catalog_version
+from .models import BoughtTogether, Order, OrderItem, ProcessingCheckpoint, Product, ProductCooccurrence
+from .projections import ProductProjection
+
+# "Comprados juntos" a partir dos pedidos.
+#
+# ProductCooccurrence guarda a matriz de coocorrência esparsa (em quantos
+# pedidos cada par de produtos apareceu junto, nos dois sentidos) e
+# BoughtTogether os K vizinhos de cada produto já ordenados, para a página do
+# produto ler com uma única consulta pelo índice (product, rank).
+#
+# fold_orders() soma à matriz só os pedidos novos, em lotes, a partir do
+# último pedido processado (ProcessingCheckpoint), e recalcula os K vizinhos
+# apenas dos produtos tocados. Em cada lote os pares de cada pedido são
+# contados em um Counter: o custo é proporcional aos pedidos novos, não ao
+# histórico, e não depende de NumPy/SciPy (que o projeto não usa).
+# Rode `python manage.py update_bought_together` periodicamente (ex.: cron a
+# cada poucos minutos); --rebuild recomeça do zero.
+#
+# Pedidos cancelados antes de processados ficam de fora; cancelamentos
+# posteriores não são descontados (o par foi comprado junto de qualquer forma).
+# Pedidos com menos de FOLD_DELAY de vida esperam a próxima execução, para que
+# transações ainda abertas com ids menores não sejam puladas.
+# Produtos sem pedidos caem para os semelhantes por conteúdo (users/similarity.py).
+
+CHECKPOINT = 'bought_together'
+FOLD_DELAY = timedelta(minutes=1)
+
+def top_k():
+    return getattr(settings, 'BOUGHT_TOGETHER_TOP_K', 10)
+
+def _chunks(values, size=500):
+    values = sorted(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def pair_counts(rows):
+    # rows: (order_id, product_id) ordenados por pedido -> {(produto, outro): pedidos em comum}
+    counts = Counter()
+    for _, items in groupby(rows, key=itemgetter(0)):
+        counts.update(permutations([product_id for _, product_id in items], 2))
+    return counts
+
+def _add_counts(counts):
+    # Soma os pares à matriz: INSERT ... ON CONFLICT DO UPDATE (SQLite 3.24+ ou Postgres)
+    table = connection.ops.quote_name(ProductCooccurrence._meta.db_table)
+    count = connection.ops.quote_name('count')
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {table} (product_id, other_id, {count}) VALUES (%s, %s, %s) '
+            f'ON CONFLICT (product_id, other_id) DO UPDATE SET {count} = {table}.{count} + excluded.{count}',
+            [(product_id, other_id, total) for (product_id, other_id), total in counts.items()]
+        )
+
+def refresh_neighbors(product_ids, k=None, chunk_size=500):
+    # Regrava os K vizinhos dos produtos a partir da matriz (ROW_NUMBER por produto)
+    k = k or top_k()
+    for chunk in _chunks(product_ids, chunk_size):
+        ranked = (
+            ProductCooccurrence.objects.filter(product_id__in=chunk)
+            .annotate(position=Window(RowNumber(), partition_by=F('product_id'), order_by=(F('count').desc(), F('other_id').asc())))
+            .filter(position__lte=k).values_list('product_id', 'other_id', 'count', 'position')
+        )
+        neighbors = [
+            BoughtTogether(product_id=product_id, related_id=other_id, count=total, rank=position)
+            for product_id, other_id, total, position in ranked
+        ]
+        with transaction.atomic():
+            BoughtTogether.objects.filter(product_id__in=chunk).delete()
+            BoughtTogether.objects.bulk_create(neighbors)
+
+def fold_orders(batch_size=5000, k=None, delay=FOLD_DELAY):
+    # Soma os pedidos novos à matriz e atualiza os vizinhos; retorna (pedidos, produtos atualizados)
+    checkpoint, _ = ProcessingCheckpoint.objects.get_or_create(name=CHECKPOINT)
+    settled = Order.objects.filter(created_at__lt=timezone.now() - delay)
+    processed, touched = 0, set()
+    while True:
+        order_ids = list(settled.filter(pk__gt=checkpoint.position).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not order_ids:
+            break
+        rows = (
+            OrderItem.objects.filter(order_id__gt=checkpoint.position, order_id__lte=order_ids[-1], order__in=settled)
+            .exclude(order__status='CANCELED').order_by('order_id', 'product_id').values_list('order_id', 'product_id')
+        )
+        counts = pair_counts(rows)
+        with transaction.atomic():
+            _add_counts(counts)
+            checkpoint.position = order_ids[-1]
+            checkpoint.save(update_fields=['position', 'updated_at'])
+        touched.update(product_id for product_id, _ in counts)
+        processed += len(order_ids)
+    if touched:
+        refresh_neighbors(touched, k)
+        bump_catalog_version() # A resposta de bought-together passa pelo cache do catálogo
+    return processed, len(touched)
+
+def rebuild(batch_size=5000, k=None, delay=FOLD_DELAY):
+    with transaction.atomic():
+        BoughtTogether.objects.all().delete()
+        ProductCooccurrence.objects.all().delete()
+        ProcessingCheckpoint.objects.update_or_create(name=CHECKPOINT, defaults={'position': 0})
+    return fold_orders(batch_size=batch_size, k=k, delay=delay)
+
+def bought_together(product_id, limit=None):
+    # Cartões dos produtos recomendados, na ordem do ranking, em uma consulta pelo índice (product, rank)
+    queryset = Product.objects.filter(bought_together_of__product_id=product_id).order_by('bought_together_of__rank')
+    rows = list(queryset.values(*ProductProjection.columns, 'bought_together_of__count')[:limit or top_k()])
+    products = ProductProjection.build(rows)
+    for product, row in zip(products, rows):
+        product['bought_together_count'] = row['bought_together_of__count']
+    return products
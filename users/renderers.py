@@ -0,0 +1,97 @@
+# users/renderers.py
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Renderizadores e parsers rápidos para a API (configurados em REST_FRAMEWORK no settings.py).
+# - FastJSONRenderer/FastJSONParser usam o orjson quando ele está instalado e
+#   caem no JSON padrão do DRF quando não está; a saída é a mesma do
+#   JSONRenderer (compacta, UTF-8, datas com 'Z').
+# - MessagePackRenderer/MessagePackParser atendem 'application/msgpack' para
+#   consumidores internos e exigem o pacote msgpack.
+# - CSVRenderer/NDJSONRenderer só participam da negociação de conteúdo das
+#   exportações em fluxo (?format=csv ou ?format=ndjson); o corpo é gerado pela
+#   própria view com StreamingHttpResponse. Respostas de erro saem em JSON.
+
+try:
+    import orjson
+except ImportError: # Dependência opcional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError: # Dependência opcional
+    msgpack = None
+
+_encoder = JSONEncoder()
+
+def _default(obj):
+    # Tipos que o orjson/msgpack não conhecem (Decimal, timedelta, textos traduzíveis...)
+    # seguem as mesmas regras do encoder do DRF
+    return _encoder.default(obj)
+
+class FastJSONRenderer(JSONRenderer):
+    if orjson is not None:
+        options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None:
+            # Saída indentada (API navegável, ?indent=) continua com o json padrão
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=_default, option=self.options)
+        # Mesmo escape do JSONRenderer para manter a saída um subconjunto de JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+class FastJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except Exception as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
+
+class StreamingExportRenderer(BaseRenderer):
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Só é chamado para respostas comuns (erros de validação/permissão)
+        if data is None:
+            return b''
+        return FastJSONRenderer().render(data)
+
+class CSVRenderer(StreamingExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+class NDJSONRenderer(StreamingExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
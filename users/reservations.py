@@ -0,0 +1,162 @@
+# users/reservations.py
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+from . import facets
+from .caching import bump_catalog_version
+from .models import Product, StockReservation, StockShard
+
+# Reservas de estoque com contadores fatiados, para produtos de promoção relâmpago.
+#
+# Um produto com reservas habilitadas tem seu estoque dividido em N linhas de
+# StockShard. Reservar (colocar no carrinho) baixa o estoque de UMA fatia
+# escolhida ao acaso com um UPDATE condicional e cria uma StockReservation com
+# prazo de validade. Pedidos simultâneos caem em fatias diferentes e não
+# disputam a mesma linha.
+#
+# Product.stock deixa de ser atualizado a cada reserva e passa a ser
+# reconciliado: estoque = soma das fatias + quantidade ainda reservada.
+# O varredor (`python manage.py sweep_stock_reservations`) devolve às fatias as
+# reservas vencidas e reconcilia os produtos fatiados (inclusive as unidades
+# vendidas no checkout, que apenas apaga a reserva). Alterações manuais de
+# estoque em um produto fatiado devem ser feitas com enable_sharding().
+
+DEFAULT_TTL = timedelta(minutes=15)
+
+class ReservationError(Exception):
+    pass
+
+def reservation_ttl():
+    return getattr(settings, 'STOCK_RESERVATION_TTL', DEFAULT_TTL)
+
+def enable_sharding(product, shards):
+    # Distribui o estoque atual do produto (descontando o que já está reservado) em N fatias
+    if StockShard.objects.filter(product=product).exists():
+        reconcile(product_ids=[product.pk]) # Product.stock pode estar defasado em relação às fatias
+    with transaction.atomic():
+        product = Product.objects.select_for_update().get(pk=product.pk)
+        reserved = StockReservation.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+        available = max(product.stock - reserved, 0)
+        existing = {shard.shard: shard for shard in StockShard.objects.filter(product=product)}
+        per_shard, remainder = divmod(available, shards)
+        rows = []
+        for index in range(shards):
+            shard = existing.pop(index, None) or StockShard(product=product, shard=index)
+            shard.available = per_shard + (1 if index < remainder else 0)
+            rows.append(shard)
+        StockShard.objects.bulk_create([shard for shard in rows if shard.pk is None])
+        StockShard.objects.bulk_update([shard for shard in rows if shard.pk is not None], ['available'])
+        # Fatias excedentes só são removidas quando não têm reservas pendentes
+        StockShard.objects.filter(pk__in=[shard.pk for shard in existing.values()], reservations__isnull=True).delete()
+        StockShard.objects.filter(pk__in=[shard.pk for shard in existing.values()]).update(available=0)
+    return rows
+
+def reserve(product_id, quantity, user=None, ttl=None):
+    shard_ids = list(StockShard.objects.filter(product_id=product_id).values_list('pk', flat=True))
+    if not shard_ids:
+        raise ReservationError('Produto sem reservas de estoque habilitadas.')
+    random.shuffle(shard_ids) # Espalha os clientes simultâneos entre as fatias
+    expires_at = timezone.now() + (ttl or reservation_ttl())
+    for shard_id in shard_ids:
+        with transaction.atomic():
+            # Escrita como primeiro comando da transação: no SQLite o bloqueio é pego de imediato
+            taken = StockShard.objects.filter(pk=shard_id, available__gte=quantity).update(available=F('available') - quantity)
+            if taken:
+                return StockReservation.objects.create(
+                    product_id=product_id, shard_id=shard_id, user=user, quantity=quantity, expires_at=expires_at
+                )
+    return _reserve_across_shards(product_id, quantity, user, expires_at)
+
+def _reserve_across_shards(product_id, quantity, user, expires_at):
+    # Nenhuma fatia sozinha tem a quantidade (fim do estoque ou pedido grande):
+    # junta unidades de várias fatias. As unidades são intercambiáveis, então a
+    # reserva aponta para a primeira fatia e, ao ser devolvida, volta toda para ela.
+    with transaction.atomic():
+        remaining, first_shard = quantity, None
+        shards = StockShard.objects.filter(product_id=product_id, available__gt=0).order_by('-available').values_list('pk', 'available')
+        for shard_id, available in shards:
+            take = min(available, remaining)
+            if StockShard.objects.filter(pk=shard_id, available__gte=take).update(available=F('available') - take):
+                remaining -= take
+                first_shard = first_shard or shard_id
+            if not remaining:
+                return StockReservation.objects.create(
+                    product_id=product_id, shard_id=first_shard, user=user, quantity=quantity, expires_at=expires_at
+                )
+        transaction.set_rollback(True)
+    raise ReservationError('Estoque insuficiente para reservar.')
+
+def release(reservation_id, user=None, product_id=None):
+    # Cancela a reserva (item removido do carrinho) e devolve a quantidade à fatia
+    with transaction.atomic():
+        reservations = StockReservation.objects.filter(pk=reservation_id)
+        if product_id is not None:
+            reservations = reservations.filter(product_id=product_id)
+        if user is not None:
+            reservations = reservations.filter(user=user)
+        reservation = reservations.values('shard_id', 'quantity').first()
+        if reservation is None or not reservations.delete()[0]:
+            raise ReservationError('Reserva não encontrada.')
+        StockShard.objects.filter(pk=reservation['shard_id']).update(available=F('available') + reservation['quantity'])
+
+def consume(reservations, user):
+    # Usado no checkout: {reservation_id: (product_id, quantity)}. Remove as reservas
+    # válidas (não vencidas) em um único DELETE; as unidades já saíram das fatias.
+    condition = Q()
+    for reservation_id, (product_id, quantity) in reservations.items():
+        condition |= Q(pk=reservation_id, product_id=product_id, quantity=quantity)
+    deleted, _ = StockReservation.objects.filter(condition, user=user, expires_at__gt=timezone.now()).delete()
+    return deleted == len(reservations)
+
+def reconcile(product_ids=None):
+    # Product.stock = soma das fatias + unidades reservadas (vencidas ou não, até a varredura)
+    shards = StockShard.objects.all()
+    if product_ids is not None:
+        shards = shards.filter(product_id__in=product_ids)
+    available = dict(shards.values('product_id').annotate(total=Sum('available')).values_list('product_id', 'total'))
+    reserved = dict(
+        StockReservation.objects.filter(product_id__in=list(available))
+        .values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total')
+    )
+    current = dict(Product.objects.filter(pk__in=list(available)).values_list('pk', 'stock'))
+    depleted = restocked = 0
+    with transaction.atomic():
+        for product_id, total in available.items():
+            stock = total + reserved.get(product_id, 0)
+            if current.get(product_id) == stock:
+                continue
+            Product.objects.filter(pk=product_id).update(stock=stock, updated_at=timezone.now())
+            bump_catalog_version()
+            if current.get(product_id, 0) > 0 and stock <= 0:
+                depleted += 1
+            elif current.get(product_id, 0) <= 0 and stock > 0:
+                restocked += 1
+        facets.stock_availability_changed(depleted=depleted, restocked=restocked)
+    return len(available)
+
+def sweep_expired(batch_size=1000, now=None):
+    # Devolve às fatias as reservas vencidas, em lotes, e reconcilia os produtos fatiados
+    now = now or timezone.now()
+    swept = 0
+    while True:
+        batch = list(StockReservation.objects.filter(expires_at__lte=now).values('pk', 'shard_id', 'quantity')[:batch_size])
+        if not batch:
+            break
+        returned = {}
+        with transaction.atomic():
+            deleted, _ = StockReservation.objects.filter(pk__in=[row['pk'] for row in batch], expires_at__lte=now).delete()
+            if deleted != len(batch):
+                transaction.set_rollback(True) # Outro varredor pegou parte do lote: desfaz e relê
+                continue
+            for row in batch:
+                returned[row['shard_id']] = returned.get(row['shard_id'], 0) + row['quantity']
+            for shard_id, quantity in returned.items():
+                StockShard.objects.filter(pk=shard_id).update(available=F('available') + quantity)
+        swept += len(batch)
+    reconcile()
+    return swept
@@ -0,0 +1,114 @@
+# users/routers.py
+import hashlib
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.decorators import sync_and_async_middleware
+
+# Roteamento de leituras para réplicas, com "ler o que escrevi".
+#
+# As aliases listadas em settings.DATABASE_REPLICAS recebem as leituras das
+# requisições GET/HEAD; todo o resto (escritas, requisições POST/PUT/DELETE,
+# comandos de manage.py, sinais fora de requisição) usa o banco principal.
+# Sem réplicas configuradas nada muda.
+#
+# Depois que um cliente escreve (checkout, lista de desejos...), as leituras
+# dele ficam presas ao principal por READ_YOUR_WRITES_WINDOW segundos, para não
+# ler uma réplica ainda atrasada. O cliente é reconhecido sem consultar o banco:
+# pelo cabeçalho Authorization ou pelo cookie de sessão (chave no cache) e, para
+# qualquer cliente que guarde cookies, pelo cookie USE_PRIMARY_COOKIE.
+# Com vários processos, use um cache compartilhado (ver users/caching.py).
+
+USE_PRIMARY_COOKIE = 'use_primary'
+
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+def reading_from_replica():
+    # A requisição atual pode estar lendo de uma réplica (possivelmente atrasada)
+    return _read_from_replica.get() and bool(replica_aliases())
+
+@contextmanager
+def primary_reads():
+    # Dentro do bloco a requisição lê do principal, mesmo podendo usar a réplica
+    token = _read_from_replica.set(False)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+def read_your_writes_window():
+    return getattr(settings, 'READ_YOUR_WRITES_WINDOW', 5)
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db # Relações seguem o banco de onde a instância veio
+        replicas = replica_aliases()
+        # Dentro de uma transação no principal a leitura precisa ver as escritas dela
+        if not replicas or not _read_from_replica.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+def _client_key(request):
+    credentials = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credentials:
+        return None
+    return 'db:use-primary:' + hashlib.sha256(credentials.encode()).hexdigest()
+
+def _pinned_to_primary(request):
+    if request.COOKIES.get(USE_PRIMARY_COOKIE):
+        return True
+    key = _client_key(request)
+    return key is not None and cache.get(key) is not None
+
+def _use_replica(request):
+    return request.method in ('GET', 'HEAD', 'OPTIONS') and bool(replica_aliases()) and not _pinned_to_primary(request)
+
+def _pin_after_write(request, response):
+    if request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400 and replica_aliases():
+        window = read_your_writes_window()
+        key = _client_key(request)
+        if key is not None:
+            cache.set(key, 1, window)
+        response.set_cookie(USE_PRIMARY_COOKIE, '1', max_age=window, httponly=True, samesite='Lax')
+    return response
+
+@sync_and_async_middleware
+def ReplicaRoutingMiddleware(get_response):
+    # Marca a requisição como "pode ler da réplica" e prende o cliente ao principal após escritas.
+    # Respostas em fluxo (StreamingHttpResponse) são geradas depois e leem do principal.
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = _read_from_replica.set(_use_replica(request))
+            try:
+                response = await get_response(request)
+            finally:
+                _read_from_replica.reset(token)
+            return _pin_after_write(request, response)
+    else:
+        def middleware(request):
+            token = _read_from_replica.set(_use_replica(request))
+            try:
+                response = get_response(request)
+            finally:
+                _read_from_replica.reset(token)
+            return _pin_after_write(request, response)
+    return middleware
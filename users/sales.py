@@ -0,0 +1,262 @@
+# users/sales.py
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Category, CustomerSales, DailyCategorySales, DailyProductSales, DailySales, Order, OrderItem, Product
+
+# Resumos de vendas para os painéis da equipe (ver AnalyticsViewSet).
+#
+# Em vez de agregar Order/OrderItem a cada consulta, mantemos quatro tabelas
+# pequenas: vendas por dia, por categoria e dia, por produto e dia e o total
+# de cada cliente. Cada mudança aplica só a diferença (o valor antigo sai e o
+# novo entra) com um INSERT ... ON CONFLICT DO NOTHING, que garante a linha, e
+# um UPDATE ... SET campo = campo + delta por tabela, na mesma transação.
+#
+# - Pedidos: sinais de Order. Pedidos CANCELED não contam; cancelar tira o
+#   pedido e os itens dos totais, reativar devolve.
+# - Itens: o checkout insere com bulk_create e chama items_added(); itens
+#   criados, alterados ou removidos pelo ORM passam pelos sinais de OrderItem.
+# - O dia é a data local de Order.created_at. A receita do dia e do cliente é
+#   a soma de Order.total_amount (com frete e desconto); por categoria e por
+#   produto é quantidade x preço na compra. A categoria é a gravada no item
+#   (OrderItem.category, a do produto no momento da venda), para que baixas e
+#   cancelamentos saiam da mesma linha onde a venda entrou mesmo que o produto
+#   mude de categoria. Itens sem categoria não entram na tabela de categorias.
+#
+# UPDATE/bulk_create direto em pedidos não dispara sinais: depois de cargas ou
+# correções em massa rode `python manage.py rebuild_sales_rollups`.
+
+CANCELED = 'CANCELED'
+ORDER_FIELDS = ('status', 'created_at', 'user_id', 'total_amount')
+ITEM_FIELDS = ('order_id', 'product_id', 'category_id', 'quantity', 'price_at_purchase')
+
+_paused = ContextVar('sales_rollups_paused', default=False)
+
+@contextmanager
+def paused():
+    # Suspende a manutenção incremental (ex.: remoção em massa seguida de rebuild())
+    token = _paused.set(True)
+    try:
+        yield
+    finally:
+        _paused.reset(token)
+
+def _day(moment):
+    return timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+
+def _add(model, deltas):
+    # deltas: {((campo, valor), ...) da chave: {campo: delta}}
+    deltas = {key: values for key, values in deltas.items() if any(values.values())}
+    if not deltas:
+        return
+    # Só acréscimos criam a linha: uma baixa sem linha não tem o que tirar (e a
+    # linha pode estar sendo removida junto, ex.: exclusão do cliente em cascata)
+    missing = [model(**dict(key)) for key, values in deltas.items() if any(value > 0 for value in values.values())]
+    if missing:
+        model.objects.bulk_create(missing, ignore_conflicts=True)
+    condition = Q()
+    for key in deltas:
+        condition |= Q(**dict(key))
+    updates = {}
+    for field in {field for values in deltas.values() for field in values}:
+        output = model._meta.get_field(field)
+        if not isinstance(output, DecimalField):
+            output = IntegerField()
+        whens = [When(Q(**dict(key)), then=Value(values.get(field, 0), output_field=output)) for key, values in deltas.items()]
+        updates[field] = F(field) + Case(*whens, default=Value(0, output_field=output), output_field=output)
+    model.objects.filter(condition).update(**updates)
+
+def _merge(target, key, **values):
+    entry = target.setdefault(key, {})
+    for field, value in values.items():
+        entry[field] = entry.get(field, 0) + value
+
+def _apply_items(day, rows, sign):
+    # rows: (product_id, category_id, quantity, price_at_purchase)
+    products, categories, units = {}, {}, 0
+    for product_id, category_id, quantity, price in rows:
+        revenue = sign * quantity * Decimal(price)
+        _merge(products, (('date', day), ('product_id', product_id)), units=sign * quantity, revenue=revenue)
+        if category_id is not None:
+            _merge(categories, (('date', day), ('category_id', category_id)), units=sign * quantity, revenue=revenue)
+        units += sign * quantity
+    _add(DailyProductSales, products)
+    _add(DailyCategorySales, categories)
+    _add(DailySales, {(('date', day),): {'units': units}})
+
+def _apply_order(state, sign):
+    counted, day, user_id, total = state
+    if counted:
+        _add(DailySales, {(('date', day),): {'orders': sign, 'revenue': sign * total}})
+        _add(CustomerSales, {(('user_id', user_id),): {'orders': sign, 'total_spent': sign * total}})
+
+def _order_state(values):
+    # (conta nos totais?, dia, cliente, total)
+    return (values['status'] != CANCELED, _day(values['created_at']), values['user_id'], Decimal(values['total_amount']))
+
+def _snapshot(instance, fields):
+    # Valores que o banco tinha antes do save: os carregados em from_db ou, se
+    # a instância não os tem (criada à mão com pk, only()...), uma leitura no pre_save
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    if not set(fields) <= set(loaded):
+        loaded = type(instance).objects.filter(pk=instance.pk).values(*fields).first() or {}
+    return loaded
+
+def order_pre_save(instance):
+    if not instance._state.adding and instance.pk is not None and not _paused.get():
+        instance._sales_previous = _snapshot(instance, ORDER_FIELDS)
+
+def order_saved(instance, created):
+    previous_values = instance.__dict__.pop('_sales_previous', None)
+    current_values = {field: getattr(instance, field) for field in ORDER_FIELDS}
+    instance._loaded_values = {**getattr(instance, '_loaded_values', {}), **current_values}
+    if _paused.get():
+        return
+    previous = _order_state(previous_values) if previous_values else None
+    current = _order_state(current_values)
+    if previous == current:
+        return
+    with transaction.atomic():
+        if previous is not None:
+            _apply_order(previous, -1)
+        _apply_order(current, 1)
+        # Os itens acompanham o pedido quando ele entra/sai dos totais ou muda de dia
+        if previous is not None and previous[:2] != current[:2]:
+            rows = list(OrderItem.objects.filter(order_id=instance.pk).values_list('product_id', 'category_id', 'quantity', 'price_at_purchase'))
+            if previous[0]:
+                _apply_items(previous[1], rows, -1)
+            if current[0]:
+                _apply_items(current[1], rows, 1)
+
+def order_deleted(instance):
+    # Os itens já saíram pelos sinais de OrderItem (a exclusão em cascata os remove antes)
+    if not _paused.get():
+        _apply_order(_order_state({field: getattr(instance, field) for field in ORDER_FIELDS}), -1)
+
+def items_added(order, rows):
+    # Itens inseridos em massa (checkout); rows: (product_id, category_id, quantity, price_at_purchase)
+    if not _paused.get() and order.status != CANCELED:
+        _apply_items(_day(order.created_at), rows, 1)
+
+def _item_order(order_id):
+    return Order.objects.filter(pk=order_id).values('status', 'created_at').first()
+
+def _category(product_id):
+    return Product.objects.filter(pk=product_id).values_list('category_id', flat=True).first()
+
+def item_pre_save(instance):
+    previous = None
+    if not instance._state.adding and instance.pk is not None:
+        previous = _snapshot(instance, ITEM_FIELDS)
+    # Item novo ou trocado de produto: grava a categoria atual do produto
+    if (previous is None and instance.category_id is None) or (previous is not None and previous.get('product_id') != instance.product_id):
+        instance.category_id = _category(instance.product_id)
+    if previous is not None and not _paused.get():
+        instance._sales_previous = previous
+
+def item_saved(instance, created):
+    previous = instance.__dict__.pop('_sales_previous', None)
+    current = {field: getattr(instance, field) for field in ITEM_FIELDS}
+    instance._loaded_values = {**getattr(instance, '_loaded_values', {}), **current}
+    if _paused.get() or previous == current:
+        return
+    with transaction.atomic():
+        for values, sign in ((previous, -1), (current, 1)):
+            order = _item_order(values['order_id']) if values else None
+            if order is not None and order['status'] != CANCELED:
+                row = (values['product_id'], values['category_id'], values['quantity'], values['price_at_purchase'])
+                _apply_items(_day(order['created_at']), [row], sign)
+
+def item_deleted(instance):
+    if _paused.get():
+        return
+    order = _item_order(instance.order_id)
+    if order is not None and order['status'] != CANCELED:
+        row = (instance.product_id, instance.category_id, instance.quantity, instance.price_at_purchase)
+        _apply_items(_day(order['created_at']), [row], -1)
+
+def rebuild(batch_size=2000):
+    # Recalcula todos os resumos a partir de Order/OrderItem (backfill)
+    counted = Order.objects.exclude(status=CANCELED)
+    items = OrderItem.objects.filter(order__in=counted).annotate(date=TruncDate('order__created_at'))
+    revenue = Sum(F('quantity') * F('price_at_purchase'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    days = {row['date']: row for row in counted.annotate(date=TruncDate('created_at')).order_by().values('date').annotate(orders=Count('pk'), revenue=Sum('total_amount'))}
+    units = dict(items.order_by().values('date').annotate(units=Sum('quantity')).values_list('date', 'units'))
+    with transaction.atomic():
+        for model in (DailySales, DailyCategorySales, DailyProductSales, CustomerSales):
+            model.objects.all().delete()
+        DailySales.objects.bulk_create([
+            DailySales(date=day, orders=row['orders'], revenue=row['revenue'], units=units.get(day, 0)) for day, row in days.items()
+        ], batch_size=batch_size)
+        DailyCategorySales.objects.bulk_create((
+            DailyCategorySales(date=row['date'], category_id=row['category_id'], units=row['units'], revenue=row['revenue'])
+            for row in items.filter(category__isnull=False).order_by()
+            .values('date', 'category_id').annotate(units=Sum('quantity'), revenue=revenue).iterator()
+        ), batch_size=batch_size)
+        DailyProductSales.objects.bulk_create((
+            DailyProductSales(date=row['date'], product_id=row['product_id'], units=row['units'], revenue=row['revenue'])
+            for row in items.order_by().values('date', 'product_id').annotate(units=Sum('quantity'), revenue=revenue).iterator()
+        ), batch_size=batch_size)
+        CustomerSales.objects.bulk_create((
+            CustomerSales(user_id=row['user_id'], orders=row['orders'], total_spent=row['total_spent'])
+            for row in counted.order_by().values('user_id').annotate(orders=Count('pk'), total_spent=Sum('total_amount')).iterator()
+        ), batch_size=batch_size)
+    return len(days)
+
+# Consultas dos painéis: só leem os resumos, nunca Order/OrderItem
+
+CENTS = Decimal('0.01')
+
+def _money(value):
+    return f'{(value or Decimal(0)).quantize(CENTS):f}'
+
+def _in_period(queryset, date_from=None, date_to=None):
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    return queryset
+
+def revenue_by_day(date_from=None, date_to=None):
+    days = list(_in_period(DailySales.objects.order_by('date'), date_from, date_to).values('date', 'orders', 'units', 'revenue'))
+    return {
+        'orders': sum(day['orders'] for day in days),
+        'units': sum(day['units'] for day in days),
+        'revenue': _money(sum((day['revenue'] for day in days), Decimal(0))),
+        'days': [{**day, 'date': day['date'].isoformat(), 'revenue': _money(day['revenue'])} for day in days],
+    }
+
+def revenue_by_category(date_from=None, date_to=None):
+    rows = list(
+        _in_period(DailyCategorySales.objects.all(), date_from, date_to).order_by().values('category_id')
+        .annotate(units=Sum('units'), revenue=Sum('revenue')).order_by('-revenue', 'category_id')
+    )
+    names = dict(Category.objects.filter(pk__in=[row['category_id'] for row in rows]).values_list('pk', 'name'))
+    return [
+        {'category': row['category_id'], 'category_name': names.get(row['category_id']), 'units': row['units'], 'revenue': _money(row['revenue'])}
+        for row in rows
+    ]
+
+def top_products(date_from=None, date_to=None, limit=20):
+    rows = list(
+        _in_period(DailyProductSales.objects.all(), date_from, date_to).order_by().values('product_id')
+        .annotate(units=Sum('units'), revenue=Sum('revenue')).order_by('-revenue', 'product_id')[:limit]
+    )
+    names = dict(Product.objects.filter(pk__in=[row['product_id'] for row in rows]).values_list('pk', 'name'))
+    return [
+        {'product': row['product_id'], 'product_name': names.get(row['product_id']), 'units': row['units'], 'revenue': _money(row['revenue'])}
+        for row in rows
+    ]
+
+def top_customers(limit=20):
+    rows = CustomerSales.objects.filter(orders__gt=0).order_by('-total_spent', 'user_id').values('user_id', 'user__username', 'orders', 'total_spent')[:limit]
+    return [
+        {'user': row['user_id'], 'username': row['user__username'], 'orders': row['orders'], 'total_spent': _money(row['total_spent'])}
+        for row in rows
+    ]
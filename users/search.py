@@ -0,0 +1,105 @@
+# users/search.py
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Product
+
+# Busca textual de produtos com um índice FTS5 do SQLite.
+# A tabela virtual guarda nome, descrição e variações de cada produto, usando o
+# id do produto como rowid. O tokenizer 'unicode61 remove_diacritics 2' remove
+# acentos tanto no índice quanto na consulta, então "macacao" encontra "macacão".
+# A tabela é criada na migração 0004. O índice é mantido incrementalmente pelos sinais em signals.py e pode ser
+# reconstruído com `python manage.py rebuild_product_search`.
+
+FTS_TABLE = 'users_product_fts'
+# Pesos do bm25 por coluna: nome pesa mais que variações, que pesam mais que a descrição
+FTS_WEIGHTS = (10.0, 1.0, 2.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+def _row(product):
+    return (product.pk, product.name or '', product.description or '', product.variations or '')
+
+def index_product(product):
+    # FTS5 não tem UPDATE por conteúdo: removemos a linha antiga e inserimos a nova
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, description, variations) VALUES (%s, %s, %s, %s)",
+            _row(product)
+        )
+
+def index_products(product_ids):
+    # Reindexa vários produtos de uma vez (importação em lote, que não dispara sinais)
+    if not is_supported() or not product_ids:
+        return
+    rows = Product.objects.filter(pk__in=product_ids).values_list('pk', 'name', 'description', 'variations')
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in product_ids])
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, description, variations) VALUES (%s, %s, %s, %s)",
+            [(pk, name or '', description or '', variations or '') for pk, name, description, variations in rows]
+        )
+
+def remove_product(product_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product_id])
+
+def rebuild_index(batch_size=2000):
+    # Recria o índice inteiro a partir da tabela de produtos, em lotes
+    if not is_supported():
+        return 0
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        rows = Product.objects.order_by('pk').values_list('pk', 'name', 'description', 'variations')
+        batch = []
+        for pk, name, description, variations in rows.iterator(chunk_size=batch_size):
+            batch.append((pk, name or '', description or '', variations or ''))
+            if len(batch) >= batch_size:
+                cursor.executemany(
+                    f"INSERT INTO {FTS_TABLE} (rowid, name, description, variations) VALUES (%s, %s, %s, %s)", batch
+                )
+                total += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description, variations) VALUES (%s, %s, %s, %s)", batch
+            )
+            total += len(batch)
+    return total
+
+def build_match_expression(query):
+    # Cada palavra vira um termo entre aspas com busca por prefixo ("fralda"*),
+    # o que também neutraliza a sintaxe especial do FTS5 vinda do usuário.
+    tokens = TOKEN_RE.findall(query)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+def search_product_ids(query, limit=20):
+    # Retorna os ids dos produtos ordenados por relevância (bm25)
+    match = build_match_expression(query)
+    if not match:
+        return []
+    if not is_supported():
+        # Outros bancos: busca simples por substring, ordenada por nome
+        filters = Q()
+        for token in TOKEN_RE.findall(query):
+            filters &= Q(name__icontains=token) | Q(description__icontains=token) | Q(variations__icontains=token)
+        return list(Product.objects.filter(filters).order_by('name').values_list('pk', flat=True)[:limit])
+    weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s",
+            [match, limit]
+        )
+        return [row[0] for row in cursor.fetchall()]
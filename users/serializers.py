@@ -1,74 +1,209 @@
 # users/serializers.py
 from rest_framework import serializers
 from django.contrib.auth.models import User # Django's built-in User model
+from django.db.models import Prefetch
 from .models import (
     Category, Product, Address, Order, OrderItem, Review, Coupon,
-    Wishlist, WishlistProduct
+    Wishlist, WishlistProduct, ProductVariant, StockReservation
 )
-
-class UserSerializer(serializers.ModelSerializer):
+from . import batch, metrics
+
+class EagerLoadingMixin:
+    # Plano de consulta declarado junto ao serializer: cada serializer lista as
+    # relações que percorre, e a viewset aplica o plano no queryset antes de
+    # serializar. Assim evitamos uma consulta extra por linha (N+1).
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def get_prefetch_related_fields(cls):
+        return cls.prefetch_related_fields
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        prefetch_related_fields = cls.get_prefetch_related_fields()
+        if prefetch_related_fields:
+            queryset = queryset.prefetch_related(*prefetch_related_fields)
+        return queryset
+
+    def to_representation(self, instance):
+        # Entra no tempo de serialização da requisição (ver users/metrics.py)
+        with metrics.timed('serializer'):
+            return super().to_representation(instance)
+
+class UserSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email'] # Campos que queremos expor do User padrão
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = '__all__' # Inclui todos os campos do modelo
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductVariantSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    options = serializers.SerializerMethodField() # Ex: {'Tamanho': 'M', 'Cor': 'Azul'}
+
+    prefetch_related_fields = ('options',)
+
+    class Meta:
+        model = ProductVariant
+        fields = ['id', 'options', 'stock', 'price']
+
+    def get_options(self, obj):
+        # Usa as opções pré-carregadas (prefetch) em vez de consultar por variante
+        return {option.name: option.value for option in obj.options.all()}
+
+class ProductSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True) # Exibe a categoria aninhada
     category_id = serializers.PrimaryKeyRelatedField(queryset=Category.objects.all(), source='category', write_only=True)
+    variants = ProductVariantSerializer(many=True, read_only=True) # Variantes estruturadas (tamanho, cor...)
+    rating_average = serializers.DecimalField(max_digits=3, decimal_places=2, read_only=True) # Média denormalizada
+    rating_histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True) # {1: n, ..., 5: n}
+
+    select_related_fields = ('category',)
+
+    @classmethod
+    def get_prefetch_related_fields(cls, prefix=''):
+        # As variantes e suas opções vêm em duas consultas para a página inteira
+        variants = ProductVariantSerializer.setup_eager_loading(ProductVariant.objects.all())
+        return (Prefetch(f'{prefix}variants', queryset=variants),)
 
     class Meta:
         model = Product
-        fields = '__all__' # Inclui todos os campos do modelo, incluindo a URL da imagem principal e variações
+        # Todos os campos do modelo, exceto os contadores internos das avaliações
+        # (expostos como rating_average e rating_histogram) e o contador de listas
+        # de desejos, que muda a cada clique e fica só no ranking /products/most-wished/
+        exclude = ['rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5', 'wished_by_count']
+        read_only_fields = ['rating_count']
 
-class AddressSerializer(serializers.ModelSerializer):
+class AddressSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = Address
         fields = '__all__'
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True) # Nome do produto
     product_price = serializers.DecimalField(source='product.price', max_digits=10, decimal_places=2, read_only=True) # Preço atual do produto
 
+    select_related_fields = ('product',)
+
     class Meta:
         model = OrderItem
         fields = ['id', 'product', 'product_name', 'product_price', 'quantity', 'price_at_purchase', 'order']
         read_only_fields = ['order'] # O order será definido na viewset do Order
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True) # Inclui os itens do pedido
     shipping_address = AddressSerializer(read_only=True) # Inclui os dados do endereço de entrega
 
+    select_related_fields = ('shipping_address',)
+
+    @classmethod
+    def get_prefetch_related_fields(cls):
+        # Os itens reaproveitam o plano do OrderItemSerializer (item -> produto)
+        return (Prefetch('items', queryset=OrderItemSerializer.setup_eager_loading(OrderItem.objects.all())),)
+
     class Meta:
         model = Order
         fields = '__all__'
 
-class ReviewSerializer(serializers.ModelSerializer):
+class CartItemSerializer(serializers.Serializer):
+    product = serializers.IntegerField() # Id do produto
+    quantity = serializers.IntegerField(min_value=1)
+    reservation = serializers.IntegerField(required=False) # Id da reserva de estoque, para produtos fatiados
+
+class StockReservationSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockReservation
+        fields = ['id', 'product', 'quantity', 'created_at', 'expires_at']
+
+class ReserveStockSerializer(serializers.Serializer):
+    quantity = serializers.IntegerField(min_value=1)
+
+class WishlistBatchSerializer(serializers.Serializer):
+    # Ex: {"add": [1, 2, 3], "remove": [7]}
+    add = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list, max_length=500)
+    remove = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list, max_length=500)
+
+    def validate(self, attrs):
+        if not attrs['add'] and not attrs['remove']:
+            raise serializers.ValidationError('Informe produtos em "add" e/ou "remove".')
+        return attrs
+
+class BatchSubRequestSerializer(serializers.Serializer):
+    id = serializers.CharField(max_length=100, required=False) # Devolvido na resposta para o cliente casar os resultados
+    method = serializers.ChoiceField(choices=batch.METHODS, default='GET')
+    path = serializers.CharField(max_length=2000) # Relativo a /api/v1/ ou absoluto, com query string
+    body = serializers.JSONField(required=False, allow_null=True)
+
+class BatchRequestSerializer(serializers.Serializer):
+    # Ex: {"parallel": true, "requests": [{"id": "me", "path": "users/me/"}, ...]}
+    requests = BatchSubRequestSerializer(many=True, allow_empty=False)
+    parallel = serializers.BooleanField(default=False) # Roda leituras consecutivas em paralelo
+
+    def validate_requests(self, value):
+        if len(value) > batch.max_requests():
+            raise serializers.ValidationError(f'O lote aceita no máximo {batch.max_requests()} sub-requisições.')
+        return value
+
+class CouponValidationSerializer(serializers.Serializer):
+    code = serializers.CharField(max_length=50)
+    subtotal = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False) # Para calcular o desconto
+
+class CheckoutSerializer(serializers.Serializer):
+    # Carrinho enviado pelo frontend para finalizar o pedido (ver users/checkout.py)
+    items = CartItemSerializer(many=True, allow_empty=False)
+    payment_method = serializers.CharField(max_length=50)
+    shipping_address = serializers.IntegerField(required=False, allow_null=True) # Id do endereço do usuário
+    shipping_cost = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, default=0)
+    coupon = serializers.CharField(max_length=50, required=False, allow_blank=True) # Código do cupom, resgatado no checkout
+
+    def validate_items(self, items):
+        # Cada reserva cobre uma linha só; repetida, seria consumida uma vez e cobrada em dobro
+        reservations = [item['reservation'] for item in items if item.get('reservation')]
+        if len(reservations) != len(set(reservations)):
+            raise serializers.ValidationError('A mesma reserva de estoque aparece em mais de um item.')
+        return items
+
+class ReviewSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True) # Exibe o usuário que fez a avaliação
     product_name = serializers.CharField(source='product.name', read_only=True)
 
+    select_related_fields = ('user', 'product')
+
     class Meta:
         model = Review
         fields = '__all__'
 
-class CouponSerializer(serializers.ModelSerializer):
+class CouponSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = Coupon
         fields = '__all__'
 
-class WishlistProductSerializer(serializers.ModelSerializer):
+class WishlistProductSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     product_details = ProductSerializer(source='product', read_only=True)
 
+    select_related_fields = ('product__category',)
+
+    @classmethod
+    def get_prefetch_related_fields(cls):
+        return ProductSerializer.get_prefetch_related_fields(prefix='product__')
+
     class Meta:
         model = WishlistProduct
         fields = ['product', 'added_at', 'product_details'] # O 'product' aqui é o ID do produto
 
-class WishlistSerializer(serializers.ModelSerializer):
+class WishlistSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     products = WishlistProductSerializer(source='wishlistproduct_set', many=True, read_only=True) # Acessa a tabela de junção
 
+    @classmethod
+    def get_prefetch_related_fields(cls):
+        # Os produtos da lista reaproveitam o plano do WishlistProductSerializer
+        return (Prefetch('wishlistproduct_set', queryset=WishlistProductSerializer.setup_eager_loading(WishlistProduct.objects.all())),)
+
     class Meta:
         model = Wishlist
         fields = '__all__'
\ No newline at end of file
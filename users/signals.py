@@ -0,0 +1,93 @@
+# users/signals.py
+from django.db.models.signals import m2m_changed, pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import coupons, facets, ratings, sales, search, wishlists
+from .caching import bump_catalog_version
+from .models import (
+    Category, Coupon, Order, OrderItem, Product, ProductVariant, Review, VariantOption, WishlistProduct
+)
+
+# Mantém estruturas derivadas (como o índice de busca) em dia quando os modelos mudam.
+# Operações em massa (bulk_create, update) não disparam sinais: use os comandos
+# de reconstrução em users/management/commands depois delas.
+
+@receiver(post_save, sender=Product)
+def index_product_for_search(sender, instance, **kwargs):
+    search.index_product(instance)
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_search(sender, instance, **kwargs):
+    search.remove_product(instance.pk)
+
+@receiver(post_save, sender=Product)
+def update_product_facet_counts(sender, instance, **kwargs):
+    facets.product_saved(instance)
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_facet_counts(sender, instance, **kwargs):
+    facets.product_deleted(instance)
+
+@receiver(post_save, sender=Review)
+def update_product_ratings(sender, instance, created, **kwargs):
+    ratings.review_saved(instance, created)
+
+@receiver(post_delete, sender=Review)
+def remove_review_from_product_ratings(sender, instance, **kwargs):
+    ratings.review_deleted(instance)
+
+@receiver(post_save, sender=WishlistProduct)
+def count_wishlist_product(sender, instance, created, **kwargs):
+    if created:
+        wishlists.wishlist_product_created(instance)
+
+@receiver(post_delete, sender=WishlistProduct)
+def uncount_wishlist_product(sender, instance, **kwargs):
+    wishlists.wishlist_product_deleted(instance)
+
+@receiver(pre_save, sender=Order)
+def snapshot_order_for_sales(sender, instance, **kwargs):
+    sales.order_pre_save(instance)
+
+@receiver(post_save, sender=Order)
+def update_sales_for_order(sender, instance, created, **kwargs):
+    sales.order_saved(instance, created)
+
+@receiver(post_delete, sender=Order)
+def remove_order_from_sales(sender, instance, **kwargs):
+    sales.order_deleted(instance)
+
+@receiver(pre_save, sender=OrderItem)
+def snapshot_order_item_for_sales(sender, instance, **kwargs):
+    sales.item_pre_save(instance)
+
+@receiver(post_save, sender=OrderItem)
+def update_sales_for_order_item(sender, instance, created, **kwargs):
+    sales.item_saved(instance, created)
+
+@receiver(post_delete, sender=OrderItem)
+def remove_order_item_from_sales(sender, instance, **kwargs):
+    sales.item_deleted(instance)
+
+@receiver(post_save, sender=Coupon)
+@receiver(post_delete, sender=Coupon)
+def invalidate_coupon_cache(sender, instance, **kwargs):
+    coupons.invalidate(instance.code)
+    loaded = getattr(instance, '_loaded_values', {}).get('code')
+    if loaded and loaded != instance.code:
+        coupons.invalidate(loaded) # O código foi alterado: a entrada antiga também sai
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_save, sender=VariantOption)
+@receiver(post_delete, sender=VariantOption)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(m2m_changed, sender=ProductVariant.options.through)
+def invalidate_catalog_cache(sender, **kwargs):
+    # Qualquer mudança visível no catálogo muda a versão das chaves de cache (ver users/caching.py)
+    bump_catalog_version()
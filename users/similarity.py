@@ -0,0 +1,180 @@
+# users/similarity.py
+import hashlib
+import heapq
+import math
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .caching import bump_catalog_version
+from .models import ProcessingCheckpoint, Product, ProductFingerprint, SimilarProduct
+from .projections import ProductProjection
+from .search import TOKEN_RE
+
+# Produtos semelhantes por conteúdo, para produtos que ainda não têm pedidos
+# (a página do produto cai para eles em /bought-together/).
+#
+# Cada produto vira um vetor TF-IDF (tf sublinear, idf suavizado, norma 1) dos
+# termos do nome (peso NAME_WEIGHT), da descrição e da categoria; o cosseno
+# entre dois vetores é o produto escalar. Termos presentes em mais de
+# MAX_DOCUMENT_FREQUENCY dos produtos são ignorados, como palavras vazias.
+# SimilarProduct guarda os K mais parecidos de cada produto, lidos pela página
+# do produto em uma consulta, como BoughtTogether (users/recommendations.py).
+#
+# refresh_similar() só trabalha quando o conteúdo muda: updated_at seleciona
+# os candidatos desde a última execução (baixas de estoque também o alteram) e
+# a assinatura de nome, descrição e categoria (ProductFingerprint) confirma a
+# mudança. Havendo alguma, o catálogo é revetorizado (o idf depende de todos
+# os produtos), mas só são recalculados os vizinhos dos produtos alterados e
+# dos produtos cuja lista eles podem mudar, usando um índice invertido
+# (termo -> produtos). A variação do idf nos produtos não recalculados e as
+# lacunas deixadas por produtos excluídos só são corrigidas pelo --rebuild.
+# Rode `python manage.py update_similar_products` periodicamente.
+
+CHECKPOINT = 'similar_products'
+NAME_WEIGHT = 3 # Cada termo do nome conta como 3 ocorrências
+CATEGORY_WEIGHT = 2
+MAX_DOCUMENT_FREQUENCY = 0.5
+STOP_WORDS = frozenset('de da do das dos em no na nos nas um uma para por com sem e ou the and for with'.split())
+
+def top_k():
+    return getattr(settings, 'SIMILAR_PRODUCTS_TOP_K', 10)
+
+def _chunks(values, size=500):
+    values = sorted(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def tokenize(text):
+    # Minúsculas, sem acentos ("Calção" -> "calcao"), sem palavras vazias e letras soltas
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return [token for token in TOKEN_RE.findall(text) if len(token) > 1 and token not in STOP_WORDS]
+
+def product_terms(name, description, category_id):
+    terms = Counter()
+    for token in tokenize(name):
+        terms[token] += NAME_WEIGHT
+    terms.update(tokenize(description))
+    if category_id is not None:
+        terms[f'categoria:{category_id}'] = CATEGORY_WEIGHT # Não colide com os tokens (\w+)
+    return terms
+
+def vectorize(documents):
+    # {produto: Counter de termos} -> ({produto: {termo: peso}}, {termo: [(produto, peso)]})
+    # As listas invertidas só têm termos de 2 ou mais produtos, os únicos que somam similaridade.
+    total = len(documents)
+    frequency = Counter(term for terms in documents.values() for term in terms)
+    max_frequency = MAX_DOCUMENT_FREQUENCY * total
+    idf = {term: math.log((1 + total) / (1 + count)) + 1 for term, count in frequency.items() if count <= max_frequency}
+    vectors, postings = {}, defaultdict(list)
+    for product_id, terms in documents.items():
+        weights = {term: (1 + math.log(count)) * idf[term] for term, count in terms.items() if term in idf}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+        vectors[product_id] = {term: weight / norm for term, weight in weights.items()}
+        for term, weight in vectors[product_id].items():
+            if frequency[term] > 1:
+                postings[term].append((product_id, weight))
+    return vectors, postings
+
+def _scores(product_id, vectors, postings):
+    scores = defaultdict(float)
+    for term, weight in vectors[product_id].items():
+        for other, other_weight in postings.get(term, ()):
+            scores[other] += weight * other_weight
+    scores.pop(product_id, None)
+    return scores
+
+def _top(scores, k):
+    # Maior similaridade primeiro; empate pelo menor id
+    best = heapq.nlargest(k, ((score, -other) for other, score in scores if score > 0))
+    return [(-negative_id, round(score, 6)) for score, negative_id in best]
+
+def similar_neighbors(product_ids, vectors, postings, k):
+    # {produto: [(outro, similaridade), ...]} com os k mais parecidos de cada produto
+    return {product_id: _top(_scores(product_id, vectors, postings).items(), k) for product_id in product_ids}
+
+def fingerprint(name, description, category_id):
+    return hashlib.md5(f'{name}\x1f{description or ""}\x1f{category_id or ""}'.encode()).hexdigest()
+
+def content_changes(since=None):
+    # {produto: nova assinatura} dos produtos cujo conteúdo mudou (ou nunca foi indexado)
+    rows = Product.objects.values_list('pk', 'name', 'description', 'category_id')
+    if since is not None:
+        rows = rows.filter(updated_at__gt=since)
+    current = {pk: fingerprint(name, description, category_id) for pk, name, description, category_id in rows.iterator(chunk_size=2000)}
+    stored = {}
+    for chunk in _chunks(current):
+        stored.update(ProductFingerprint.objects.filter(product_id__in=chunk).values_list('product_id', 'content_hash'))
+    return {pk: content_hash for pk, content_hash in current.items() if stored.get(pk) != content_hash}
+
+def _affected_by(changed, vectors, postings, k):
+    # Produtos cuja lista pode mudar: citam um produto alterado ou passam a tê-lo entre os k mais parecidos
+    affected = set()
+    for chunk in _chunks(changed):
+        affected.update(SimilarProduct.objects.filter(related_id__in=chunk).values_list('product_id', flat=True))
+    best = defaultdict(float)
+    for product_id in changed:
+        for other, score in _scores(product_id, vectors, postings).items():
+            best[other] = max(best[other], score)
+    for chunk in _chunks(best.keys() - changed - affected):
+        current = {
+            row['product_id']: (row['total'], row['lowest'])
+            for row in SimilarProduct.objects.filter(product_id__in=chunk).values('product_id').annotate(total=Count('id'), lowest=Min('score'))
+        }
+        affected.update(
+            product_id for product_id in chunk
+            if product_id not in current or current[product_id][0] < k or round(best[product_id], 6) >= current[product_id][1]
+        )
+    return affected
+
+def refresh_similar(k=None, rebuild=False):
+    # Atualiza os semelhantes dos produtos com conteúdo alterado desde a última execução; retorna quantos foram recalculados
+    k = k or top_k()
+    checkpoint, _ = ProcessingCheckpoint.objects.get_or_create(name=CHECKPOINT)
+    started = timezone.now() # Alterações durante a execução ficam para a próxima
+    full = rebuild or checkpoint.processed_until is None
+    changed = content_changes(None if full else checkpoint.processed_until)
+    targets = set()
+    if full or changed:
+        rows = Product.objects.order_by('pk').values_list('pk', 'name', 'description', 'category_id')
+        documents = {pk: product_terms(name, description, category_id) for pk, name, description, category_id in rows.iterator(chunk_size=2000)}
+        vectors, postings = vectorize(documents)
+        if full:
+            targets = set(vectors)
+        else:
+            targets = (changed.keys() & vectors.keys()) | _affected_by(changed.keys() & vectors.keys(), vectors, postings, k)
+    neighbors = similar_neighbors(targets, vectors, postings, k) if targets else {}
+    with transaction.atomic():
+        if rebuild:
+            SimilarProduct.objects.all().delete()
+        else:
+            for chunk in _chunks(targets):
+                SimilarProduct.objects.filter(product_id__in=chunk).delete()
+        SimilarProduct.objects.bulk_create([
+            SimilarProduct(product_id=product_id, related_id=other, rank=rank, score=score)
+            for product_id, top in neighbors.items() for rank, (other, score) in enumerate(top, 1)
+        ], batch_size=2000)
+        for chunk in _chunks(changed):
+            ProductFingerprint.objects.filter(product_id__in=chunk).delete()
+        ProductFingerprint.objects.bulk_create([
+            ProductFingerprint(product_id=pk, content_hash=content_hash) for pk, content_hash in changed.items()
+        ], batch_size=2000)
+        checkpoint.processed_until = started
+        checkpoint.save(update_fields=['processed_until', 'updated_at'])
+    if targets:
+        bump_catalog_version()
+    return len(targets)
+
+def similar_products(product_id, limit=None):
+    # Mesma leitura de recommendations.bought_together(), pelo índice (product, rank) de SimilarProduct
+    queryset = Product.objects.filter(similar_of__product_id=product_id).order_by('similar_of__rank')
+    rows = list(queryset.values(*ProductProjection.columns, 'similar_of__score')[:limit or top_k()])
+    products = ProductProjection.build(rows)
+    for product, row in zip(products, rows):
+        product['similarity'] = row['similar_of__score']
+    return products
@@ -1,3 +1,1269 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+import base64
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models import Sum
+from django.conf import settings
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient, APITestCase
+
+from .models import (
+    Category, Product, Address, Order, OrderItem, Review, Coupon, Wishlist,
+    WishlistProduct, ProductVariant, StockReservation, StockShard, VariantOption,
+    CustomerSales, DailyCategorySales, DailyProductSales, DailySales,
+    BoughtTogether, ProductCooccurrence, SimilarProduct
+)
+from . import benchmarking, checkout, recommendations, reservations, sales, similarity, wishlists
+from .projections import OrderProjection, ProductProjection, WishlistProjection
+from .metrics import registry
+from .renderers import msgpack
+from .routers import USE_PRIMARY_COOKIE
+from .serializers import OrderSerializer, ProductSerializer, WishlistSerializer
+from .variants import create_variants, parse_variations
+
+
+# Funções auxiliares para popular o banco nos testes
+def create_products(count, category=None, prefix='Produto'):
+    category = category or Category.objects.create(name=f'Categoria {prefix}')
+    return Product.objects.bulk_create([
+        Product(name=f'{prefix} {i:04d}', price=Decimal('10.00') + i, stock=10, category=category)
+        for i in range(count)
+    ])
+
+
+def create_orders(user, count, products, prefix='PED'):
+    address = Address.objects.create(
+        user=user, street='Rua A', number='1', neighborhood='Centro',
+        city='São Paulo', state='SP', zip_code='01000-000'
+    )
+    for i in range(count):
+        order = Order.objects.create(
+            user=user, order_number=f'{prefix}-{user.pk}-{i}', total_amount=Decimal('0.00'),
+            payment_method='PIX', shipping_address=address
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=1, price_at_purchase=product.price)
+            for product in products
+        ])
+
+
+class QueryBudgetTests(APITestCase):
+    # Cada endpoint de listagem tem um orçamento fixo de consultas SQL. O teste
+    # mede o endpoint com poucos e com muitos registros: se o número de
+    # consultas crescer com as linhas (N+1), o orçamento estoura.
+    budgets = {
+        '/api/v1/users/': 1,
+        '/api/v1/categories/': 1,
+        '/api/v1/products/': 4, # Página + variantes + opções + contagens de facetas
+        '/api/v1/addresses/': 1,
+        '/api/v1/orders/': 2,
+        '/api/v1/order-items/': 1,
+        '/api/v1/reviews/': 1,
+        '/api/v1/coupons/': 1,
+        '/api/v1/wishlists/': 4,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente', password='senha-segura')
+        self.wishlist = Wishlist.objects.create(user=self.user)
+        self.client.force_authenticate(self.user)
+
+    def grow(self, size):
+        products = create_products(size, prefix=f'Lote {size}')
+        create_orders(self.user, size, products[:3], prefix=f'PED{size}')
+        for i, product in enumerate(products):
+            reviewer = User.objects.create_user(username=f'avaliador-{size}-{i}')
+            Review.objects.create(user=reviewer, product=product, rating=(i % 5) + 1)
+        WishlistProduct.objects.bulk_create([
+            WishlistProduct(wishlist=self.wishlist, product=product) for product in products
+        ])
+
+    def assertQueryBudget(self, url, budget):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        self.assertLessEqual(
+            len(ctx.captured_queries), budget,
+            f'{url} executou {len(ctx.captured_queries)} consultas (orçamento: {budget})'
+        )
+        return response
+
+    def test_list_endpoints_stay_within_budget_as_rows_grow(self):
+        for size in (2, 20):
+            self.grow(size)
+            for url, budget in self.budgets.items():
+                with self.subTest(url=url, size=size):
+                    self.assertQueryBudget(url, budget)
+
+    def test_detail_endpoints_stay_within_budget(self):
+        self.grow(5)
+        order = Order.objects.filter(user=self.user).first()
+        product = Product.objects.first()
+        self.assertQueryBudget(f'/api/v1/orders/{order.pk}/', 2)
+        self.assertQueryBudget(f'/api/v1/products/{product.pk}/', 3)
+        self.assertQueryBudget(f'/api/v1/wishlists/{self.wishlist.pk}/', 4)
+
+
+class CursorPaginationTests(APITestCase):
+    def test_products_are_paginated_by_cursor_without_gaps(self):
+        create_products(45)
+        seen, url, pages = [], '/api/v1/products/?page_size=20', 0
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(ctx.captured_queries), 4) # Página, variantes e facetas, sem COUNT(*) nem OFFSET
+            seen.extend(item['name'] for item in response.data['results'])
+            url, pages = response.data['next'], pages + 1
+        self.assertEqual(pages, 3)
+        self.assertEqual(seen, sorted(Product.objects.values_list('name', flat=True)))
+
+    def test_orders_are_paginated_newest_first(self):
+        user = User.objects.create_user(username='comprador')
+        create_orders(user, 5, create_products(2))
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/v1/orders/?page_size=2')
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+        newest = Order.objects.filter(user=user).order_by('-created_at', '-id').first()
+        self.assertEqual(response.data['results'][0]['id'], newest.pk)
+
+
+class ProductSearchTests(APITestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Roupas')
+        self.macacao = Product.objects.create(
+            name='Macacão de Algodão', description='Macacão macio para recém-nascidos',
+            price=Decimal('59.90'), category=category, variations='Tamanho: P, M, G | Cor: Azul, Rosa'
+        )
+        self.fraldas = Product.objects.create(
+            name='Fraldas Descartáveis', description='Pacote com 40 fraldas', price=Decimal('49.90'), category=category
+        )
+        self.body = Product.objects.create(
+            name='Body Manga Longa', description='Combina com o macacão', price=Decimal('29.90'), category=category
+        )
+
+    def search(self, query):
+        response = self.client.get('/api/v1/products/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_search_is_accent_insensitive_and_ranks_name_matches_first(self):
+        self.assertEqual(self.search('macacao'), [self.macacao.pk, self.body.pk])
+
+    def test_search_matches_prefixes_and_variations(self):
+        self.assertEqual(self.search('fralda'), [self.fraldas.pk])
+        self.assertEqual(self.search('rosa'), [self.macacao.pk])
+
+    def test_index_follows_product_updates_and_deletes(self):
+        self.fraldas.name = 'Lenços Umedecidos'
+        self.fraldas.description = ''
+        self.fraldas.save()
+        self.assertEqual(self.search('fraldas'), [])
+        self.assertEqual(self.search('lencos'), [self.fraldas.pk])
+        self.body.delete()
+        self.assertEqual(self.search('macacão'), [self.macacao.pk])
+
+    def test_search_ignores_fts_syntax_and_requires_query(self):
+        self.assertEqual(self.search('"macacão" (algodão*'), [self.macacao.pk])
+        self.assertEqual(self.client.get('/api/v1/products/search/').status_code, 400)
+
+
+class ProductFacetTests(APITestCase):
+    def setUp(self):
+        self.roupas = Category.objects.create(name='Roupas')
+        self.higiene = Category.objects.create(name='Higiene')
+        self.body = Product.objects.create(name='Body', price=Decimal('29.90'), stock=5, category=self.roupas, variations='Tamanho: P, M | Cor: Azul')
+        self.macacao = Product.objects.create(name='Macacão', price=Decimal('79.90'), stock=0, category=self.roupas, variations='Tamanho: G | Cor: Rosa')
+        self.fraldas = Product.objects.create(name='Fraldas', price=Decimal('149.90'), stock=20, category=self.higiene)
+        create_variants([self.body, self.macacao], copy_stock=True)
+
+    def facet_counts(self):
+        response = self.client.get('/api/v1/products/')
+        return {facet: {item['value']: item['count'] for item in values} for facet, values in response.data['facets'].items()}
+
+    def test_filters(self):
+        def ids(params):
+            return {item['id'] for item in self.client.get('/api/v1/products/', params).data['results']}
+        self.assertEqual(ids({'category': self.roupas.pk}), {self.body.pk, self.macacao.pk})
+        self.assertEqual(ids({'min_price': '50', 'max_price': '100'}), {self.macacao.pk})
+        self.assertEqual(ids({'in_stock': 'true'}), {self.body.pk, self.fraldas.pk})
+        self.assertEqual(ids({'variation': 'Azul'}), {self.body.pk})
+        self.assertEqual(self.client.get('/api/v1/products/', {'min_price': 'abc'}).status_code, 400)
+        for params in ({'min_price': 'nan'}, {'max_price': 'Infinity'}, {'min_price': '-inf'}):
+            self.assertEqual(self.client.get('/api/v1/products/', params).status_code, 400, params)
+
+    def test_facet_counts_follow_product_changes(self):
+        self.assertEqual(self.facet_counts(), {
+            'category': {str(self.roupas.pk): 2, str(self.higiene.pk): 1},
+            'price': {'0-50': 1, '50-100': 1, '100-200': 1},
+            'in_stock': {'true': 2, 'false': 1},
+        })
+        macacao = Product.objects.get(pk=self.macacao.pk)
+        macacao.category, macacao.price, macacao.stock = self.higiene, Decimal('250.00'), 3
+        macacao.save()
+        self.fraldas.delete()
+        self.assertEqual(self.facet_counts(), {
+            'category': {str(self.roupas.pk): 1, str(self.higiene.pk): 1},
+            'price': {'0-50': 1, '200+': 1},
+            'in_stock': {'true': 2},
+        })
+
+    def test_rebuild_matches_incremental_counts(self):
+        from .facets import rebuild_facet_counts
+        before = self.facet_counts()
+        rebuild_facet_counts()
+        self.assertEqual(self.facet_counts(), before)
+
+
+class ProductVariantTests(APITestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Roupas')
+        self.body = Product.objects.create(
+            name='Body', price=Decimal('29.90'), stock=4, category=self.category,
+            variations='Tamanho: P, M, G | Cor: Azul, Rosa'
+        )
+        self.meia = Product.objects.create(name='Meia', price=Decimal('9.90'), stock=7, category=self.category, variations='Único')
+
+    def test_parse_variations(self):
+        self.assertEqual(parse_variations('Tamanho: P, M, G | Cor: Azul, Rosa'), [('Tamanho', ['P', 'M', 'G']), ('Cor', ['Azul', 'Rosa'])])
+        self.assertEqual(parse_variations('Único'), [('Opção', ['Único'])])
+        self.assertEqual(parse_variations(' Cor :  Azul  Marinho, azul marinho'), [('Cor', ['Azul  Marinho'])])
+        self.assertEqual(parse_variations(''), [])
+
+    def test_options_differing_only_in_case_are_shared_and_keep_their_spelling(self):
+        other = Product.objects.create(name='Touca', price=Decimal('19.90'), stock=3, category=self.category, variations='COR: azul')
+        create_variants([self.body, other])
+        self.assertEqual(list(VariantOption.objects.filter(name_key='cor').values_list('name', 'value')), [('Cor', 'Azul'), ('Cor', 'Rosa')])
+        self.assertEqual(other.variants.get().options.get().value, 'Azul')
+
+    def test_migration_command_creates_combinations_once(self):
+        call_command('migrate_product_variations', batch_size=1, stdout=StringIO())
+        call_command('migrate_product_variations', stdout=StringIO()) # Idempotente
+        self.assertEqual(self.body.variants.count(), 6)
+        self.assertEqual(set(self.body.variants.values_list('stock', flat=True)), {0})
+        self.assertEqual(list(self.meia.variants.values_list('stock', flat=True)), [7])
+
+    def test_serializer_exposes_variants_and_filter_uses_variant_stock(self):
+        create_variants([self.body])
+        variant = ProductVariant.objects.filter(product=self.body, options__value='M').get(options__value='Azul')
+        variant.stock = 2
+        variant.save()
+        response = self.client.get(f'/api/v1/products/{self.body.pk}/')
+        self.assertIn({'id': variant.pk, 'options': {'Tamanho': 'M', 'Cor': 'Azul'}, 'stock': 2, 'price': None}, response.data['variants'])
+
+        def ids(params):
+            return {item['id'] for item in self.client.get('/api/v1/products/', params).data['results']}
+        self.assertEqual(ids({'variation': 'Tamanho:M', 'in_stock': 'true'}), {self.body.pk})
+        self.assertEqual(ids({'variation': ['Tamanho:M', 'Cor:Rosa'], 'in_stock': 'true'}), set())
+        self.assertEqual(ids({'variation': ['Tamanho:M', 'Cor:Rosa']}), {self.body.pk})
+        self.assertEqual(ids({'variation': ['TAMANHO: m', 'cor:ROSA']}), {self.body.pk})
+
+
+class ProductRatingTests(APITestCase):
+    def setUp(self):
+        self.product, self.other = create_products(2)
+        self.users = [User.objects.create_user(username=f'avaliador{i}') for i in range(3)]
+
+    def summary(self, product):
+        return self.client.get(f'/api/v1/products/{product.pk}/rating-summary/').data
+
+    def test_aggregates_follow_review_create_update_and_delete(self):
+        Review.objects.create(user=self.users[0], product=self.product, rating=5)
+        second = Review.objects.create(user=self.users[1], product=self.product, rating=2)
+        self.assertEqual(self.summary(self.product), {
+            'product': self.product.pk, 'rating_count': 2, 'rating_average': Decimal('3.50'),
+            'rating_histogram': {1: 0, 2: 1, 3: 0, 4: 0, 5: 1},
+        })
+        review = Review.objects.get(pk=second.pk)
+        review.rating, review.product = 4, self.other
+        review.save()
+        Review.objects.get(user=self.users[0]).delete()
+        self.assertEqual(self.summary(self.product)['rating_count'], 0)
+        self.assertIsNone(self.summary(self.product)['rating_average'])
+        self.assertEqual(self.summary(self.other)['rating_histogram'][4], 1)
+
+    def test_product_save_does_not_overwrite_aggregates(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        Review.objects.create(user=self.users[0], product=self.product, rating=3)
+        stale.stock = 99
+        stale.save()
+        response = self.client.get(f'/api/v1/products/{self.product.pk}/')
+        self.assertEqual(response.data['rating_count'], 1)
+        self.assertEqual(response.data['rating_average'], '3.00')
+
+    def test_repair_command_recomputes_from_reviews(self):
+        Review.objects.bulk_create([Review(user=user, product=self.product, rating=4) for user in self.users])
+        self.assertEqual(self.summary(self.product)['rating_count'], 0) # bulk_create não dispara sinais
+        call_command('rebuild_product_ratings', batch_size=1, stdout=StringIO())
+        self.assertEqual(self.summary(self.product)['rating_count'], 3)
+        self.assertEqual(self.summary(self.product)['rating_average'], Decimal('4.00'))
+
+
+class CheckoutTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='comprador')
+        self.client.force_authenticate(self.user)
+        self.address = Address.objects.create(
+            user=self.user, street='Rua B', number='2', neighborhood='Centro',
+            city='Recife', state='PE', zip_code='50000-000'
+        )
+        self.products = create_products(10)
+
+    def checkout(self, items, **extra):
+        payload = {'items': items, 'payment_method': 'PIX', 'shipping_address': self.address.pk, **extra}
+        return self.client.post('/api/v1/orders/checkout/', payload, format='json')
+
+    def test_checkout_creates_order_items_and_decrements_stock(self):
+        first, second = self.products[:2]
+        response = self.checkout(
+            [{'product': first.pk, 'quantity': 2}, {'product': second.pk, 'quantity': 1}, {'product': first.pk, 'quantity': 1}],
+            shipping_cost='5.00'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Decimal(response.data['total_amount']), first.price * 3 + second.price + 5)
+        self.assertEqual(response.data['shipping_address']['id'], self.address.pk)
+        self.assertEqual(sorted((item['product'], item['quantity']) for item in response.data['items']), [(first.pk, 3), (second.pk, 1)])
+        self.assertEqual(Product.objects.get(pk=first.pk).stock, 7)
+        self.assertEqual(Product.objects.get(pk=second.pk).stock, 9)
+
+    def test_query_count_does_not_grow_with_cart_size(self):
+        counts = []
+        for products in (self.products[:1], self.products[1:]):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.checkout([{'product': product.pk, 'quantity': 1} for product in products])
+            self.assertEqual(response.status_code, 201)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_oversell_is_rejected_and_rolled_back(self):
+        first, second = self.products[:2]
+        response = self.checkout([{'product': first.pk, 'quantity': 1}, {'product': second.pk, 'quantity': 11}])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['products'], [second.pk])
+        self.assertEqual(Product.objects.get(pk=first.pk).stock, 10)
+        self.assertFalse(Order.objects.exists())
+
+    def test_invalid_product_or_address_is_rejected(self):
+        self.assertEqual(self.checkout([{'product': 999999, 'quantity': 1}]).status_code, 400)
+        other = User.objects.create_user(username='outro')
+        address = Address.objects.create(user=other, street='Rua C', number='3', neighborhood='X', city='Y', state='Z', zip_code='1')
+        response = self.checkout([{'product': self.products[0].pk, 'quantity': 1}], shipping_address=address.pk)
+        self.assertEqual(response.status_code, 400)
+
+
+class CouponTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cliente-cupom')
+        self.client.force_authenticate(self.user)
+        self.coupon = Coupon.objects.create(code='BEBE10', discount_type='PERCENTAGE', discount_value=Decimal('10'), usage_limit=2)
+
+    def test_validation_is_served_from_cache_and_invalidated_on_save(self):
+        response = self.client.post('/api/v1/coupons/validate/', {'code': 'BEBE10', 'subtotal': '80.00'})
+        self.assertEqual(response.data['discount_amount'], Decimal('8.00'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post('/api/v1/coupons/validate/', {'code': 'BEBE10'})
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.coupon.is_active = False
+        self.coupon.save()
+        self.assertEqual(self.client.post('/api/v1/coupons/validate/', {'code': 'BEBE10'}).status_code, 400)
+        self.assertEqual(self.client.post('/api/v1/coupons/validate/', {'code': 'NAOEXISTE'}).status_code, 400)
+
+    def test_redeem_enforces_usage_limit_with_single_update(self):
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post('/api/v1/coupons/redeem/', {'code': 'BEBE10'})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(self.client.post('/api/v1/coupons/redeem/', {'code': 'BEBE10'}).status_code, 400)
+        self.assertEqual(Coupon.objects.get(pk=self.coupon.pk).times_used, 2)
+
+    def test_expired_coupon_cannot_be_redeemed(self):
+        Coupon.objects.create(code='VENCIDO', discount_type='FIXED', discount_value=Decimal('5'), expiration_date=timezone.now() - timedelta(days=1))
+        self.assertEqual(self.client.post('/api/v1/coupons/redeem/', {'code': 'VENCIDO'}).status_code, 400)
+
+    def test_checkout_applies_and_redeems_coupon_atomically(self):
+        product = create_products(1)[0]
+        payload = {'items': [{'product': product.pk, 'quantity': 2}], 'payment_method': 'PIX', 'coupon': 'BEBE10'}
+        response = self.client.post('/api/v1/orders/checkout/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Decimal(response.data['total_amount']), (product.price * 2 * Decimal('0.9')).quantize(Decimal('0.01')))
+        Coupon.objects.filter(pk=self.coupon.pk).update(times_used=2) # Esgota sem passar pelo sinal
+        response = self.client.post('/api/v1/orders/checkout/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Product.objects.get(pk=product.pk).stock, 8) # A segunda baixa foi desfeita
+
+
+class StockReservationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='cliente-reserva')
+        self.client.force_authenticate(self.user)
+        self.product = create_products(1)[0] # Estoque 10
+        reservations.enable_sharding(self.product, 4)
+
+    def reserve(self, quantity):
+        return self.client.post(f'/api/v1/products/{self.product.pk}/reserve/', {'quantity': quantity})
+
+    def test_sharding_spreads_stock_and_reservations_cannot_oversell(self):
+        self.assertEqual(sorted(StockShard.objects.filter(product=self.product).values_list('available', flat=True)), [2, 2, 3, 3])
+        created = [self.reserve(1).status_code for _ in range(11)]
+        self.assertEqual(created.count(201), 10)
+        self.assertEqual(created[-1], 409)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 10) # Só muda na reconciliação
+
+    def test_expired_reservations_are_swept_back_into_the_shards(self):
+        reservation = self.reserve(2).data
+        StockReservation.objects.filter(pk=reservation['id']).update(expires_at=timezone.now() - timedelta(seconds=1))
+        kept = self.reserve(3).data
+        call_command('sweep_stock_reservations', stdout=StringIO())
+        self.assertFalse(StockReservation.objects.filter(pk=reservation['id']).exists())
+        self.assertEqual(StockShard.objects.filter(product=self.product).aggregate(total=Sum('available'))['total'], 7)
+        self.client.post(f"/api/v1/products/{self.product.pk}/release/{kept['id']}/")
+        self.assertEqual(StockShard.objects.filter(product=self.product).aggregate(total=Sum('available'))['total'], 10)
+
+    def test_checkout_consumes_reservation_and_reconcile_updates_stock(self):
+        reservation = self.reserve(4).data
+        payload = {'items': [{'product': self.product.pk, 'quantity': 4, 'reservation': reservation['id']}], 'payment_method': 'PIX'}
+        self.assertEqual(self.client.post('/api/v1/orders/checkout/', payload, format='json').status_code, 201)
+        self.assertEqual(self.client.post('/api/v1/orders/checkout/', payload, format='json').status_code, 400) # Já consumida
+        unreserved = {'items': [{'product': self.product.pk, 'quantity': 1}], 'payment_method': 'PIX'}
+        self.assertEqual(self.client.post('/api/v1/orders/checkout/', unreserved, format='json').status_code, 400)
+        reservations.reconcile()
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 6)
+
+    def test_checkout_rejects_repeated_or_partial_reservations(self):
+        reservation = self.reserve(2).data
+        line = {'product': self.product.pk, 'quantity': 2, 'reservation': reservation['id']}
+        repeated = self.client.post('/api/v1/orders/checkout/', {'items': [line, line], 'payment_method': 'PIX'}, format='json')
+        self.assertEqual(repeated.json(), {'items': ['A mesma reserva de estoque aparece em mais de um item.']})
+        with self.assertRaises(ValidationError):
+            checkout.place_order(self.user, [line, {'product': self.product.pk, 'quantity': 1}], 'PIX')
+        self.assertTrue(StockReservation.objects.filter(pk=reservation['id']).exists())
+        self.assertFalse(Order.objects.exists())
+
+
+class CatalogCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Brinquedos')
+        self.product = Product.objects.create(name='Chocalho', price=Decimal('19.90'), stock=3, category=self.category)
+
+    def test_repeated_reads_are_served_from_cache_until_a_write(self):
+        first = self.client.get('/api/v1/products/')
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get('/api/v1/products/')
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(first.content, second.content)
+        self.product.name = 'Chocalho Musical'
+        self.product.save()
+        third = self.client.get('/api/v1/products/')
+        self.assertIn('Chocalho Musical', third.content.decode())
+        self.assertNotEqual(first['ETag'], third['ETag'])
+
+    def test_matching_etag_returns_304_without_queries(self):
+        response = self.client.get(f'/api/v1/products/{self.product.pk}/')
+        self.assertIn('Last-Modified', response)
+        with CaptureQueriesContext(connection) as ctx:
+            not_modified = self.client.get(f'/api/v1/products/{self.product.pk}/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+    def test_stock_changes_from_checkout_invalidate_the_cache(self):
+        self.client.get('/api/v1/categories/')
+        before = self.client.get(f'/api/v1/products/{self.product.pk}/')
+        user = User.objects.create_user(username='comprador-cache')
+        self.client.force_authenticate(user)
+        self.client.post('/api/v1/orders/checkout/', {'items': [{'product': self.product.pk, 'quantity': 1}], 'payment_method': 'PIX'}, format='json')
+        after = self.client.get(f'/api/v1/products/{self.product.pk}/', HTTP_IF_NONE_MATCH=before['ETag'])
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual(after.json()['stock'], 2)
+
+    def test_browsable_api_is_never_cached(self):
+        user = User.objects.create_user(username='navegador-logado', password='senha-segura')
+        self.client.force_login(user)
+        logged_in = self.client.get('/api/v1/products/', HTTP_ACCEPT='text/html')
+        self.assertContains(logged_in, 'navegador-logado')
+        self.assertNotIn('ETag', logged_in)
+        token = logged_in.context['csrf_token']
+        self.client.logout()
+        anonymous = self.client.get('/api/v1/products/', HTTP_ACCEPT='text/html').content.decode()
+        self.assertNotIn('navegador-logado', anonymous)
+        self.assertNotIn(str(token), anonymous)
+
+
+class RendererTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Alimentação')
+        self.product = Product.objects.create(
+            name='Papinha de Maçã', description='Linha nova', price=Decimal('12.34'), stock=2, category=category
+        )
+        Review.objects.create(user=User.objects.create_user(username='mae'), product=self.product, rating=5)
+
+    def test_fast_json_matches_drf_json_renderer(self):
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import FastJSONRenderer
+        data = self.client.get('/api/v1/products/').data
+        summary = self.client.get(f'/api/v1/products/{self.product.pk}/rating-summary/').data
+        for payload in (data, summary):
+            self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+
+    def test_json_body_is_parsed(self):
+        user = User.objects.create_user(username='cliente-json')
+        self.client.force_authenticate(user)
+        response = self.client.post('/api/v1/coupons/validate/', data=b'{"code": "NADA"}', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('code', response.json())
+
+    @skipUnless(msgpack, 'msgpack não instalado')
+    def test_msgpack_is_negotiated(self):
+        response = self.client.get(f'/api/v1/products/{self.product.pk}/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content)['price'], '12.34')
+
+
+class ProjectionContractTests(APITestCase):
+    # As projeções (users/projections.py) precisam produzir exatamente a mesma
+    # saída dos serializers: mesmas chaves, mesma ordem e mesmos formatos.
+    def setUp(self):
+        from rest_framework.renderers import JSONRenderer
+        self.render = JSONRenderer().render
+        self.user = User.objects.create_user(username='contrato')
+        products = create_products(3, prefix='Contrato')
+        products.append(Product.objects.create(name='Sem categoria', price=Decimal('7.5'), stock=0))
+        Product.objects.filter(pk=products[0].pk).update(variations='Tamanho: P, M | Cor: Azul')
+        create_variants(Product.objects.filter(pk=products[0].pk))
+        self.assertTrue(ProductVariant.objects.exists())
+        Review.objects.create(user=self.user, product=products[1], rating=4)
+        Review.objects.create(user=User.objects.create_user(username='contrato-2'), product=products[1], rating=3)
+        create_orders(self.user, 2, products[:2])
+        Order.objects.create(user=self.user, order_number='SEM-ENDERECO', total_amount=Decimal('1'), payment_method='PIX')
+        wishlist = Wishlist.objects.create(user=self.user)
+        WishlistProduct.objects.bulk_create([WishlistProduct(wishlist=wishlist, product=product) for product in products])
+
+    def assertSameOutput(self, serializer_class, projection, queryset):
+        expected = serializer_class(serializer_class.setup_eager_loading(queryset), many=True).data
+        actual = projection.build(projection.values(queryset))
+        self.assertEqual(self.render(actual), self.render(expected))
+
+    def test_projections_match_serializers(self):
+        self.assertSameOutput(ProductSerializer, ProductProjection, Product.objects.order_by('name', 'id'))
+        self.assertSameOutput(OrderSerializer, OrderProjection, Order.objects.order_by('-created_at', '-id'))
+        self.assertSameOutput(WishlistSerializer, WishlistProjection, Wishlist.objects.all())
+
+    def test_list_endpoints_use_the_projection(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/v1/products/?page_size=2')
+        self.assertEqual(len(response.json()['results']), 2)
+        second = self.client.get(response.json()['next'])
+        self.assertEqual(len(second.json()['results']), 2)
+        orders = self.client.get('/api/v1/orders/').json()['results']
+        self.assertEqual([len(order['items']) for order in orders], [0, 2, 2])
+
+
+class ProductImportExportTests(APITestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Roupas')
+        self.product = Product.objects.create(name='Body Liso', price=Decimal('29.90'), stock=4, category=self.category)
+
+    def run_import(self, content, suffix, *args):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False, encoding='utf-8') as handle:
+            handle.write(content)
+        self.addCleanup(os.remove, handle.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_products', handle.name, *args, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_upserts_in_batches_and_reports_bad_rows(self):
+        content = (
+            'id,name,price,stock,category\n'
+            f'{self.product.pk},Body Liso,31.50,6,Roupas\n'
+            ',Macacão Listrado,59.90,2,Roupas Novas\n'
+            ',Sem Preço,,1,Roupas\n'
+            ',Meia,abc,1,Roupas\n'
+        )
+        out, err = self.run_import(content, '.csv', '--batch-size', '1')
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.price, self.product.stock), (Decimal('31.50'), 6))
+        created = Product.objects.get(name='Macacão Listrado')
+        self.assertEqual(created.category.name, 'Roupas Novas')
+        self.assertIn('linha 4', err)
+        self.assertIn('linha 5', err)
+        self.assertIn('1 criados, 1 atualizados, 2 com erro', out)
+        self.assertEqual(self.client.get('/api/v1/products/search/?q=macacao').json()['results'][0]['id'], created.pk)
+
+    def test_export_round_trips_through_jsonl_import_by_name(self):
+        out = StringIO()
+        call_command('export_products', '--format', 'jsonl', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['category'], 'Roupas')
+        changed = lines[0].replace('"stock": 4', '"stock": 9')
+        rows = changed + '\n{"name": "Touca", "price": 15}\nnão é json\n{"name": "Meia", "price": 9, "category": 3}\n'
+        out, err = self.run_import(rows, '.jsonl', '--key', 'name')
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock, 9)
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertIn('linha 4: category: informe o nome da categoria', err)
+        self.assertIn('2 com erro', out)
+
+    def test_import_from_stdin_leaves_it_open(self):
+        stdin = StringIO('{"name": "Touca", "price": 15}\n')
+        with mock.patch('sys.stdin', stdin):
+            call_command('import_products', '-', '--format', 'jsonl', stdout=StringIO(), stderr=StringIO())
+        self.assertFalse(stdin.closed)
+        self.assertTrue(Product.objects.filter(name='Touca').exists())
+
+
+class OrderExportTests(APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_user(username='financeiro', is_staff=True)
+        customer = User.objects.create_user(username='cliente-export')
+        create_orders(customer, 3, create_products(2, prefix='Export'))
+        Order.objects.filter(order_number__endswith='-2').update(status='DELIVERED')
+        Order.objects.create(user=customer, order_number='VAZIO', total_amount=Decimal('0'), payment_method='PIX')
+        self.client.force_authenticate(self.staff)
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_streams_one_row_per_item(self):
+        response = self.client.get('/api/v1/orders/export/?format=csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = list(csv.DictReader(StringIO(self.read(response))))
+        self.assertEqual(len(rows), 3 * 2 + 1) # Pedido sem itens vira uma linha
+        self.assertEqual(rows[0]['shipping_city'], 'São Paulo')
+        self.assertEqual(rows[-1]['item_product_id'], '')
+
+    def test_ndjson_with_status_and_date_filters(self):
+        today = timezone.localdate().isoformat()
+        response = self.client.get(f'/api/v1/orders/export/?format=ndjson&status=delivered&date_from={today}&date_to={today}')
+        orders = [json.loads(line) for line in self.read(response).splitlines()]
+        self.assertEqual([order['status'] for order in orders], ['DELIVERED'])
+        self.assertEqual(len(orders[0]['items']), 2)
+        self.assertEqual(self.client.get('/api/v1/orders/export/?format=ndjson&date_to=2000-01-01').getvalue(), b'')
+
+    def test_rejects_bad_filters_and_non_staff(self):
+        self.assertEqual(self.client.get('/api/v1/orders/export/?status=PERDIDO').status_code, 400)
+        self.client.force_authenticate(User.objects.create_user(username='curioso'))
+        self.assertEqual(self.client.get('/api/v1/orders/export/').status_code, 403)
+
+
+class AsyncReadPathTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Calçados')
+        self.products = create_products(5, category=self.category, prefix='Tênis')
+        Product.objects.filter(pk=self.products[0].pk).update(variations='Tamanho: 18, 19')
+        create_variants(Product.objects.filter(pk=self.products[0].pk))
+        self.user = User.objects.create_user(username='assincrono', password='senha-segura', email='a@exemplo.com')
+
+    def test_async_endpoints_match_the_viewsets(self):
+        for path in ('products/?page_size=2', 'products/?page_size=2&category=%d' % self.category.pk,
+                     f'products/{self.products[0].pk}/', 'products/999999/', 'categories/', 'products/?min_price=x'):
+            expected = self.client.get(f'/api/v1/{path}')
+            actual = self.client.get(f'/api/v1/async/{path}')
+            # Os links de paginação só diferem no prefixo /async
+            actual_data = json.loads(actual.content.decode().replace('/api/v1/async/', '/api/v1/'))
+            self.assertEqual((actual.status_code, actual_data), (expected.status_code, expected.json()), path)
+
+    def test_async_list_rejects_non_finite_prices(self):
+        for query in ('min_price=Infinity', 'max_price=nan'):
+            response = self.client.get(f'/api/v1/async/products/?{query}')
+            self.assertEqual(response.status_code, 400, query)
+            self.assertEqual(response.json(), self.client.get(f'/api/v1/products/?{query}').json())
+
+    def test_async_cursors_walk_forward_and_back(self):
+        first = self.client.get('/api/v1/async/products/?page_size=2').json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual(second['results'], self.client.get(first['next'].replace('/async', '')).json()['results'])
+        back = self.client.get(second['previous']).json()
+        self.assertEqual([p['id'] for p in back['results']], [p['id'] for p in first['results']])
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=10_000) # HTTP Basic refaz o hash da senha a cada requisição
+    def test_me_requires_authentication(self):
+        self.assertEqual(self.client.get('/api/v1/async/users/me/').status_code, 403)
+        self.client.login(username='assincrono', password='senha-segura')
+        self.assertEqual(self.client.get('/api/v1/async/users/me/').json(), {'id': self.user.pk, 'username': 'assincrono', 'email': 'a@exemplo.com'})
+        self.client.logout()
+        basic = base64.b64encode(b'assincrono:senha-segura').decode()
+        self.assertEqual(self.client.get('/api/v1/async/users/me/', HTTP_AUTHORIZATION=f'Basic {basic}').status_code, 200)
+        self.assertEqual(self.client.get('/api/v1/async/users/me/', HTTP_AUTHORIZATION='Basic eDp5').status_code, 403)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    # A alias 'replica' é um segundo banco local, sem replicação: o que só existe
+    # nele mostra que a leitura foi para a réplica. TransactionTestCase porque
+    # dentro de uma transação no principal o roteador sempre usa o principal.
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        Category.objects.create(name='Só no principal')
+        Category.objects.using('replica').create(name='Só na réplica')
+
+    def names(self):
+        # A rota async não passa pelo cache do catálogo, cujas faltas são montadas no principal
+        return [category['name'] for category in self.client.get('/api/v1/async/categories/').json()]
+
+    def test_reads_go_to_the_replica_and_writes_to_the_primary(self):
+        self.assertEqual(self.names(), ['Só na réplica'])
+        self.client.post('/api/v1/categories/', {'name': 'Nova'}, format='json')
+        self.assertTrue(Category.objects.using('default').filter(name='Nova').exists())
+        self.assertFalse(Category.objects.using('replica').filter(name='Nova').exists())
+
+    def test_client_reads_its_own_writes_during_the_window(self):
+        self.client.post('/api/v1/categories/', {'name': 'Nova'}, format='json')
+        self.assertIn('Nova', self.names()) # Preso ao principal pelo cookie
+        self.client.cookies.pop(USE_PRIMARY_COOKIE)
+        self.assertEqual(self.names(), ['Só na réplica'])
+
+    def test_catalog_cache_misses_are_filled_from_the_primary(self):
+        # Sem cache.clear() entre as leituras: o leitor da réplica não pode envenenar o cache do escritor
+        self.client.post('/api/v1/categories/', {'name': 'Nova'}, format='json')
+        reader = APIClient()
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            first = reader.get('/api/v1/categories/')
+        self.assertEqual([category['name'] for category in first.json()], ['Nova', 'Só no principal'])
+        self.assertEqual(len(replica_queries), 0)
+        self.assertIn('ETag', first)
+        with CaptureQueriesContext(connections['default']) as primary_queries:
+            second = reader.get('/api/v1/categories/')
+        self.assertEqual((second.content, len(primary_queries)), (first.content, 0)) # Servida do cache
+        own_read = self.client.get('/api/v1/categories/')
+        self.assertEqual(own_read.content, first.content)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=10_000) # HTTP Basic refaz o hash da senha a cada requisição
+    def test_authenticated_client_is_pinned_without_the_cookie(self):
+        User.objects.create_user(username='escritor', password='senha-segura')
+        basic = 'Basic ' + base64.b64encode(b'escritor:senha-segura').decode()
+        self.client.post('/api/v1/categories/', {'name': 'Nova'}, format='json', HTTP_AUTHORIZATION=basic)
+        self.client.cookies.pop(USE_PRIMARY_COOKIE)
+        response = self.client.get('/api/v1/categories/', HTTP_AUTHORIZATION=basic)
+        self.assertIn('Nova', [category['name'] for category in response.json()])
+
+
+class SQLiteProfileTests(APITestCase):
+    def test_profile_applies_pragmas_and_serializes_writers(self):
+        from .backends.sqlite3.base import DatabaseWrapper, _write_lock
+        with tempfile.TemporaryDirectory() as directory:
+            name = os.path.join(directory, 'perfil.sqlite3')
+            wrapper = DatabaseWrapper({**connections['default'].settings_dict, **settings.SQLITE_PRODUCTION_PROFILE, 'NAME': name})
+            with wrapper.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                self.assertEqual(cursor.fetchone()[0], 'wal')
+                cursor.execute('PRAGMA synchronous')
+                self.assertEqual(cursor.fetchone()[0], 1) # NORMAL
+            wrapper._start_transaction_under_autocommit()
+            self.assertTrue(_write_lock(name).locked()) # Próximo escritor do processo espera aqui
+            wrapper.commit()
+            self.assertFalse(_write_lock(name).locked())
+            wrapper.close()
+
+
+class WishlistUpsertTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='desejosa')
+        self.products = create_products(4, prefix='Desejo')
+        self.client.force_authenticate(self.user)
+
+    def counts(self):
+        return dict(Product.objects.values_list('pk', 'wished_by_count'))
+
+    def test_add_and_remove_are_single_statement_and_idempotent(self):
+        pk = self.products[0].pk
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(f'/api/v1/products/{pk}/add_to_wishlist/')
+        self.assertEqual(response.status_code, 201)
+        writes = [query['sql'] for query in ctx.captured_queries if not query['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(len(writes), 3) # Lista (se faltar), item e contador
+        self.assertEqual(self.client.post(f'/api/v1/products/{pk}/add_to_wishlist/').status_code, 200)
+        self.assertEqual(self.client.post('/api/v1/products/999999/add_to_wishlist/').status_code, 404)
+        self.assertEqual(self.counts()[pk], 1)
+        self.assertEqual(self.client.post(f'/api/v1/products/{pk}/remove_from_wishlist/').status_code, 204)
+        self.assertEqual(self.client.post(f'/api/v1/products/{pk}/remove_from_wishlist/').status_code, 404)
+        self.assertEqual(self.counts()[pk], 0)
+
+    def test_batch_endpoint_and_most_wished_ranking(self):
+        ids = [product.pk for product in self.products]
+        response = self.client.post('/api/v1/wishlists/batch/', {'add': ids[:3] + [999999]}, format='json')
+        self.assertEqual(response.json(), {'added': ids[:3], 'removed': [], 'not_found': [999999]})
+        other = User.objects.create_user(username='outra')
+        self.client.force_authenticate(other)
+        self.client.post('/api/v1/wishlists/batch/', {'add': ids[1:], 'remove': [ids[0]]}, format='json')
+        self.assertEqual(self.counts(), {ids[0]: 1, ids[1]: 2, ids[2]: 2, ids[3]: 1})
+        ranking = self.client.get('/api/v1/products/most-wished/?limit=2').json()
+        self.assertEqual([(item['id'], item['wished_by_count']) for item in ranking], [(ids[1], 2), (ids[2], 2)])
+        response = self.client.post('/api/v1/wishlists/batch/', {'remove': ids[::-1]}, format='json')
+        self.assertEqual(response.json()['removed'], ids[1:])
+        self.assertEqual(self.client.post('/api/v1/wishlists/batch/', {}, format='json').status_code, 400)
+
+    def test_cascade_delete_and_rebuild_keep_counters_right(self):
+        wishlists.add_products(self.user, [self.products[0].pk])
+        self.user.delete()
+        self.assertEqual(self.counts()[self.products[0].pk], 0)
+        Product.objects.filter(pk=self.products[1].pk).update(wished_by_count=7)
+        call_command('rebuild_wishlist_counters', stdout=StringIO())
+        self.assertEqual(self.counts()[self.products[1].pk], 0)
+
+
+class CompactWishlistTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='compacta')
+        self.products = create_products(30, prefix='Compacto')
+        wishlists.add_products(self.user, [product.pk for product in self.products])
+        self.client.force_authenticate(self.user)
+
+    def test_compact_mode_returns_only_ids_and_dates(self):
+        full = self.client.get('/api/v1/wishlists/')
+        with CaptureQueriesContext(connection) as ctx:
+            compact = self.client.get('/api/v1/wishlists/?compact=true')
+        self.assertEqual(len(ctx.captured_queries), 2) # Listas + itens, sem JOIN com produtos
+        entry = compact.json()[0]['products'][0]
+        self.assertEqual(set(entry), {'product', 'added_at'})
+        self.assertLess(len(compact.content) * 5, len(full.content))
+        wishlist_id = compact.json()[0]['id']
+        self.assertEqual(self.client.get(f'/api/v1/wishlists/{wishlist_id}/?compact=1').json(), compact.json()[0])
+        for missing in ('abc', '999999'):
+            full_missing = self.client.get(f'/api/v1/wishlists/{missing}/')
+            compact_missing = self.client.get(f'/api/v1/wishlists/{missing}/?compact=1')
+            self.assertEqual((compact_missing.status_code, compact_missing.json()), (404, full_missing.json()))
+
+    def test_product_batch_returns_cards_in_request_order(self):
+        ids = [self.products[5].pk, self.products[1].pk, 999999, self.products[5].pk]
+        response = self.client.get('/api/v1/products/batch/?ids=' + ','.join(map(str, ids)))
+        self.assertEqual([product['id'] for product in response.json()['results']], ids[:2])
+        listed = {product['id']: product for product in self.client.get('/api/v1/products/?page_size=100').json()['results']}
+        self.assertEqual(response.json()['results'][0], listed[ids[0]])
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/v1/products/batch/?ids=' + ','.join(map(str, ids)))
+        self.assertEqual(len(ctx.captured_queries), 0) # Servido do cache do catálogo
+        self.assertEqual(self.client.get('/api/v1/products/batch/?ids=a,b').status_code, 400)
+
+
+class BatchRequestTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Lote')
+        self.products = create_products(3, category=self.category, prefix='Lote')
+        self.user = User.objects.create_user(username='lote', password='senha-segura', email='l@exemplo.com')
+
+    def batch(self, requests, **extra):
+        return self.client.post('/api/v1/batch/', {'requests': requests, **extra.pop('payload', {})}, format='json', **extra)
+
+    def test_sub_requests_match_direct_calls(self):
+        self.client.force_authenticate(self.user)
+        paths = ['categories/', '/api/v1/products/?page_size=2', 'users/me/', f'async/products/{self.products[0].pk}/', 'products/999999/']
+        response = self.batch([{'id': str(i), 'path': path} for i, path in enumerate(paths)])
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([result['id'] for result in results], ['0', '1', '2', '3', '4'])
+        for path, result in zip(paths, results):
+            direct = self.client.get(path if path.startswith('/') else f'/api/v1/{path}')
+            self.assertEqual((result['status'], result['body']), (direct.status_code, direct.json()), path)
+
+    def test_writes_run_in_order_and_errors_stay_isolated(self):
+        self.client.force_authenticate(self.user)
+        results = self.batch([
+            {'method': 'POST', 'path': 'categories/', 'body': {'name': 'Criada no lote'}},
+            {'path': 'categories/'},
+            {'method': 'POST', 'path': 'categories/', 'body': {}},
+            {'path': 'rota-inexistente/'},
+            {'path': 'batch/'},
+            {'path': '/admin/'},
+        ]).json()['results']
+        self.assertEqual([result['status'] for result in results], [201, 200, 400, 404, 400, 400])
+        self.assertEqual([category['name'] for category in results[1]['body']], ['Criada no lote', 'Lote'])
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=10_000) # HTTP Basic refaz o hash da senha a cada requisição
+    def test_authenticates_once_and_shares_the_user(self):
+        basic = 'Basic ' + base64.b64encode(b'lote:senha-segura').decode()
+        with mock.patch('rest_framework.authentication.authenticate', wraps=authenticate) as check:
+            results = self.batch([{'path': 'users/me/'}, {'path': 'async/users/me/'}, {'path': 'addresses/'}], HTTP_AUTHORIZATION=basic).json()['results']
+        self.assertEqual(check.call_count, 1)
+        self.assertEqual([result['status'] for result in results], [200, 200, 200])
+        self.assertEqual(results[1]['body']['username'], 'lote')
+        anonymous = self.batch([{'path': 'users/me/'}, {'path': 'categories/'}]).json()['results']
+        self.assertEqual([result['status'] for result in anonymous], [403, 200])
+        self.assertEqual(self.batch([{'path': 'users/me/'}], HTTP_AUTHORIZATION='Basic eDp5').status_code, 403)
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_rejects_invalid_batches(self):
+        self.assertEqual(self.batch([{'path': 'categories/'}] * 3).status_code, 400)
+        self.assertEqual(self.batch([]).status_code, 400)
+        self.assertEqual(self.batch([{'path': 'categories/', 'method': 'TRACE'}]).status_code, 400)
+
+
+class ParallelBatchTests(TransactionTestCase):
+    # Leituras em paralelo abrem conexões em outras threads, que só enxergam dados já confirmados
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='paralelo', password='senha-segura')
+        self.products = create_products(4, prefix='Paralelo')
+        self.client.force_login(self.user)
+
+    def test_parallel_reads_keep_order_around_writes(self):
+        requests = [
+            {'id': 'produtos', 'path': 'products/?page_size=2'},
+            {'id': 'me', 'path': 'users/me/'},
+            {'id': 'novo', 'method': 'POST', 'path': 'categories/', 'body': {'name': 'Criada no lote'}},
+            {'id': 'categorias', 'path': 'categories/'},
+            {'id': 'detalhe', 'path': f'products/{self.products[0].pk}/'},
+        ]
+        payload = {'requests': requests, 'parallel': True}
+        response = self.client.post('/api/v1/batch/', payload, content_type='application/json')
+        results = response.json()['results']
+        self.assertEqual([result['id'] for result in results], ['produtos', 'me', 'novo', 'categorias', 'detalhe'])
+        self.assertEqual([result['status'] for result in results], [200, 200, 201, 200, 200])
+        self.assertIn('Criada no lote', [category['name'] for category in results[3]['body']])
+        self.assertEqual(results[1]['body']['username'], 'paralelo')
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        create_products(3, prefix='Medido')
+
+    def test_server_timing_and_prometheus_metrics(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/v1/products/')
+        queries = len(ctx.captured_queries) # O log de consultas é zerado a cada requisição
+        timing = response['Server-Timing']
+        self.assertIn(f'desc="{queries} consultas"', timing)
+        self.assertEqual([part.split(';')[0] for part in timing.split(', ')], ['db', 'serializer', 'render', 'total'])
+        self.client.get('/api/v1/products/')
+        self.assertNotIn('Server-Timing', self.client.get('/admin/login/'))
+
+        body = self.client.get('/metrics').content.decode()
+        labels = 'view="ProductViewSet",action="list",method="GET",status="200"'
+        self.assertIn(f'api_request_duration_seconds_count{{{labels}}} 2', body)
+        self.assertIn(f'api_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', body)
+        self.assertIn(f'api_sql_queries_total{{view="ProductViewSet",action="list"}} {queries}', body)
+        self.assertNotIn('metrics_view', body)
+
+    def test_async_views_time_the_projection(self):
+        product = Product.objects.first()
+        self.client.get('/api/v1/async/products/')
+        self.client.get(f'/api/v1/async/products/{product.pk}/')
+        self.assertGreater(registry.totals['serializer_seconds'][('product_list', 'get')], 0)
+        self.assertGreater(registry.totals['serializer_seconds'][('product_detail', 'get')], 0)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_requests_are_logged_with_their_sql(self):
+        with self.assertLogs('users.performance', 'WARNING') as logs:
+            self.client.get('/api/v1/categories/')
+        self.assertIn('(CategoryViewSet.list)', logs.output[0])
+        self.assertIn('FROM "users_category"', logs.output[0])
+
+    def test_metrics_endpoint_is_restricted(self):
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 403)
+        self.client.force_login(User.objects.create_user(username='operador', is_staff=True))
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 200)
+
+
+class BenchmarkSuiteTests(APITestCase):
+    volumes = {'categories': 3, 'products': 40, 'users': 6, 'orders': 30, 'reviews': 60, 'coupons': 4, 'wishlists': 3}
+
+    def test_seed_is_reproducible_and_keeps_aggregates_consistent(self):
+        benchmarking.seed(self.volumes, batch_size=16, log=lambda message: None)
+        first = list(OrderItem.objects.order_by('order__order_number', 'product__name').values_list('order__order_number', 'product__name', 'quantity'))
+        self.assertEqual(Order.objects.count(), 30)
+        product = Product.objects.filter(rating_count__gt=0).first()
+        self.assertEqual(product.rating_count, Review.objects.filter(product=product).count())
+        self.assertEqual(Product.objects.aggregate(total=Sum('wished_by_count'))['total'], WishlistProduct.objects.count())
+
+        benchmarking.flush()
+        self.assertFalse(benchmarking.seeded_data_exists())
+        self.assertFalse(Order.objects.exists())
+        benchmarking.seed(self.volumes, batch_size=16, log=lambda message: None)
+        again = list(OrderItem.objects.order_by('order__order_number', 'product__name').values_list('order__order_number', 'product__name', 'quantity'))
+        self.assertEqual(again, first)
+
+    def test_endpoints_are_measured_and_regressions_flagged(self):
+        benchmarking.seed(self.volumes, batch_size=16, log=lambda message: None)
+        user = User.objects.filter(orders__isnull=False).first()
+        endpoints = benchmarking.router_endpoints({'product': 1})
+        names = [name for name, url, admin_only in endpoints]
+        self.assertEqual({name for name, url, admin_only in endpoints if admin_only}, {
+            'analytics-categories', 'analytics-customers', 'analytics-products', 'analytics-revenue',
+        })
+        self.assertIn('product-rating-summary', names)
+        self.assertNotIn('order-export', names)
+        self.assertNotIn('order-detail', names) # Sem pk de exemplo
+        results = benchmarking.run_endpoints(user, requests=3, warmup=1, only=['product-list', 'order-list'], host='testserver', log=lambda *args: None)
+        self.assertEqual(set(results), {'product-list', 'order-list'})
+        self.assertEqual(results['order-list']['errors'], 0)
+        slower = {name: {**result, 'p95_ms': result['p95_ms'] * 2 + 1} for name, result in results.items()}
+        self.assertEqual(benchmarking.compare(results, results), [])
+        self.assertEqual(sorted((name, metric) for name, metric, *_ in benchmarking.compare(results, slower)), [('order-list', 'p95_ms'), ('product-list', 'p95_ms')])
+
+    def test_admin_routes_use_the_staff_user_or_are_skipped(self):
+        benchmarking.seed(self.volumes, batch_size=16, log=lambda message: None)
+        user = User.objects.filter(orders__isnull=False).first()
+        only = ['analytics-revenue', 'analytics-categories']
+        skipped = []
+        results = benchmarking.run_endpoints(user, requests=2, warmup=0, only=only, host='testserver', writes=False,
+                                             log=lambda name, result: result is None and skipped.append(name))
+        self.assertEqual((results, sorted(skipped)), ({}, sorted(only)))
+        staff = benchmarking.staff_user()
+        self.assertEqual(staff.username, benchmarking.SEED_STAFF)
+        results = benchmarking.run_endpoints(user, requests=2, warmup=0, only=only, host='testserver', writes=False, staff=staff, log=lambda *args: None)
+        self.assertEqual({name: result['errors'] for name, result in results.items()}, {name: 0 for name in only})
+        # Fora de 2xx é erro: o usuário comum recebe 403 nas rotas de admin
+        self.client.force_authenticate(user)
+        forbidden = benchmarking.measure(self.client, '/api/v1/analytics/revenue/', 2, warmup=0)
+        self.assertEqual(forbidden['errors'], 2)
+
+    def test_write_actions_are_measured_without_changing_the_data(self):
+        from .urls import router
+        benchmarking.seed(self.volumes, batch_size=16, log=lambda message: None)
+        user = User.objects.filter(orders__isnull=False).first()
+        state = lambda: (
+            Order.objects.count(), list(Product.objects.order_by('pk').values_list('stock', 'wished_by_count')),
+            WishlistProduct.objects.count(), StockShard.objects.count(), Coupon.objects.count(),
+        )
+        before = state()
+        results = benchmarking.run_endpoints(user, requests=3, warmup=1, only=['order-checkout'], host='testserver', writes=False, log=lambda *args: None)
+        self.assertEqual(results, {})
+        results = benchmarking.run_writes(user, requests=3, warmup=1, host='testserver', log=lambda *args: None)
+        write_actions = {
+            f'{basename}-{extra.url_name}'
+            for _, viewset, basename in router.registry for extra in viewset.get_extra_actions() if set(extra.mapping) - {'get'}
+        }
+        self.assertEqual(set(results), write_actions)
+        self.assertEqual({name: result['errors'] for name, result in results.items() if result['errors']}, {})
+        self.assertEqual(state(), before)
+        self.assertFalse(Coupon.objects.filter(code=benchmarking.WRITE_COUPON).exists())
+
+
+class SalesRollupTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = User.objects.create_user(username='financeiro', is_staff=True)
+        self.buyer = User.objects.create_user(username='cliente-vendas')
+        self.products = create_products(3, prefix='Vendido')
+        self.products[2].category = None
+        self.products[2].save()
+
+    def rollups(self):
+        return {
+            'days': list(DailySales.objects.exclude(orders=0, units=0).order_by('date').values_list('date', 'orders', 'units', 'revenue')),
+            'categories': sorted(DailyCategorySales.objects.filter(units__gt=0).values_list('date', 'category_id', 'units', 'revenue')),
+            'products': sorted(DailyProductSales.objects.filter(units__gt=0).values_list('date', 'product_id', 'units', 'revenue')),
+            'customers': sorted(CustomerSales.objects.filter(orders__gt=0).values_list('user_id', 'orders', 'total_spent')),
+        }
+
+    def assertMatchesRebuild(self):
+        incremental = self.rollups() # Linhas zeradas pelas baixas ficam na tabela; o recálculo não as cria
+        sales.rebuild()
+        self.assertEqual(incremental, self.rollups())
+
+    def checkout(self, *quantities):
+        self.client.force_authenticate(self.buyer)
+        items = [{'product': product.pk, 'quantity': quantity} for product, quantity in zip(self.products, quantities) if quantity]
+        response = self.client.post('/api/v1/orders/checkout/', {'items': items, 'payment_method': 'PIX', 'shipping_cost': '5.00'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Order.objects.get(pk=response.data['id'])
+
+    def test_checkout_and_status_changes_update_the_rollups(self):
+        first = self.checkout(2, 1, 1)
+        self.checkout(1, 0, 0)
+        day = DailySales.objects.get()
+        self.assertEqual((day.orders, day.units), (2, 5))
+        self.assertEqual(day.revenue, first.total_amount + self.products[0].price + 5)
+        self.assertMatchesRebuild()
+
+        self.client.force_authenticate(self.staff)
+        self.client.patch(f'/api/v1/orders/{first.pk}/', {'status': 'CANCELED'}, format='json')
+        self.assertEqual(DailySales.objects.get().orders, 1)
+        self.assertEqual(CustomerSales.objects.get(user=self.buyer).total_spent, self.products[0].price + 5)
+        self.assertMatchesRebuild()
+
+        order = Order.objects.get(pk=first.pk)
+        order.status = 'SHIPPED'
+        order.created_at -= timedelta(days=3)
+        order.save()
+        self.assertEqual(DailySales.objects.filter(orders__gt=0).count(), 2)
+        self.assertMatchesRebuild()
+
+    def test_item_changes_and_deletions_update_the_rollups(self):
+        order = self.checkout(1, 2, 0)
+        item = OrderItem.objects.get(order=order, product=self.products[1])
+        item.quantity = 5
+        item.save()
+        OrderItem.objects.create(order=order, product=self.products[2], quantity=1, price_at_purchase=Decimal('3.00'))
+        self.assertMatchesRebuild()
+        OrderItem.objects.get(order=order, product=self.products[0]).delete()
+        self.assertMatchesRebuild()
+        self.buyer.delete()
+        self.assertEqual(self.rollups(), {'days': [], 'categories': [], 'products': [], 'customers': []})
+
+    def test_category_change_after_the_sale_does_not_strand_revenue(self):
+        order = self.checkout(1, 0, 0)
+        sold_in = self.products[0].category_id
+        self.products[0].category = Category.objects.create(name='Outra categoria')
+        self.products[0].save()
+        self.client.force_authenticate(self.staff)
+        self.client.patch(f'/api/v1/orders/{order.pk}/', {'status': 'CANCELED'}, format='json')
+        self.assertEqual(DailyCategorySales.objects.get(category_id=sold_in).revenue, 0)
+        self.assertFalse(DailyCategorySales.objects.filter(category=self.products[0].category).exists())
+        self.assertMatchesRebuild()
+
+    def test_analytics_endpoints_read_only_the_rollups(self):
+        order = self.checkout(1, 1, 1)
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.client.get('/api/v1/analytics/revenue/').status_code, 403)
+        self.client.force_authenticate(self.staff)
+        with CaptureQueriesContext(connection) as ctx:
+            revenue = self.client.get('/api/v1/analytics/revenue/').json()
+            categories = self.client.get('/api/v1/analytics/categories/').json()
+            products = self.client.get('/api/v1/analytics/products/?limit=2').json()
+            customers = self.client.get('/api/v1/analytics/customers/').json()
+        self.assertFalse([query for query in ctx.captured_queries if 'users_order' in query['sql']])
+        today = timezone.localdate().isoformat()
+        self.assertEqual(revenue['days'], [{'date': today, 'orders': 1, 'units': 3, 'revenue': f'{order.total_amount:.2f}'}])
+        self.assertEqual([row['category'] for row in categories], [self.products[0].category_id])
+        self.assertEqual(len(products), 2)
+        self.assertEqual(customers, [{'user': self.buyer.pk, 'username': 'cliente-vendas', 'orders': 1, 'total_spent': f'{order.total_amount:.2f}'}])
+        self.assertEqual(self.client.get('/api/v1/analytics/revenue/?date_from=2000-01-01&date_to=2000-01-31').json()['days'], [])
+        self.assertEqual(self.client.get('/api/v1/analytics/revenue/?date_from=ontem').status_code, 400)
+
+
+class BoughtTogetherTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.buyer = User.objects.create_user(username='cliente-recomendacoes')
+        self.products = create_products(4, prefix='Junto')
+
+    def order(self, *indexes, prefix='REC'):
+        create_orders(self.buyer, 1, [self.products[i] for i in indexes], prefix=f'{prefix}-{Order.objects.count()}')
+
+    def neighbors(self):
+        return list(BoughtTogether.objects.values_list('product_id', 'rank', 'related_id', 'count'))
+
+    def test_incremental_fold_matches_rebuild(self):
+        a, b, c, d = (product.pk for product in self.products)
+        self.order(0, 1, 2)
+        self.order(0, 1)
+        self.assertEqual(recommendations.fold_orders(batch_size=1, delay=timedelta(0)), (2, 3))
+        self.order(0, 2, 3)
+        self.order(0, 3)
+        self.order(1, 2)
+        Order.objects.filter(order_number__startswith='REC-4').update(status='CANCELED')
+        self.assertEqual(recommendations.fold_orders(delay=timedelta(0)), (3, 3))
+        self.assertEqual(recommendations.fold_orders(delay=timedelta(0)), (0, 0))
+
+        self.assertEqual(ProductCooccurrence.objects.get(product_id=a, other_id=b).count, 2)
+        self.assertEqual(
+            list(BoughtTogether.objects.filter(product_id=a).values_list('related_id', 'count')),
+            [(b, 2), (c, 2), (d, 2)]
+        )
+        self.assertFalse(ProductCooccurrence.objects.filter(product_id=b, other_id=c, count__gt=1).exists()) # Pedido cancelado ficou de fora
+        incremental = self.neighbors()
+        recommendations.rebuild(delay=timedelta(0))
+        self.assertEqual(incremental, self.neighbors())
+
+    def test_pair_counts_are_symmetric_per_order(self):
+        rows = [(1, 10), (1, 20), (1, 30), (2, 10), (2, 20), (3, 30)]
+        counts = dict(recommendations.pair_counts(rows))
+        self.assertEqual(counts, {(10, 20): 2, (20, 10): 2, (10, 30): 1, (30, 10): 1, (20, 30): 1, (30, 20): 1})
+
+    @override_settings(BOUGHT_TOGETHER_TOP_K=2)
+    def test_endpoint_reads_the_ranked_neighbors(self):
+        self.order(0, 1, 2)
+        self.order(0, 2)
+        recommendations.fold_orders(delay=timedelta(0))
+        url = f'/api/v1/products/{self.products[0].pk}/bought-together/'
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(url).json()
+        # Uma leitura dos vizinhos já com os dados dos produtos; o resto são as variantes da projeção
+        self.assertEqual(len([query for query in ctx.captured_queries if 'users_boughttogether' in query['sql']]), 1)
+        self.assertEqual([product['id'] for product in data['results']], [self.products[2].pk, self.products[1].pk])
+        self.assertEqual(data['results'][0]['bought_together_count'], 2)
+        self.assertEqual(len(self.client.get(url + '?limit=1').json()['results']), 1)
+        self.assertEqual(data['source'], 'orders')
+        fallback = self.client.get(f'/api/v1/products/{self.products[3].pk}/bought-together/').json()
+        self.assertEqual((fallback['source'], fallback['results']), ('similar', []))
+        self.assertEqual(self.client.get(url + '?limit=x').status_code, 400)
+
+
+class SimilarProductTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        clothes, shoes, kitchen = (Category.objects.create(name=name) for name in ('Roupas', 'Calçados', 'Cozinha'))
+        self.products = Product.objects.bulk_create([
+            Product(name=name, description=description, price=Decimal('10.00'), stock=5, category=category)
+            for name, description, category in (
+                ('Camiseta algodão azul', 'Gola redonda', clothes),
+                ('Camiseta algodão preta', 'Gola V', clothes),
+                ('Camiseta poliéster', 'Para treino', clothes),
+                ('Tênis corrida leve', 'Solado de borracha', shoes),
+                ('Tênis corrida amortecido', 'Solado de EVA', shoes),
+                ('Meia esportiva', 'Cano curto', shoes),
+                ('Caneca cerâmica', '350 ml', kitchen),
+                ('Panela inox', 'Fundo triplo', kitchen),
+            )
+        ])
+
+    def similar(self, product):
+        return list(SimilarProduct.objects.filter(product=product).values_list('related_id', 'score'))
+
+    def test_ranks_by_shared_terms_and_category(self):
+        self.assertEqual(similarity.tokenize('Calção de Algodão, P'), ['calcao', 'algodao'])
+        self.assertEqual(similarity.refresh_similar(), len(self.products))
+        shirt, black_shirt, training_shirt, running_shoe = self.products[:4]
+        self.assertEqual([related for related, _ in self.similar(shirt)], [black_shirt.pk, training_shirt.pk])
+        self.assertNotIn(shirt.pk, [related for related, _ in self.similar(running_shoe)])
+        self.assertTrue(all(0 < score <= 1 for _, score in self.similar(shirt)))
+
+    def test_refresh_only_recomputes_changed_and_affected_products(self):
+        similarity.refresh_similar()
+        shirt, mug, pan, running_shoe = self.products[0], self.products[6], self.products[7], self.products[3]
+        untouched = list(SimilarProduct.objects.filter(product=running_shoe).values_list('pk', flat=True))
+        self.assertNotIn(mug.pk, [related for related, _ in self.similar(shirt)])
+        mug.name = 'Caneca algodão azul'
+        mug.save()
+        # A caneca, quem citava a caneca (panela) e quem passa a parecer com ela (as duas camisetas de algodão)
+        self.assertEqual(similarity.refresh_similar(), 4)
+        self.assertIn(mug.pk, [related for related, _ in self.similar(shirt)])
+        self.assertEqual(list(SimilarProduct.objects.filter(product=running_shoe).values_list('pk', flat=True)), untouched)
+        incremental = {product.pk: self.similar(product) for product in (shirt, mug, pan)}
+        similarity.refresh_similar(rebuild=True)
+        self.assertEqual(incremental, {product.pk: self.similar(product) for product in (shirt, mug, pan)})
+        self.assertEqual(similarity.refresh_similar(), 0)
+        # Venda ou reposição muda updated_at, mas não o conteúdo indexado
+        running_shoe.stock = 1
+        running_shoe.save()
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(similarity.refresh_similar(), 0)
+        self.assertFalse([query for query in ctx.captured_queries if 'users_similarproduct' in query['sql']])
+
+    def test_endpoint_reads_the_precomputed_neighbors(self):
+        similarity.refresh_similar()
+        url = f'/api/v1/products/{self.products[0].pk}/similar/'
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.client.get(url + '?limit=1').json()
+        self.assertEqual(len([query for query in ctx.captured_queries if 'users_similarproduct' in query['sql']]), 1)
+        self.assertEqual([product['id'] for product in data['results']], [self.products[1].pk])
+        self.assertEqual(data['results'][0]['similarity'], SimilarProduct.objects.get(product=self.products[0], rank=1).score)
+        fallback = self.client.get(f'/api/v1/products/{self.products[0].pk}/bought-together/').json()
+        self.assertEqual(fallback['source'], 'similar')
+        self.assertEqual(fallback['results'][0]['id'], self.products[1].pk)
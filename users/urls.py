@@ -1,10 +1,11 @@
 # users/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .views import (
     UserViewSet, CategoryViewSet, ProductViewSet, AddressViewSet,
     OrderViewSet, OrderItemViewSet, ReviewViewSet, CouponViewSet,
-    WishlistViewSet
+    WishlistViewSet, AnalyticsViewSet, BatchView
 )
 
 router = DefaultRouter()
@@ -17,7 +18,18 @@ router.register(r'order-items', OrderItemViewSet)
 router.register(r'reviews', ReviewViewSet, basename='review')
 router.register(r'coupons', CouponViewSet)
 router.register(r'wishlists', WishlistViewSet, basename='wishlist')
+router.register(r'analytics', AnalyticsViewSet, basename='analytics') # Painéis da equipe (ver users/sales.py)
+
+# Leituras mais acessadas em views async (ver users/async_views.py)
+async_urlpatterns = [
+    path('products/', async_views.product_list, name='async-product-list'),
+    path('products/<int:pk>/', async_views.product_detail, name='async-product-detail'),
+    path('categories/', async_views.category_list, name='async-category-list'),
+    path('users/me/', async_views.me, name='async-user-me'),
+]
 
 urlpatterns = [
+    path('batch/', BatchView.as_view(), name='api-batch'), # Várias chamadas em uma ida e volta (ver users/batch.py)
+    path('async/', include(async_urlpatterns)),
     path('', include(router.urls)),
 ]
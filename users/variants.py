@@ -0,0 +1,93 @@
+# users/variants.py
+from itertools import product as cartesian_product
+
+from django.db import transaction
+
+from .caching import bump_catalog_version
+from .models import Product, ProductVariant, VariantOption
+
+# Conversão do campo de texto Product.variations em variantes estruturadas.
+# Formato aceito: "Tamanho: P, M, G | Cor: Azul, Rosa". Cada grupo separado por
+# '|' é um atributo; cada combinação de valores vira uma ProductVariant.
+# Grafias que só diferem em maiúsculas/espaços ("Azul", "azul") são a mesma
+# opção (VariantOption.normalize); vale a grafia da primeira vez que apareceu.
+
+DEFAULT_ATTRIBUTE = 'Opção' # Usado quando o grupo não tem "Nome:"
+
+def parse_variations(text):
+    groups = []
+    for group in (text or '').split('|'):
+        if not group.strip():
+            continue
+        name, separator, values = group.partition(':')
+        if not separator:
+            name, values = DEFAULT_ATTRIBUTE, group
+        unique = {}
+        for value in values.split(','):
+            value = value.strip()[:50]
+            if value:
+                unique.setdefault(VariantOption.normalize(value), value) # "Azul, azul": uma opção só
+        if unique:
+            groups.append((name.strip()[:50] or DEFAULT_ATTRIBUTE, list(unique.values())))
+    return groups
+
+def _key(pair):
+    name, value = pair
+    return VariantOption.normalize(name), VariantOption.normalize(value)
+
+def _get_options(pairs):
+    # Busca/cria todas as opções do lote de uma vez e devolve {(nome, valor) normalizados: opção}
+    wanted = {}
+    for pair in pairs:
+        wanted.setdefault(_key(pair), pair)
+    if not wanted:
+        return {}
+
+    def fetch(name_keys):
+        return {
+            (option.name_key, option.value_key): option
+            for option in VariantOption.objects.filter(name_key__in=name_keys)
+            if (option.name_key, option.value_key) in wanted
+        }
+
+    options = fetch({name_key for name_key, _ in wanted})
+    missing = [
+        VariantOption(name=name, value=value, name_key=name_key, value_key=value_key) # bulk_create não passa pelo save()
+        for (name_key, value_key), (name, value) in wanted.items() if (name_key, value_key) not in options
+    ]
+    if missing:
+        VariantOption.objects.bulk_create(missing, ignore_conflicts=True)
+        options.update(fetch({option.name_key for option in missing}))
+    return options
+
+def create_variants(products, copy_stock=False):
+    # Cria as variantes de um lote de produtos com um número fixo de consultas.
+    # Sem estoque por variante no texto antigo, a variante herda o estoque do
+    # produto quando é a única combinação (ou sempre, com copy_stock=True).
+    plans = []
+    for product in products:
+        groups = parse_variations(product.variations)
+        combinations = list(cartesian_product(*[[(name, value) for value in values] for name, values in groups])) if groups else []
+        plans.append((product, combinations))
+    options = _get_options(pair for _, combinations in plans for combination in combinations for pair in combination)
+
+    with transaction.atomic():
+        variants, variant_options = [], []
+        for product, combinations in plans:
+            for combination in combinations:
+                stock = product.stock if copy_stock or len(combinations) == 1 else 0
+                variants.append(ProductVariant(product=product, stock=stock))
+                variant_options.append([options[_key(pair)] for pair in combination])
+        ProductVariant.objects.bulk_create(variants) # O SQLite e o Postgres devolvem os ids
+        Through = ProductVariant.options.through
+        Through.objects.bulk_create([
+            Through(productvariant_id=variant.pk, variantoption_id=option.pk)
+            for variant, option_list in zip(variants, variant_options)
+            for option in option_list
+        ])
+    bump_catalog_version() # bulk_create não dispara os sinais
+    return len(variants)
+
+def products_to_migrate():
+    # Produtos com texto de variações e ainda sem variantes estruturadas
+    return Product.objects.exclude(variations__isnull=True).exclude(variations='').filter(variants__isnull=True).order_by('pk')
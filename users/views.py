@@ -1,21 +1,68 @@
 # users/views.py
-from rest_framework import viewsets, status
+from rest_framework import generics, viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.exceptions import ValidationError
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django.contrib.auth.models import User
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_date
 from .models import (
     Category, Product, Address, Order, OrderItem, Review, Coupon,
-    Wishlist, WishlistProduct
+    Wishlist
+)
+from . import batch, checkout, coupons, facets, metrics, order_export, recommendations, reservations, sales, search, similarity, wishlists
+from .caching import CatalogCacheMixin
+from .filters import ProductFilterBackend, TRUE_VALUES
+from .projections import CompactWishlistProjection, OrderProjection, ProductProjection, WishlistProjection
+from .renderers import CSVRenderer, NDJSONRenderer
+from .pagination import (
+    ProductCursorPagination, OrderCursorPagination, ReviewCursorPagination
 )
 from .serializers import (
     UserSerializer, CategorySerializer, ProductSerializer, AddressSerializer,
     OrderSerializer, OrderItemSerializer, ReviewSerializer, CouponSerializer,
-    WishlistSerializer, WishlistProductSerializer
+    WishlistSerializer, WishlistProductSerializer, CheckoutSerializer,
+    CouponValidationSerializer, ReserveStockSerializer, StockReservationSerializer,
+    WishlistBatchSerializer, BatchRequestSerializer
 )
 
+class EagerLoadingViewSetMixin:
+    # Aplica no queryset o plano de consulta declarado pelo serializer da viewset
+    # (select_related/prefetch_related), mantendo o número de consultas constante.
+    def get_queryset(self):
+        return self.optimize_queryset(super().get_queryset())
+
+    def optimize_queryset(self, queryset):
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'setup_eager_loading'):
+            return serializer_class.setup_eager_loading(queryset)
+        return queryset
+
+class ProjectionListMixin:
+    # Listagem pelo caminho rápido: lê as linhas com .values() e monta a resposta
+    # com a projeção da viewset (ver users/projections.py), sem instanciar
+    # modelos nem passar pelos campos do serializer. A saída é a mesma do
+    # serializer; detalhe e escrita continuam usando o serializer normalmente.
+    projection_class = None
+
+    def get_projection_class(self):
+        return self.projection_class
+
+    def list(self, request, *args, **kwargs):
+        projection = self.get_projection_class()
+        rows = projection.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        with metrics.timed('serializer'):
+            data = projection.build(page if page is not None else rows)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
 # ViewSet para o usuário padrão do Django
-class UserViewSet(viewsets.ReadOnlyModelViewSet): # ReadOnly porque o gerenciamento de usuários é complexo
+class UserViewSet(EagerLoadingViewSetMixin, viewsets.ReadOnlyModelViewSet): # ReadOnly porque o gerenciamento de usuários é complexo
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [AllowAny] # Pode ser ajustado para IsAdminUser se quiser restringir mais
@@ -25,112 +72,336 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet): # ReadOnly porque o gerenciame
         serializer = self.get_serializer(request.user)
         return Response(serializer.data)
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CatalogCacheMixin, EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all().order_by('name')
     serializer_class = CategorySerializer
     permission_classes = [AllowAny] # Permite qualquer um listar/criar (pode ser ajustado)
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(CatalogCacheMixin, ProjectionListMixin, EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all().order_by('name')
     serializer_class = ProductSerializer
+    projection_class = ProductProjection
     permission_classes = [AllowAny] # Permite qualquer um listar/criar (pode ser ajustado)
+    pagination_class = ProductCursorPagination
+    filter_backends = [ProductFilterBackend]
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        # Contagens das facetas do catálogo inteiro, lidas da tabela pré-calculada
+        response.data['facets'] = facets.get_facet_counts()
+        return response
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        # Busca textual ranqueada: /products/search/?q=macacao&limit=20
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'detail': 'Informe o parâmetro de busca "q".'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({'detail': 'O parâmetro "limit" deve ser um número inteiro.'}, status=status.HTTP_400_BAD_REQUEST)
+        product_ids = search.search_product_ids(query, limit=limit)
+        products = self.get_queryset().in_bulk(product_ids)
+        # in_bulk não preserva a ordem: reordenamos pela relevância devolvida pelo índice
+        ranked = [products[pk] for pk in product_ids if pk in products]
+        serializer = self.get_serializer(ranked, many=True)
+        return Response({'query': query, 'results': serializer.data})
+
+    @action(detail=True, methods=['get'], url_path='rating-summary')
+    def rating_summary(self, request, pk=None):
+        # Lê só os agregados denormalizados do produto: uma consulta, sem tocar em Review
+        product = get_object_or_404(Product.objects.only('pk', *Product.RATING_FIELDS), pk=pk)
+        return Response({
+            'product': product.pk,
+            'rating_count': product.rating_count,
+            'rating_average': product.rating_average,
+            'rating_histogram': product.rating_histogram,
+        })
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
-    def add_to_wishlist(self, request, pk=None):
-        product = self.get_object()
-        wishlist, created = Wishlist.objects.get_or_create(user=request.user)
-        wishlist_product, created_item = WishlistProduct.objects.get_or_create(
-            wishlist=wishlist, product=product
+    def reserve(self, request, pk=None):
+        # Reserva temporária de estoque (carrinho) para produtos com estoque fatiado
+        payload = ReserveStockSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        try:
+            reservation = reservations.reserve(int(pk), payload.validated_data['quantity'], user=request.user)
+        except reservations.ReservationError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_409_CONFLICT)
+        return Response(StockReservationSerializer(reservation).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated], url_path=r'release/(?P<reservation_id>\d+)')
+    def release(self, request, pk=None, reservation_id=None):
+        try:
+            reservations.release(int(reservation_id), user=request.user, product_id=int(pk))
+        except reservations.ReservationError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_404_NOT_FOUND)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['get'])
+    def batch(self, request):
+        # Cartões de vários produtos em uma consulta por pk: /products/batch/?ids=3,7,12
+        # Mesma saída da listagem, na ordem pedida; ids inexistentes são omitidos.
+        ids = request.query_params.get('ids', '')
+        try:
+            product_ids = list(dict.fromkeys(int(value) for value in ids.split(',') if value.strip()))
+        except ValueError:
+            return Response({'ids': 'Informe ids numéricos separados por vírgula.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not product_ids or len(product_ids) > 100:
+            return Response({'ids': 'Informe de 1 a 100 ids.'}, status=status.HTTP_400_BAD_REQUEST)
+        return self.cached_response(request, self._batch, product_ids)
+
+    def _batch(self, request, product_ids):
+        rows = {row['id']: row for row in ProductProjection.values(Product.objects.filter(pk__in=product_ids))}
+        products = ProductProjection.build([rows[pk] for pk in product_ids if pk in rows])
+        return Response({'results': products})
+
+    @action(detail=False, methods=['get'], url_path='most-wished')
+    def most_wished(self, request):
+        # Ranking pelo contador denormalizado wished_by_count: /products/most-wished/?limit=20
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({'detail': 'O parâmetro "limit" deve ser um número inteiro.'}, status=status.HTTP_400_BAD_REQUEST)
+        rows = list(
+            Product.objects.filter(wished_by_count__gt=0).order_by('-wished_by_count', 'id')
+            .values(*ProductProjection.columns, 'wished_by_count')[:limit]
         )
-        if created_item:
+        products = ProductProjection.build(rows)
+        for product, row in zip(products, rows):
+            product['wished_by_count'] = row['wished_by_count']
+        return Response(products)
+
+    @action(detail=True, methods=['get'], url_path='bought-together')
+    def bought_together(self, request, pk=None):
+        # Produtos comprados junto, pré-calculados por users/recommendations.py: /products/7/bought-together/?limit=5
+        return self._recommendations(request, pk, self._bought_together, recommendations.top_k())
+
+    def _bought_together(self, request, product_id, limit):
+        # Produto sem histórico de pedidos: cai para os semelhantes por conteúdo, também pré-calculados
+        results = recommendations.bought_together(product_id, limit)
+        if results:
+            return Response({'product': product_id, 'source': 'orders', 'results': results})
+        return Response({'product': product_id, 'source': 'similar', 'results': similarity.similar_products(product_id, limit)})
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        # Semelhantes por nome, descrição e categoria: /products/7/similar/?limit=5
+        return self._recommendations(request, pk, self._similar, similarity.top_k())
+
+    def _similar(self, request, product_id, limit):
+        return Response({'product': product_id, 'results': similarity.similar_products(product_id, limit)})
+
+    def _recommendations(self, request, pk, handler, top_k):
+        try:
+            limit = min(max(int(request.query_params.get('limit', top_k)), 1), top_k)
+        except ValueError:
+            return Response({'detail': 'O parâmetro "limit" deve ser um número inteiro.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not pk.isdigit():
+            return Response({'detail': 'Não encontrado.'}, status=status.HTTP_404_NOT_FOUND)
+        return self.cached_response(request, handler, int(pk), limit)
+
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    def add_to_wishlist(self, request, pk=None):
+        # Upsert em um único INSERT (ver users/wishlists.py); o produto só é lido se nada foi inserido
+        if wishlists.add_products(request.user, [int(pk)] if pk.isdigit() else []):
             return Response({'status': 'Produto adicionado à lista de desejos'}, status=status.HTTP_201_CREATED)
+        get_object_or_404(Product.objects.only('pk'), pk=pk)
         return Response({'status': 'Produto já está na lista de desejos'}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def remove_from_wishlist(self, request, pk=None):
-        product = self.get_object()
-        try:
-            wishlist = Wishlist.objects.get(user=request.user)
-            wishlist_product = WishlistProduct.objects.get(wishlist=wishlist, product=product)
-            wishlist_product.delete()
+        if wishlists.remove_products(request.user, [int(pk)] if pk.isdigit() else []):
             return Response({'status': 'Produto removido da lista de desejos'}, status=status.HTTP_204_NO_CONTENT)
-        except (Wishlist.DoesNotExist, WishlistProduct.DoesNotExist):
-            return Response({'status': 'Produto não encontrado na lista de desejos'}, status=status.HTTP_404_NOT_FOUND)
+        return Response({'status': 'Produto não encontrado na lista de desejos'}, status=status.HTTP_404_NOT_FOUND)
 
-class AddressViewSet(viewsets.ModelViewSet):
+class AddressViewSet(EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     serializer_class = AddressSerializer
     permission_classes = [IsAuthenticated] # Apenas usuários autenticados podem gerenciar seus endereços
 
     def get_queryset(self):
         # Retorna apenas os endereços do usuário logado
-        return Address.objects.filter(user=self.request.user)
+        return self.optimize_queryset(Address.objects.filter(user=self.request.user))
 
     def perform_create(self, serializer):
         # Garante que o usuário logado seja definido como o proprietário do endereço
         serializer.save(user=self.request.user)
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ProjectionListMixin, EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
+    projection_class = OrderProjection
     permission_classes = [IsAuthenticated]
+    pagination_class = OrderCursorPagination
 
     def get_queryset(self):
         # Administradores podem ver todos os pedidos, usuários comuns apenas os seus
         if self.request.user.is_staff: # is_staff é uma propriedade para verificar se é admin
-            return Order.objects.all().order_by('-created_at')
-        return Order.objects.filter(user=self.request.user).order_by('-created_at')
+            return self.optimize_queryset(Order.objects.all().order_by('-created_at'))
+        return self.optimize_queryset(Order.objects.filter(user=self.request.user).order_by('-created_at'))
 
     def perform_create(self, serializer):
-        # Associa o pedido ao usuário logado
-        order = serializer.save(user=self.request.user)
-        # Exemplo de como você criaria OrderItems após criar um Order
-        # Em um cenário real, você passaria os itens do carrinho no request.data
-        # Por simplicidade aqui, vamos apenas salvar o Order.
-        # A lógica para criar OrderItems a partir de um carrinho viria aqui.
-
-        # Simulando criação de OrderItems (você adaptaria isso para usar dados do frontend)
-        # Por exemplo, se o frontend enviasse uma lista de products_in_cart no request.data
-        # for item_data in self.request.data.get('cart_items', []):
-        #     product = Product.objects.get(id=item_data['product_id'])
-        #     OrderItem.objects.create(
-        #         order=order,
-        #         product=product,
-        #         quantity=item_data['quantity'],
-        #         price_at_purchase=product.price # Ou item_data['price'] se o preço veio do frontend
-        #     )
-        # Se você fosse realmente finalizar um pedido por aqui, a lógica de esvaziar o carrinho, etc. estaria no frontend após a chamada à API.
-
-class OrderItemViewSet(viewsets.ModelViewSet):
+        # Associa o pedido ao usuário logado. Para finalizar um carrinho (itens,
+        # baixa de estoque e total) use a ação checkout abaixo.
+        serializer.save(user=self.request.user)
+
+    @action(detail=False, methods=['post'])
+    def checkout(self, request):
+        # Cria pedido, itens e baixa de estoque em uma transação (ver users/checkout.py)
+        # Ex: {"items": [{"product": 1, "quantity": 2}], "payment_method": "PIX", "shipping_address": 3}
+        payload = CheckoutSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        try:
+            order = checkout.place_order(user=request.user, **payload.validated_data)
+        except checkout.InsufficientStock as exc:
+            return Response({'detail': str(exc), 'products': exc.products}, status=status.HTTP_409_CONFLICT)
+        order = self.optimize_queryset(Order.objects.filter(pk=order.pk)).get()
+        return Response(OrderSerializer(order, context=self.get_serializer_context()).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        # Exportação em fluxo para o financeiro (ver users/order_export.py):
+        # /orders/export/?format=csv&date_from=2025-01-01&date_to=2025-01-31&status=DELIVERED,SHIPPED
+        try:
+            orders = order_export.filter_orders(request.query_params)
+        except order_export.ExportFilterError as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        renderer = request.accepted_renderer
+        lines = order_export.csv_lines(orders) if renderer.format == 'csv' else order_export.ndjson_lines(orders)
+        response = StreamingHttpResponse(lines, content_type=f'{renderer.media_type}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="pedidos.{renderer.format}"'
+        return response
+
+class OrderItemViewSet(EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     queryset = OrderItem.objects.all()
     serializer_class = OrderItemSerializer
     # Normalmente OrderItems não são criados ou listados diretamente, mas através de Order
     # permission_classes = [IsAdminUser] # Apenas admin pode gerenciar isso diretamente
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ReviewCursorPagination
 
     def get_queryset(self):
         # Usuários podem ver todas as avaliações, mas só podem editar/deletar as suas
-        return Review.objects.all() # Ou filter(user=self.request.user) para ver apenas as suas
+        return self.optimize_queryset(Review.objects.all()) # Ou filter(user=self.request.user) para ver apenas as suas
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user) # Associa a avaliação ao usuário logado
 
-class CouponViewSet(viewsets.ModelViewSet):
+class CouponViewSet(EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     queryset = Coupon.objects.all().order_by('code')
     serializer_class = CouponSerializer
     # Apenas administradores podem criar/gerenciar cupons
     # permission_classes = [IsAdminUser] # Requer uma permissão de admin mais sofisticada
     permission_classes = [AllowAny] # Temporário para teste
 
-class WishlistViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'])
+    def validate(self, request):
+        # Validação rápida a cada atualização do carrinho, servida pelo cache (ver users/coupons.py)
+        payload = CouponValidationSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        data = coupons.validate_coupon(payload.validated_data['code'], payload.validated_data.get('subtotal'))
+        return Response({
+            'code': data['code'],
+            'discount_type': data['discount_type'],
+            'discount_value': data['discount_value'],
+            'discount_amount': data['discount_amount'],
+        })
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def redeem(self, request):
+        # Resgate isolado; no fluxo normal o cupom é resgatado dentro do checkout do pedido
+        payload = CouponValidationSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        coupons.redeem_coupon(payload.validated_data['code'])
+        return Response({'status': 'Cupom resgatado'}, status=status.HTTP_200_OK)
+
+class WishlistViewSet(ProjectionListMixin, EagerLoadingViewSetMixin, viewsets.ModelViewSet):
     serializer_class = WishlistSerializer
+    projection_class = WishlistProjection
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         # Um usuário só pode ver/gerenciar sua própria lista de desejos
-        return Wishlist.objects.filter(user=self.request.user)
+        return self.optimize_queryset(Wishlist.objects.filter(user=self.request.user))
+
+    def is_compact(self):
+        return self.request.query_params.get('compact', '').lower() in TRUE_VALUES
+
+    def get_projection_class(self):
+        # ?compact=true: só ids e datas, sem os dados completos de cada produto
+        return CompactWishlistProjection if self.is_compact() else self.projection_class
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.is_compact():
+            return super().retrieve(request, *args, **kwargs)
+        # Mesma busca do modo completo (404 também para ids inválidos), lendo só a linha projetada
+        lookup = {self.lookup_field: kwargs[self.lookup_url_kwarg or self.lookup_field]}
+        row = generics.get_object_or_404(CompactWishlistProjection.values(self.get_queryset()), **lookup)
+        return Response(CompactWishlistProjection.build([row])[0])
 
     def perform_create(self, serializer):
         # Cria a lista de desejos para o usuário logado
         serializer.save(user=self.request.user)
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        # Adiciona e remove vários produtos em uma requisição (importação da lista no app)
+        payload = WishlistBatchSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        added = wishlists.add_products(request.user, payload.validated_data['add'])
+        removed = wishlists.remove_products(request.user, payload.validated_data['remove'])
+        # Só consulta os produtos quando algum id não foi inserido (já estava na lista ou não existe)
+        leftover = set(payload.validated_data['add']) - set(added)
+        existing = set(Product.objects.filter(pk__in=leftover).values_list('pk', flat=True)) if leftover else set()
+        return Response({'added': added, 'removed': removed, 'not_found': sorted(leftover - existing)})
+
+class AnalyticsViewSet(viewsets.ViewSet):
+    # Painéis da equipe, lidos só dos resumos de vendas (ver users/sales.py):
+    # /analytics/revenue/?date_from=2025-01-01&date_to=2025-01-31, /analytics/categories/,
+    # /analytics/products/?limit=10 e /analytics/customers/?limit=10
+    permission_classes = [IsAdminUser]
+
+    def get_period(self, request):
+        period = {}
+        for name in ('date_from', 'date_to'):
+            value = request.query_params.get(name)
+            if value:
+                period[name] = parse_date(value)
+                if period[name] is None:
+                    raise ValidationError({name: 'Use datas no formato AAAA-MM-DD.'})
+        return period
+
+    def get_limit(self, request):
+        try:
+            return min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            raise ValidationError({'limit': 'O parâmetro "limit" deve ser um número inteiro.'})
+
+    @action(detail=False, methods=['get'])
+    def revenue(self, request):
+        return Response(sales.revenue_by_day(**self.get_period(request)))
+
+    @action(detail=False, methods=['get'])
+    def categories(self, request):
+        return Response(sales.revenue_by_category(**self.get_period(request)))
+
+    @action(detail=False, methods=['get'])
+    def products(self, request):
+        return Response(sales.top_products(limit=self.get_limit(request), **self.get_period(request)))
+
+    @action(detail=False, methods=['get'])
+    def customers(self, request):
+        return Response(sales.top_customers(limit=self.get_limit(request)))
+
+class BatchView(APIView):
+    # Várias chamadas da API em uma requisição (ver users/batch.py). A permissão
+    # de cada rota é verificada na sub-requisição; aqui só autenticamos uma vez.
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        payload = BatchRequestSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        results = batch.run(request, payload.validated_data['requests'], parallel=payload.validated_data['parallel'])
+        return Response({'results': results})
@@ -0,0 +1,83 @@
+# users/wishlists.py
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Product, Wishlist, WishlistProduct
+
+# Escritas da lista de desejos em comandos únicos, sem ler antes de escrever.
+#
+# Adicionar é um INSERT ... SELECT ... ON CONFLICT DO NOTHING que se apoia na
+# restrição única (wishlist, product): duas requisições simultâneas não criam
+# duplicatas nem falham. Remover é um DELETE direto. Os dois usam RETURNING
+# para saber quais produtos mudaram de fato e ajustar Product.wished_by_count
+# com UPDATE ... F() na mesma transação (base do ranking "mais desejados").
+# ON CONFLICT e RETURNING exigem SQLite 3.35+ ou Postgres.
+#
+# Remoções feitas por outros caminhos (admin, exclusão do usuário ou da lista)
+# passam pelo sinal post_delete de WishlistProduct. Cargas em massa podem ser
+# corrigidas com `python manage.py rebuild_wishlist_counters`.
+
+def ensure_wishlist(user):
+    # Cria a lista do usuário se ainda não existir (INSERT ... ON CONFLICT DO NOTHING)
+    Wishlist.objects.bulk_create([Wishlist(user=user)], ignore_conflicts=True)
+
+def _adjust_counters(product_ids, delta):
+    if product_ids:
+        Product.objects.filter(pk__in=product_ids).update(wished_by_count=F('wished_by_count') + delta)
+
+def add_products(user, product_ids):
+    # Retorna os ids efetivamente adicionados, em ordem crescente (os já presentes e os inexistentes ficam de fora)
+    product_ids = sorted(set(product_ids))
+    if not product_ids:
+        return []
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    added_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic():
+        ensure_wishlist(user)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {WishlistProduct._meta.db_table} (wishlist_id, product_id, added_at) '
+                f'SELECT w.id, p.id, %s FROM {Wishlist._meta.db_table} w, {Product._meta.db_table} p '
+                f'WHERE w.user_id = %s AND p.id IN ({placeholders}) '
+                f'ON CONFLICT (wishlist_id, product_id) DO NOTHING RETURNING product_id',
+                [added_at, user.pk, *product_ids]
+            )
+            added = sorted(row[0] for row in cursor.fetchall()) # A ordem do RETURNING não é garantida
+        _adjust_counters(added, 1)
+    return added
+
+def remove_products(user, product_ids):
+    # Retorna os ids efetivamente removidos, em ordem crescente
+    product_ids = sorted(set(product_ids))
+    if not product_ids:
+        return []
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {WishlistProduct._meta.db_table} '
+                f'WHERE wishlist_id = (SELECT id FROM {Wishlist._meta.db_table} WHERE user_id = %s) '
+                f'AND product_id IN ({placeholders}) RETURNING product_id',
+                [user.pk, *product_ids]
+            )
+            removed = sorted(row[0] for row in cursor.fetchall())
+        _adjust_counters(removed, -1)
+    return removed
+
+def wishlist_product_created(instance):
+    # Inclusões pelo ORM (admin, WishlistProduct.objects.create)
+    _adjust_counters([instance.product_id], 1)
+
+def wishlist_product_deleted(instance):
+    # Exclusões pelo ORM, inclusive em cascata ao apagar a lista, o usuário ou o produto
+    _adjust_counters([instance.product_id], -1)
+
+def rebuild_counters(batch_size=1000):
+    # Recalcula wished_by_count de todos os produtos a partir de WishlistProduct
+    counts = dict(WishlistProduct.objects.order_by().values('product_id').annotate(total=Count('pk')).values_list('product_id', 'total'))
+    with transaction.atomic():
+        Product.objects.exclude(pk__in=WishlistProduct.objects.values('product_id')).exclude(wished_by_count=0).update(wished_by_count=0)
+        pending = [Product(pk=pk, wished_by_count=total) for pk, total in counts.items()]
+        Product.objects.bulk_update(pending, ['wished_by_count'], batch_size=batch_size)
+    return len(counts)